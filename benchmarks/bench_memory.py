@@ -0,0 +1,223 @@
+"""MemoryCore load benchmarks.
+
+Populates the huddle and skills collections at increasing sizes and measures
+write throughput, read latency (p50/p95/p99) and on-disk size. Runs fully offline:
+embeddings come from a local hashing function, not a downloaded model.
+
+    python benchmarks/bench_memory.py --sizes 10000 100000 1000000 --output bench.json
+
+Results are JSON so two runs can be diffed or compared with a script.
+"""
+import argparse
+import contextlib
+import datetime
+import hashlib
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import chromadb
+from chromadb.api.types import EmbeddingFunction
+from doc.backend.memory import MemoryCore
+
+AGENTS = ["claude", "codex", "System", "User"]
+WORDS = (
+    "refactor test build plan review merge fix bug api auth module parser cache queue thread "
+    "process memory huddle skill status completed input schema config deploy lint import"
+).split()
+
+
+class HashingEmbeddingFunction(EmbeddingFunction):
+    """Offline embedding: signed feature hashing of words, L2-normalised."""
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vec = [0.0] * self.dim
+            for word in text.lower().split():
+                h = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+                vec[h % self.dim] += 1.0 if (h >> 32) & 1 else -1.0
+            norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+            vectors.append([v / norm for v in vec])
+        return vectors
+
+    @staticmethod
+    def name():
+        return "doc-bench-hashing"
+
+    def get_config(self):
+        return {"dim": self.dim}
+
+    @staticmethod
+    def build_from_config(config):
+        return HashingEmbeddingFunction(config["dim"])
+
+
+def _sentence(i: int) -> str:
+    # Deterministic pseudo-text so runs are comparable.
+    return " ".join(WORDS[(i * 7 + k * 13) % len(WORDS)] for k in range(8 + i % 12))
+
+
+def _percentiles(samples):
+    samples_ms = [s * 1000 for s in samples]
+    if len(samples_ms) < 2:
+        value = samples_ms[0] if samples_ms else 0.0
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value, "n": len(samples_ms)}
+    cuts = statistics.quantiles(samples_ms, n=100, method="inclusive")
+    return {
+        "p50_ms": round(cuts[49], 3),
+        "p95_ms": round(cuts[94], 3),
+        "p99_ms": round(cuts[98], 3),
+        "n": len(samples_ms),
+    }
+
+
+def _time_calls(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return _percentiles(samples)
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                pass
+    return total
+
+
+def _populate(memory: MemoryCore, size: int, embed):
+    """Bulk-loads `size` huddle entries and `size` skills straight into Chroma."""
+    batch = memory.client.get_max_batch_size()
+    huddle_name = memory._huddle_name()
+    huddle = memory._get_collection(huddle_name)
+    skills = memory._get_collection("skills")
+    base = datetime.datetime(2024, 1, 1)
+
+    for start in range(0, size, batch):
+        end = min(start + batch, size)
+        docs = [_sentence(i) for i in range(start, end)]
+        vectors = embed(docs)
+        stamps = [base + datetime.timedelta(seconds=i) for i in range(start, end)]
+        huddle.add(
+            ids=[f"{t.timestamp()}-{i:09d}" for i, t in zip(range(start, end), stamps)],
+            documents=docs,
+            embeddings=vectors,
+            metadatas=[
+                {"agent": AGENTS[i % len(AGENTS)], "type": "agent_log", "timestamp": t.isoformat(),
+                 "seq": i + 1, "mission_id": memory.mission_id}
+                for i, t in zip(range(start, end), stamps)
+            ],
+        )
+        skills.add(
+            ids=[f"skill-{i:09d}" for i in range(start, end)],
+            documents=docs,
+            embeddings=vectors,
+            metadatas=[{"task": f"bench-{i % 50}", "timestamp": t.isoformat(), "count": 1}
+                       for i, t in zip(range(start, end), stamps)],
+        )
+    # Force the seq high-water mark to be rediscovered, as a freshly started process would.
+    memory._last_seq.pop(huddle_name, None)
+
+
+def run_size(size: int, args) -> dict:
+    workdir = tempfile.mkdtemp(prefix=f"doc-bench-{size}-")
+    try:
+        embed = HashingEmbeddingFunction(args.dim)
+        memory = MemoryCore(os.path.join(workdir, ".brain/memory.db"), embedding_function=embed)
+        memory.start_mission("bench")
+
+        start = time.perf_counter()
+        _populate(memory, size, embed)
+        populate_s = time.perf_counter() - start
+        print(f"[bench] {size}: populated in {populate_s:.1f}s", file=sys.stderr)
+
+        # First write after startup pays for the seq scan of the partition.
+        start = time.perf_counter()
+        memory.log_interaction("System", "warm-up")
+        memory.flush()
+        first_write_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for i in range(args.writes):
+            memory.log_interaction(AGENTS[i % len(AGENTS)], _sentence(size + i), type="agent_log")
+        enqueue_s = time.perf_counter() - start
+        memory.flush()
+        total_s = time.perf_counter() - start
+
+        queries = [_sentence(i * 31) for i in range(args.repeat)]
+        query_iter = iter(queries * 2)
+
+        result = {
+            "entries": size,
+            "populate_s": round(populate_s, 3),
+            "log_interaction": {
+                "writes": args.writes,
+                "first_write_ms": round(first_write_ms, 3),
+                "enqueue_ops_per_s": round(args.writes / enqueue_s, 1) if enqueue_s else None,
+                "committed_ops_per_s": round(args.writes / total_s, 1) if total_s else None,
+            },
+            "get_recent_huddle": _time_calls(lambda: memory.get_recent_huddle(limit=50), args.repeat),
+            "get_latest_status": _time_calls(memory.get_latest_status, args.repeat),
+            "since": _time_calls(lambda: memory.since(size), args.repeat),
+            "query_memory": _time_calls(lambda: memory.query_memory("skills", next(query_iter)), args.repeat),
+            "disk_bytes": _dir_size(os.path.join(workdir, ".brain/memory.db")),
+        }
+        print(f"[bench] {size}: done", file=sys.stderr)
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="MemoryCore load benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Entries per collection to populate (default: 10000 100000 1000000)")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed calls per read operation (default: 20)")
+    parser.add_argument("--writes", type=int, default=1000, help="log_interaction calls for throughput (default: 1000)")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension (default: 384)")
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    report = {
+        "benchmark": "memory_core",
+        "timestamp": datetime.datetime.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "chromadb": chromadb.__version__,
+        },
+        "params": {"repeat": args.repeat, "writes": args.writes, "dim": args.dim},
+    }
+    # MemoryCore reports progress on stdout; keep stdout clean for the JSON.
+    with contextlib.redirect_stdout(sys.stderr):
+        report["results"] = [run_size(size, args) for size in args.sizes]
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
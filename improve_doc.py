@@ -2,11 +2,17 @@ import shutil
 import re
 import os
 import sys
-import time
+
+# Ensure src is in pythonpath
+sys.path.insert(0, os.path.join(os.getcwd(), "src"))
+
+from doc.backend.parallel_sprint import WorktreeError, WorktreeManager, clone_tree
 
 # ... existing imports ...
 
 class VersionManager:
+    """Versions live in builds/vN. In a git repo each one is a worktree on branch builds/vN,
+    forked from the last stable version; elsewhere it is a copy-on-write clone of it."""
     def __init__(self, root_dir):
         self.root = root_dir
         # We will create versions in a 'builds' subdirectory to keep root clean
@@ -14,13 +20,16 @@ class VersionManager:
         os.makedirs(self.builds_dir, exist_ok=True)
         
         self.latest_stable_source = root_dir # Start with the actual repo
+        self.latest_stable_ref = None # Commit/branch the next worktree forks from (None = the repo as it is on disk)
         self.ignore_patterns = shutil.ignore_patterns(
             "builds", ".git", ".brain", "__pycache__", "venv", ".env", "dist"
         )
         self.current_version_path = None
+        self.worktrees = WorktreeManager(root_dir, root=self.builds_dir)
+        self.use_worktrees = self.worktrees.available()
 
     def prepare_next_version(self):
-        """Creates a full repo copy in builds/v{N+1}."""
+        """Creates builds/v{N+1} from the latest stable version."""
         next_idx = 1
         existing = [d for d in os.listdir(self.builds_dir) if d.startswith("v")]
         if existing:
@@ -31,27 +40,47 @@ class VersionManager:
         new_dir_name = f"v{next_idx}"
         new_path = os.path.join(self.builds_dir, new_dir_name)
         
+        if self.use_worktrees:
+            print(f"📦 [VersionManager] Adding worktree {new_path}...")
+            try:
+                base = self.latest_stable_ref or self.worktrees.snapshot()
+                self.worktrees.create(new_dir_name, f"builds/{new_dir_name}", base=base)
+                self.current_version_path = new_path
+                return new_path
+            except WorktreeError as e:
+                print(f"   (Worktree failed: {e}. Falling back to copying.)")
+                self.use_worktrees = False
+
         print(f"📦 [VersionManager] Cloning repo to {new_path}...")
         
-        # Copy the FULL repository (excluding builds/git/etc)
+        # Copy the FULL repository (excluding builds/git/etc); blocks are shared copy-on-write where the FS allows
         if os.path.exists(new_path):
             shutil.rmtree(new_path)
             
-        shutil.copytree(self.latest_stable_source, new_path, ignore=self.ignore_patterns)
+        clone_tree(self.latest_stable_source, new_path, ignore=self.ignore_patterns)
         
         self.current_version_path = new_path
         return new_path
 
     def mark_result(self, path, success):
         """Updates stable pointer or marks for deletion."""
+        name = os.path.basename(path)
+        is_worktree = name in self.worktrees.worktrees
         if success:
-            print(f"✅ [VersionManager] {os.path.basename(path)} marked STABLE.")
+            print(f"✅ [VersionManager] {name} marked STABLE.")
             self.latest_stable_source = path
+            if is_worktree:
+                # Commit the agents' edits so the next version forks from them.
+                self.worktrees.commit_all(name, f"{name}: stable")
+                self.latest_stable_ref = self.worktrees.worktrees[name][1]
             # We keep it.
         else:
-            print(f"❌ [VersionManager] {os.path.basename(path)} marked UNSTABLE. Deleting...")
+            print(f"❌ [VersionManager] {name} marked UNSTABLE. Deleting...")
             try:
-                shutil.rmtree(path)
+                if is_worktree:
+                    self.worktrees.remove(name, discard=True)
+                else:
+                    shutil.rmtree(path)
             except Exception as e:
                 print(f"   (Cleanup failed: {e})")
             # Pointer stays on previous stable
@@ -61,11 +90,8 @@ class VersionManager:
 # This ensures the module-level variable in scrum.py picks up True
 os.environ["DOC_ENABLE_REAL_AGENTS"] = "true"
 
-# Ensure src is in pythonpath
-sys.path.insert(0, os.path.join(os.getcwd(), "src"))
-
 from doc.backend.scrum import ScrumMaster
-from doc.backend.subprocess_manager import SubprocessManager
+from doc.backend.subprocess_manager import create_subprocess_manager
 from doc.backend.memory import MemoryCore
 
 import argparse
@@ -87,7 +113,7 @@ def main():
     
     # 2. Initialize Components
     # We share the SubprocessManager so we can register our own callbacks
-    sm = SubprocessManager()
+    sm = create_subprocess_manager()
     
     # 1. Establish a GLOBAL Brain Path
     global_brain_path = os.path.abspath(os.path.join(os.getcwd(), ".brain/memory.db"))
@@ -158,9 +184,6 @@ def main():
                 scrum.start_sprint(prompt)
                 loop_count += 1
                 
-                # Sleep to allow state to transition from IDLE -> PLANNING
-                time.sleep(5)
-                
             # 4. Handle STUCK (Awaiting User)
             elif current_state == "AWAITING_USER":
                 print("\n⚠️  Agent is blocked (AWAITING_USER). Injecting safety override.")
@@ -176,54 +199,20 @@ def main():
                 )
                 scrum.start_sprint(override_prompt)
                 
-                # Sleep to allow state to transition
-                time.sleep(5)
-                
             # 5. Handle Rate Limits
             elif current_state == "RATE_LIMITED":
                 print("\n🛑  All Agents Rate Limited.")
-                
-                # Check for reset times
-                wait_seconds = 600 # Default fallback
-                
-                # Try to find the earliest reset time
-                import datetime
-                import dateutil.parser # Might need this, or simple string logic
-                
-                # Retrieve times (assuming they are stored strings like "12am")
-                # Since parsing "12am (EST)" is hard without libs, we stick to the 10 min loop check?
-                # User asked: "read the reset time and continue after that"
-                
-                # Let's inspect registry
-                registry = scrum.agent_registry
-                print(f"   Status: {registry}")
-                
-                # If we have a stored time (which is just a string now), we can display it.
-                # "Sleeping until reset..."
-                # Since we don't have robust NLP date parsing installed by default (maybe), 
-                # we'll stick to a smart poll loop or just sleep 10 mins.
-                # But to satisfy "read reset time", we show it.
-                
-                print(f"⏳ Sleeping for 10 minutes to wait for resets... (Ctrl+C to stop)")
-                try:
-                    time.sleep(600)
-                    # Reset to IDLE to retry
-                    scrum._set_state("IDLE")
-                    # Should we reset registry status?
-                    # Ideally, after sleeping, we assume maybe valid? 
-                    # Or we only reset if time passed.
-                    # Simple hack: Reset 'RATE_LIMITED' status to 'ACTIVE' to try again?
-                    scrum.agent_registry["claude"]["status"] = "ACTIVE"
-                    scrum.agent_registry["codex"]["status"] = "ACTIVE"
-                    
-                except KeyboardInterrupt:
-                    print("🛑 Logic interrupted.")
-                    break
+                # The ScrumMaster reactivates each agent when its window reopens and resumes the
+                # mission itself; just wait for that to happen.
+                resume_at = scrum.rate_limits.next_reset()
+                if resume_at:
+                    print(f"⏳ Resuming at {resume_at.astimezone():%Y-%m-%d %H:%M %Z}... (Ctrl+C to stop)")
+                scrum.wait_for_state(("PLANNING", "IDLE", "AWAITING_USER"))
 
             # 6. Monitor Active State
             else:
-                # Just wait. The registered callback will print logs.
-                time.sleep(2)
+                # Sleep until the sprint settles. The registered callback prints logs meanwhile.
+                scrum.wait_for_state(("IDLE", "AWAITING_USER", "RATE_LIMITED"))
                 
     except KeyboardInterrupt:
         print("\n🛑  Manual Interruption. Shutting down.")
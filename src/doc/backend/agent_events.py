@@ -0,0 +1,168 @@
+import re
+import json
+from typing import List, Optional
+
+# Rate-limit notices as the CLIs print them, e.g. "Limit reached · resets 12am (America/New_York)",
+# "5-hour limit reached ∙ resets 3pm", "Claude AI usage limit reached|1767225600", and codex's
+# "■ You've hit your usage limit. ...". Anchored to the start of a line and to the notice's own
+# suffix, so output that merely mentions a limit ("recursion limit reached") doesn't match.
+_RATE_LIMIT = re.compile(
+    r"^\s*(?:"
+    r"(?:Limit|(?:\d+-hour|[Ww]eekly|Opus) limit) reached\s*[·∙•-]\s*resets\b"
+    r"|Claude AI usage limit reached\|\d{9,}"
+    r"|(?:■\s*)?You've hit your usage limit\b"
+    r")",
+    re.MULTILINE,
+)
+_RESET = re.compile(r"resets\s+(?:at\s+)?(?P<when>[^()\n]+?)\s*(?:\((?P<tz>[^)]+)\)|$|[.;](?:\s|$))", re.IGNORECASE)
+_RESET_EPOCH = re.compile(r"limit reached\|(?P<epoch>\d{9,})", re.IGNORECASE)
+
+class AgentEvent:
+    """One typed event from an agent's output stream.
+
+    kind is one of:
+      text        assistant text (a whole message, a streamed delta, or a plain output line)
+      tool_call   the agent invoked a tool: tool, tool_input
+      usage       token accounting: usage dict (input_tokens, output_tokens, ...)
+      rate_limit  the agent hit its usage limit: reset / reset_tz / reset_epoch when given
+      result      the turn finished: text, is_error
+      system      session bookkeeping (init, session ids)
+    """
+    def __init__(self, kind: str, text: str = "", tool: Optional[str] = None, tool_input=None, usage: Optional[dict] = None,
+                 reset: Optional[str] = None, reset_tz: Optional[str] = None, reset_epoch: Optional[int] = None,
+                 is_error: bool = False, delta: bool = False, raw=None):
+        self.kind = kind
+        self.text = text
+        self.tool = tool
+        self.tool_input = tool_input
+        self.usage = usage
+        self.reset = reset
+        self.reset_tz = reset_tz
+        self.reset_epoch = reset_epoch
+        self.is_error = is_error
+        self.delta = delta
+        self.raw = raw
+
+    def __repr__(self):
+        detail = self.tool or self.reset or (self.text[:40] if self.text else "")
+        return f"AgentEvent({self.kind}, {detail!r})"
+
+
+def rate_limit_event(text: str) -> Optional[AgentEvent]:
+    """A rate_limit event if `text` is a usage-limit notice, else None."""
+    if not text or not _RATE_LIMIT.search(text):
+        return None
+    event = AgentEvent("rate_limit", text)
+    match = _RESET.search(text)
+    if match:
+        event.reset = match.group("when").strip()
+        event.reset_tz = match.group("tz")
+    match = _RESET_EPOCH.search(text)
+    if match:
+        event.reset_epoch = int(match.group("epoch"))
+    return event
+
+
+class EventParser:
+    """Incremental parser for agent output: newline-delimited JSON events or plain text.
+
+    feed() takes arbitrary chunks and returns the events completed so far; nothing beyond
+    the current partial line is buffered. Understands Claude's stream-json (assistant,
+    stream_event deltas, result) and Codex's exec --json (item.*, turn.*) shapes. Lines that
+    aren't JSON objects become text events. Rate-limit notices are reported as an extra
+    rate_limit event after the event that carried them.
+    """
+    def __init__(self):
+        self._partial = ""
+
+    def feed(self, chunk: str) -> List[AgentEvent]:
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines.pop()
+        events = []
+        for line in lines:
+            events.extend(self.feed_line(line))
+        return events
+
+    def close(self) -> List[AgentEvent]:
+        """Parses whatever is left after the final newline."""
+        line, self._partial = self._partial, ""
+        return self.feed_line(line) if line.strip() else []
+
+    def feed_line(self, line: str) -> List[AgentEvent]:
+        line = line.strip()
+        if not line:
+            return []
+        event = None
+        if line.startswith("{"):
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                event = None
+        events = self._from_json(event) if isinstance(event, dict) else [AgentEvent("text", line, raw=line)]
+        notices = []
+        for parsed in events:
+            if parsed.kind in ("text", "result"):
+                notice = rate_limit_event(parsed.text)
+                if notice is not None:
+                    notice.raw = parsed.raw
+                    notices.append(notice)
+                    break
+        return events + notices
+
+    def _from_json(self, event: dict) -> List[AgentEvent]:
+        kind = event.get("type", "")
+        if kind == "assistant":
+            return self._message(event.get("message") or {}, event)
+        if kind == "stream_event":
+            inner = event.get("event") or {}
+            delta = inner.get("delta") or {}
+            if delta.get("type") == "text_delta" and delta.get("text"):
+                return [AgentEvent("text", delta["text"], delta=True, raw=event)]
+            if inner.get("type") == "message_delta" and inner.get("usage"):
+                return [AgentEvent("usage", usage=inner["usage"], raw=event)]
+            return []
+        if kind == "result":
+            events = []
+            if event.get("usage"):
+                events.append(AgentEvent("usage", usage=event["usage"], raw=event))
+            events.append(AgentEvent("result", event.get("result") or "", is_error=bool(event.get("is_error")), raw=event))
+            return events
+        if kind in ("system", "thread.started", "turn.started"):
+            return [AgentEvent("system", event.get("subtype") or kind, raw=event)]
+
+        # Codex exec --json
+        if kind.startswith("item."):
+            item = event.get("item") or {}
+            item_type = item.get("type") or item.get("item_type")
+            if item_type in ("agent_message", "assistant_message") and kind == "item.completed":
+                return [AgentEvent("text", item.get("text", ""), raw=event)]
+            if item_type in ("command_execution", "mcp_tool_call", "file_change", "web_search") and kind == "item.started":
+                return [AgentEvent("tool_call", tool=item_type, tool_input=item.get("command") or item, raw=event)]
+            return []
+        if kind == "turn.completed":
+            events = []
+            if event.get("usage"):
+                events.append(AgentEvent("usage", usage=event["usage"], raw=event))
+            events.append(AgentEvent("result", raw=event))
+            return events
+        if kind in ("turn.failed", "error"):
+            error = event.get("error")
+            message = error.get("message", "") if isinstance(error, dict) else (event.get("message") or str(error or ""))
+            return [AgentEvent("result", message, is_error=True, raw=event)]
+        return []
+
+    def _message(self, message: dict, raw: dict) -> List[AgentEvent]:
+        events = []
+        content = message.get("content") or []
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        for part in content:
+            if not isinstance(part, dict):
+                continue
+            if part.get("type") == "text" and part.get("text"):
+                events.append(AgentEvent("text", part["text"], raw=raw))
+            elif part.get("type") == "tool_use":
+                events.append(AgentEvent("tool_call", tool=part.get("name"), tool_input=part.get("input"), raw=raw))
+        if message.get("usage"):
+            events.append(AgentEvent("usage", usage=message["usage"], raw=raw))
+        return events
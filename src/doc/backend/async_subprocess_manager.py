@@ -0,0 +1,428 @@
+import os
+import errno
+import signal
+import asyncio
+import threading
+import concurrent.futures
+from typing import List, Callable, Dict, Optional
+from .resource_usage import RunStats, ResourceSampler
+from .process_group import KILL_ORPHANS, isolation_kwargs, limited_command, group_alive, signal_group
+from .pty_output import use_pty, open_pty, clean_line
+from .run_log import RUN_LOG_DIR, RunLog, RunLogWriter, new_run_id
+from .scheduler import AgentScheduler, ScheduledRun, RunResult, wait_runs
+from .log_dispatcher import LogDispatcher, LOG_QUEUE_SIZE, LOG_OVERFLOW, LOG_BATCH_LINES, LOG_BATCH_MS
+
+# How long to wait for a finished process's output to drain (grandchildren may hold it open).
+DRAIN_TIMEOUT = 5
+# Max bytes for a single output line before the reader falls back to chunked reads.
+STREAM_LIMIT = 1024 * 1024
+
+class AsyncProcessHandle:
+    """One running agent process. Awaitable completion plus async line iteration."""
+    def __init__(self, name: str, process: asyncio.subprocess.Process, run_id: Optional[str] = None):
+        self.name = name
+        self.run_id = run_id
+        self.process = process
+        self.returncode: Optional[int] = None
+        self.stats = RunStats(name, process.pid)
+        self.record: Optional[dict] = None
+        # Output source: the process's stdout pipe, or a reader on its pseudo-terminal.
+        self.stream: asyncio.StreamReader = process.stdout
+        self.terminal = False
+        self.log: Optional[RunLogWriter] = None
+        self._done = asyncio.Event()
+        self._subscribers: List[asyncio.Queue] = []
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    async def wait(self, timeout: Optional[float] = None) -> Optional[int]:
+        """Waits for the process (and its output) to finish. Returns the exit code, None on timeout."""
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self.returncode
+
+    async def lines(self):
+        """Yields output lines from now until the process exits."""
+        queue: asyncio.Queue = asyncio.Queue()
+        if self._done.is_set():
+            return
+        self._subscribers.append(queue)
+        try:
+            while True:
+                line = await queue.get()
+                if line is None:
+                    return
+                yield line
+        finally:
+            if queue in self._subscribers:
+                self._subscribers.remove(queue)
+
+    def _publish(self, line: Optional[str]):
+        for queue in self._subscribers:
+            queue.put_nowait(line)
+
+
+class AsyncSubprocessManager:
+    """asyncio implementation of SubprocessManager.
+
+    All agent pipes are multiplexed on one event loop instead of one reader thread per
+    process. The loop is either supplied (e.g. the FastAPI server's) or owned by a single
+    background thread. Coroutine API: start / wait / terminate_all and the returned
+    AsyncProcessHandle. The threaded SubprocessManager's blocking API (register_callback,
+    start_subprocess, wait_for_process, kill_all) is kept for existing callers. Both go
+    through the same AgentScheduler concurrency caps as the threaded manager.
+    """
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None, log_queue_size: int = LOG_QUEUE_SIZE, log_overflow: str = LOG_OVERFLOW,
+                 batch_lines: int = LOG_BATCH_LINES, batch_ms: int = LOG_BATCH_MS, scheduler: Optional[AgentScheduler] = None):
+        # Latest running handle per agent name; every running handle by run id.
+        self.active_processes: Dict[str, AsyncProcessHandle] = {}
+        self.runs: Dict[str, AsyncProcessHandle] = {}
+        self.scheduler = scheduler or AgentScheduler()
+        # Handle futures of submitted runs that haven't spawned yet.
+        self._pending: Dict[str, concurrent.futures.Future] = {}
+        self.log_callbacks: List[Callable[[str, str], None]] = []
+        self.run_history: List[dict] = []
+        self.last_run: Dict[str, dict] = {}
+        self._sampler = ResourceSampler()
+        self.run_log_dir: Optional[str] = RUN_LOG_DIR
+        self._run_logs: Dict[str, RunLog] = {}
+        # Callbacks run on the dispatcher thread so a slow one never stalls the event loop.
+        self.dispatcher = LogDispatcher(self.log_callbacks, maxsize=log_queue_size, overflow=log_overflow,
+                                        batch_lines=batch_lines, batch_ms=batch_ms)
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="SubprocessManager-loop", daemon=True).start()
+        self.loop = loop
+
+    def register_callback(self, callback: Callable, batched: bool = False):
+        """Adds a log callback. Batched callbacks receive (name, [lines]) per coalesced chunk."""
+        self.log_callbacks.append(callback)
+        if batched:
+            self.dispatcher.batch_callbacks.add(callback)
+
+    # --- COROUTINE API ---
+
+    async def start(self, name: str, command: List[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+                    limits: Optional[Dict[str, int]] = None, pty: Optional[bool] = None,
+                    priority: int = 0, project: Optional[str] = None) -> AsyncProcessHandle:
+        """Spawns a process in its own process group and starts pumping its output.
+
+        Waits for a scheduler slot first. Raises if the process can't be started. `limits`
+        overrides the DOC_AGENT_RLIMIT_* defaults; `pty` selects pseudo-terminal output
+        (None: per DOC_PTY_AGENTS).
+        """
+        run, spawned = self._submit(name, command, cwd, env, limits, pty, priority, project)
+        try:
+            return await asyncio.wrap_future(spawned)
+        except asyncio.CancelledError:
+            if not self.scheduler.cancel(run.run_id):
+                self.scheduler.finish(run.run_id, "cancelled")
+            raise
+
+    def submit(self, name: str, command: List[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+               limits: Optional[Dict[str, int]] = None, pty: Optional[bool] = None,
+               priority: int = 0, project: Optional[str] = None) -> ScheduledRun:
+        """Queues a run without waiting for it to start. Safe to call from any thread."""
+        return self._submit(name, command, cwd, env, limits, pty, priority, project)[0]
+
+    def _submit(self, name, command, cwd, env, limits, pty, priority, project):
+        spawned = concurrent.futures.Future()
+
+        def launch(run: ScheduledRun) -> bool:
+            asyncio.run_coroutine_threadsafe(self._spawn_run(run, spawned, command, cwd, env, limits, pty), self.loop)
+            return True
+
+        run_id = new_run_id(name)
+        self._pending[run_id] = spawned
+        run = self.scheduler.submit(name, launch, run_id=run_id, project=project or cwd, priority=priority)
+        if run.state == "queued":
+            print(f"[SubprocessManager] {name} queued as {run_id} ({self.scheduler.stats()['running']} running)")
+        return run, spawned
+
+    async def _spawn_run(self, run: ScheduledRun, spawned: concurrent.futures.Future, command, cwd, env, limits, pty):
+        name = run.agent
+        self._pending.pop(run.run_id, None)
+        if spawned.done():
+            return
+        print(f"[SubprocessManager] Starting {name} ({run.run_id}) in {cwd or '.'} with: {' '.join(command)}")
+        try:
+            if use_pty(name) if pty is None else pty:
+                handle = await self._spawn_pty(name, command, cwd, env, limits)
+            else:
+                process = await asyncio.create_subprocess_exec(
+                    *limited_command(command, limits, env),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT,
+                    cwd=cwd,
+                    env=env,
+                    limit=STREAM_LIMIT,
+                    **isolation_kwargs()
+                )
+                handle = AsyncProcessHandle(name, process)
+        except Exception as e:
+            self._broadcast_log(name, f"Failed to start process: {e}")
+            self.scheduler.finish(run.run_id, "failed")
+            spawned.set_exception(e)
+            return
+        handle.run_id = run.run_id
+        self.runs[run.run_id] = handle
+        self.active_processes[name] = handle
+        self._sampler.track(handle.stats)
+        if self.run_log_dir:
+            try:
+                handle.log = RunLogWriter(self.run_log_dir, run.run_id)
+                self._run_logs[name] = RunLog(self.run_log_dir, run.run_id)
+            except OSError as e:
+                print(f"[SubprocessManager] Run log disabled for {name}: {e}")
+        self.loop.create_task(self._pump(handle, run))
+        self.loop.create_task(self._watch_exit(handle, run))
+        spawned.set_result(handle)
+
+    async def _spawn_pty(self, name, command, cwd, env, limits) -> AsyncProcessHandle:
+        master, slave = open_pty()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *limited_command(command, limits, env),
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=slave,
+                stderr=slave,
+                cwd=cwd,
+                env=env,
+                **isolation_kwargs()
+            )
+        except Exception:
+            os.close(master)
+            raise
+        finally:
+            os.close(slave)
+        stream = asyncio.StreamReader(limit=STREAM_LIMIT)
+        await asyncio.get_running_loop().connect_read_pipe(lambda: asyncio.StreamReaderProtocol(stream), os.fdopen(master, "rb", 0))
+        handle = AsyncProcessHandle(name, process)
+        handle.stream = stream
+        handle.terminal = True
+        return handle
+
+    async def wait(self, name: str, timeout: Optional[float] = None) -> bool:
+        """Waits for the agent's latest run (queued or running). Returns False if timed out."""
+        run = self.scheduler.latest(name)
+        if run is None:
+            return True
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, run.exited.wait, timeout):
+            return False
+        # Output may still be draining; the run is done once the pump has accounted for it.
+        await loop.run_in_executor(None, run.done.wait, DRAIN_TIMEOUT)
+        await loop.run_in_executor(None, self.dispatcher.flush, timeout)
+        return True
+
+    async def terminate(self, run_id: str, reason: str = "killed", grace: float = 2) -> bool:
+        """Terminates one run's process group (or drops it from the queue). False if it isn't live."""
+        run = self.scheduler.runs.get(run_id)
+        if run is None:
+            return False
+        if self.scheduler.cancel(run_id):
+            self._fail_pending(run_id)
+            return True
+        handle = self.runs.get(run_id)
+        if handle is None:
+            return False
+        if not run.exited.is_set():
+            run.kill_reason = run.kill_reason or reason
+        print(f"[SubprocessManager] Killing {run_id} ({reason})...")
+        await self._terminate_group(handle, grace)
+        return True
+
+    def _fail_pending(self, run_id: str):
+        spawned = self._pending.pop(run_id, None)
+        if spawned is not None and not spawned.done():
+            spawned.set_exception(RuntimeError(f"{run_id} cancelled before it started"))
+
+    async def terminate_all(self, grace: float = 2, reason: str = "killed"):
+        """Drops queued runs and terminates every running process group: SIGTERM, then SIGKILL after `grace` seconds."""
+        cancelled = self.scheduler.cancel_queued()
+        if cancelled:
+            print(f"[SubprocessManager] Cancelled {cancelled} queued run(s).")
+        for run_id in list(self._pending):
+            run = self.scheduler.runs.get(run_id)
+            if run is None or run.state == "cancelled":
+                self._fail_pending(run_id)
+        for run_id, handle in list(self.runs.items()):
+            try:
+                run = self.scheduler.runs.get(run_id)
+                if run is not None and not run.exited.is_set():
+                    run.kill_reason = run.kill_reason or reason
+                print(f"[SubprocessManager] Killing {run_id}...")
+                await self._terminate_group(handle, grace)
+            except ProcessLookupError:
+                pass
+            except Exception as e:
+                print(f"[SubprocessManager] Failed to kill {run_id}: {e}")
+        self.active_processes.clear()
+
+    async def _terminate_group(self, handle: AsyncProcessHandle, grace: float = 2):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + grace
+        if not signal_group(handle.pid, signal.SIGTERM):
+            if handle.process.returncode is None:
+                handle.process.terminate()
+        try:
+            await asyncio.wait_for(handle.process.wait(), grace)
+        except asyncio.TimeoutError:
+            pass
+        while group_alive(handle.pid) and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        if not signal_group(handle.pid, signal.SIGKILL) and handle.process.returncode is None:
+            handle.process.kill()
+
+    async def _watch_exit(self, handle: AsyncProcessHandle, run: ScheduledRun):
+        """Marks the run exited as soon as the leader does, then terminates whatever it left in its group."""
+        await handle.process.wait()
+        run.exited.set()
+        if KILL_ORPHANS and group_alive(handle.pid):
+            print(f"[SubprocessManager] {run.run_id} exited; terminating processes it left behind.")
+            await self._terminate_group(handle)
+
+    async def _pump(self, handle: AsyncProcessHandle, run: ScheduledRun):
+        stream = handle.stream
+        try:
+            while True:
+                try:
+                    raw = await stream.readline()
+                except ValueError:
+                    # Line longer than STREAM_LIMIT: take what is buffered as one line.
+                    raw = await stream.read(STREAM_LIMIT)
+                except OSError as e:
+                    # A pseudo-terminal reports EIO once the last writer has closed it.
+                    if handle.terminal and e.errno == errno.EIO:
+                        break
+                    raise
+                if not raw:
+                    break
+                run.touch()
+                text = raw.decode("utf-8", errors="replace")
+                if handle.terminal:
+                    text = clean_line(text)
+                handle.stats.add_output(text)
+                if handle.log is not None:
+                    handle.log.write(text)
+                stripped = text.rstrip()
+                if stripped:
+                    handle._publish(stripped)
+                    await self._log(handle.name, stripped)
+        except Exception as e:
+            await self._log(handle.name, f"Error reading stream: {e}")
+        finally:
+            handle.stats.sample()
+            handle.returncode = await handle.process.wait()
+            self._sampler.untrack(handle.stats)
+            # The event loop reaps the child itself, so CPU/RSS come from /proc samples only.
+            handle.record = handle.stats.finish(handle.returncode)
+            handle.record["run_id"] = run.run_id
+            handle.record["queued_s"] = round(run.queued_s, 3)
+            if handle.log is not None:
+                handle.log.close()
+                handle.record["log_path"] = handle.log.path
+            self.last_run[handle.name] = handle.record
+            self.run_history.append(handle.record)
+            await self._log(handle.name, "Process terminated.")
+            self.runs.pop(run.run_id, None)
+            if self.active_processes.get(handle.name) is handle:
+                del self.active_processes[handle.name]
+            handle._publish(None)
+            handle._done.set()
+            self.scheduler.finish(run.run_id, record=handle.record)
+
+    # --- BLOCKING COMPATIBILITY API ---
+
+    def _run(self, coro, timeout: Optional[float] = None):
+        if _running_loop() is self.loop:
+            coro.close()
+            raise RuntimeError("Blocking SubprocessManager API called from its own event loop; await the coroutine API instead.")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def start_subprocess(self, name: str, command: List[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+                         limits: Optional[Dict[str, int]] = None, pty: Optional[bool] = None,
+                         priority: int = 0, project: Optional[str] = None):
+        """Starts a subprocess in a specific directory.
+
+        Returns the ScheduledRun (a queued run counts as started), or False if it failed to start.
+        """
+        run, spawned = self._submit(name, command, cwd, env, limits, pty, priority, project)
+        if run.state != "queued" and _running_loop() is not self.loop:
+            try:
+                spawned.result()
+            except Exception:
+                return False
+        return run if run.state != "failed" else False
+
+    def wait_for_process(self, name: str, timeout: Optional[int] = None) -> bool:
+        """Blocks until the specified process finishes. Returns False if timed out."""
+        return self._run(self.wait(name, timeout))
+
+    def wait_runs(self, runs, timeout: Optional[float] = None, first: bool = False) -> Dict[str, Optional[RunResult]]:
+        """Waits on several runs at once: all of them, or (first=True) until any one ends.
+
+        Returns {run_id: RunResult or None if still going}; finished runs' output has reached the callbacks.
+        """
+        results = wait_runs(runs, timeout, "FIRST_COMPLETED" if first else "ALL_COMPLETED")
+        self.dispatcher.flush(timeout)
+        return results
+
+    def kill_run(self, run_id: str, reason: str = "killed", grace: float = 2) -> bool:
+        """Terminates one run's process group (or drops it from the queue). False if it isn't live."""
+        return self._call_or_schedule(self.terminate(run_id, reason, grace), True)
+
+    def kill_all(self, grace: float = 2, reason: str = "killed"):
+        """Terminates all active processes."""
+        self._call_or_schedule(self.terminate_all(grace, reason))
+
+    def _call_or_schedule(self, coro, scheduled_result=None):
+        if _running_loop() is self.loop:
+            self.loop.create_task(coro)
+            return scheduled_result
+        if threading.current_thread() is self.dispatcher._worker:
+            # Called from a log callback (e.g. rate-limit detection): schedule, don't wait on the loop.
+            asyncio.run_coroutine_threadsafe(coro, self.loop)
+            return scheduled_result
+        return self._run(coro)
+
+    def last_run_stats(self, name: str) -> Optional[dict]:
+        """Completion record (wall, sampled CPU/RSS, output bytes) of the named process's latest run."""
+        return self.last_run.get(name)
+
+    def run_log(self, name: str) -> Optional[RunLog]:
+        """Disk log of the named process's current or latest run (None if run logs are off)."""
+        return self._run_logs.get(name)
+
+    def dispatch_stats(self) -> dict:
+        """Queue depth, high-water mark and dropped/spilled line counters of the log dispatcher."""
+        return self.dispatcher.stats()
+
+    def scheduler_stats(self) -> dict:
+        """Running/queued runs overall and per agent, with their concurrency caps."""
+        return self.scheduler.stats()
+
+    def _broadcast_log(self, name: str, message: str):
+        """Hands a line to the dispatcher. On the loop thread a full queue defers it to an
+        executor thread instead of blocking the loop (and with it every other pipe)."""
+        if _running_loop() is not self.loop:
+            self.dispatcher.submit(name, message)
+        elif not self.dispatcher.try_submit(name, message):
+            self.loop.run_in_executor(None, self.dispatcher.submit, name, message)
+
+    async def _log(self, name: str, message: str):
+        """_broadcast_log for a pipe's reader: waits for room without blocking the loop, so
+        backpressure holds back only this pipe and its lines stay in order."""
+        if not self.dispatcher.try_submit(name, message):
+            await self.loop.run_in_executor(None, self.dispatcher.submit, name, message)
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
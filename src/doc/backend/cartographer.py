@@ -9,10 +9,16 @@ class Cartographer:
             'node_modules', '__pycache__', '.git', '.venv', 'venv', 
             '.brain', 'dist', 'build', '.pytest_cache', '.vscode', '.idea'
         }
+        # Parsed symbols per file, keyed by (mtime_ns, size): unchanged files aren't re-parsed.
+        self._symbols = {}
+        # Bumped whenever the generated map differs from the previous one.
+        self.map_version = 0
+        self.last_map = None
 
     def generate_map(self) -> str:
         """Generates a tree-like string map of the codebase."""
         tree_lines = []
+        symbols_cache = {}
         
         for root, dirs, files in os.walk(self.root_path):
             # Prune ignored directories
@@ -31,16 +37,34 @@ class Cartographer:
                     tree_lines.append(f"{rel_file_path}")
                     
                     # Add symbols
-                    symbols = self._parse_file(full_path, file)
+                    try:
+                        stat = os.stat(full_path)
+                        key = (stat.st_mtime_ns, stat.st_size)
+                    except OSError:
+                        key = None
+                    cached = self._symbols.get(full_path)
+                    if key is not None and cached is not None and cached[0] == key:
+                        symbols = cached[1]
+                    else:
+                        symbols = self._parse_file(full_path, file)
+                    symbols_cache[full_path] = (key, symbols)
                     for sym in symbols:
                         tree_lines.append(f"  {sym}")
                         
-        return "\n".join(tree_lines)
+        self._symbols = symbols_cache
+        content = "\n".join(tree_lines)
+        if content != self.last_map:
+            self.last_map = content
+            self.map_version += 1
+        return content
 
     def save_map(self):
         """Generates and saves the map to .brain/repo_map.txt"""
+        version = self.map_version
         content = self.generate_map()
         map_path = os.path.join(self.root_path, ".brain", "repo_map.txt")
+        if version == self.map_version and os.path.exists(map_path):
+            return map_path  # unchanged since the last save
         os.makedirs(os.path.dirname(map_path), exist_ok=True)
         with open(map_path, "w", encoding="utf-8") as f:
             f.write(content)
@@ -0,0 +1,98 @@
+import os
+import re
+import threading
+from typing import Dict, List, Tuple
+from .memory import parse_cursor
+
+# Newest huddle entries an agent gets verbatim per turn; anything older it hasn't seen goes into its summary.
+CONTEXT_ENTRIES = int(os.getenv("DOC_CONTEXT_ENTRIES", "50"))
+# Lines kept in an agent's running summary of entries it was already sent (oldest dropped first).
+CONTEXT_SUMMARY_LINES = int(os.getenv("DOC_CONTEXT_SUMMARY_LINES", "60"))
+SUMMARY_LINE_CHARS = 160
+
+_WHITESPACE = re.compile(r"\s+")
+
+def summarize_entry(entry: dict, width: int = SUMMARY_LINE_CHARS) -> str:
+    """One line for a huddle entry: agent plus the message squeezed to `width` characters."""
+    text = _WHITESPACE.sub(" ", entry.get("message") or "").strip()
+    if len(text) > width:
+        # Keep both ends: agent output usually states the outcome last.
+        head = width * 2 // 3
+        text = text[:head] + " … " + text[-(width - head - 3):]
+    return f"- {entry.get('agent', 'Unknown')}: {text}"
+
+def format_entries(entries: List[dict]) -> str:
+    """Entries in the same shape as MemoryCore.get_recent_huddle()."""
+    return "\n\n".join(f"**{entry['agent']}**: {entry['message']}" for entry in entries)
+
+
+class ContextCursors:
+    """Which huddle entries each agent has already been sent, per mission.
+
+    take() returns the agent's running summary of everything it was sent before plus the
+    entries added since its last turn. The agent's cursor only moves to the newest entry
+    when advance() reports the turn completed; after a failed turn, reset() makes the next
+    one resend everything. The summary only grows at the end (until it is capped), so
+    consecutive prompts share a long identical prefix.
+    """
+    def __init__(self, memory, max_entries: int = CONTEXT_ENTRIES, summary_lines: int = CONTEXT_SUMMARY_LINES):
+        self.memory = memory
+        self.max_entries = max_entries
+        self.summary_lines = summary_lines
+        self._agents: Dict[Tuple[str, str], dict] = {}
+        self._pending: Dict[Tuple[str, str], dict] = {}  # state each agent moves to once its turn completes
+        self._lock = threading.Lock()
+
+    def take(self, agent: str, mission_id: str = None) -> Tuple[str, str]:
+        """(summary of earlier entries, new entries formatted for the prompt) for `agent`'s next turn."""
+        self.memory.flush()
+        with self._lock:
+            state = self._agents.get((mission_id, agent)) or {"cursor": None, "lines": [], "dropped": 0}
+            entries, cursor = self.memory.since(state["cursor"], mission_id=mission_id)
+            if state["cursor"] is not None and parse_cursor(cursor)[0] != parse_cursor(state["cursor"])[0]:
+                # The huddle was cleared (a new epoch): what the agent saw before is gone.
+                state = {"cursor": None, "lines": [], "dropped": 0}
+            state = dict(state, lines=list(state["lines"]))
+
+            older = entries[:-self.max_entries] if self.max_entries else []
+            recent = entries[len(older):]
+            self._remember(state, older)
+            summary = self._render(state)
+            self._remember(state, recent)
+            state["cursor"] = cursor
+            self._pending[(mission_id, agent)] = state
+        return summary, format_entries(recent)
+
+    def advance(self, agent: str, mission_id: str = None):
+        """Marks what the last take() sent `agent` as seen; call once its turn has completed."""
+        with self._lock:
+            state = self._pending.pop((mission_id, agent), None)
+            if state is not None:
+                self._agents[(mission_id, agent)] = state
+
+    def reset(self, agent: str = None):
+        """Forgets what `agent` (default: every agent) was sent, so its next turn gets the full context."""
+        with self._lock:
+            for states in (self._agents, self._pending):
+                for key in [key for key in states if agent is None or key[1] == agent]:
+                    del states[key]
+
+    def cursor(self, agent: str, mission_id: str = None):
+        state = self._agents.get((mission_id, agent))
+        return state["cursor"] if state else None
+
+    def _remember(self, state: dict, entries: List[dict]):
+        state["lines"].extend(summarize_entry(entry) for entry in entries)
+        excess = len(state["lines"]) - self.summary_lines
+        if excess > 0:
+            del state["lines"][:excess]
+            state["dropped"] += excess
+
+    @staticmethod
+    def _render(state: dict) -> str:
+        if not state["lines"]:
+            return ""
+        lines = list(state["lines"])
+        if state["dropped"]:
+            lines.insert(0, f"- ({state['dropped']} earlier entries not shown)")
+        return "\n".join(lines)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Stand-in for the `claude` / `codex` CLIs, for tests and offline runs.
+
+One-shot mode mirrors `claude --print PROMPT` / `codex -p PROMPT`: print a reply and exit.
+Streaming mode (`--input-format stream-json`) mirrors a long-lived session: read one JSON
+user message per stdin line and answer each with an assistant event followed by a result
+event, newline-delimited JSON on stdout.
+
+Replies depend on the prompt so the ScrumMaster loop can be driven end to end:
+  - "ROLE: QA" in the prompt          -> "STATUS: COMPLETED"
+  - an ARCHITECT prompt asking for
+    "WORK ITEM 1:" / "WORK ITEM 2:"    -> a plan split into those two items
+  - "FAKE_LIMIT" in the prompt        -> a rate-limit notice
+  - anything else                     -> "Work done."
+
+Environment:
+  FAKE_AGENT_DELAY   seconds to "think" before each reply (default 0)
+
+Usage: DOC_CLAUDE_BIN=doc-fake-agent DOC_ENABLE_REAL_AGENTS=true doc
+"""
+import json
+import os
+import sys
+import time
+
+
+def _reply(prompt: str) -> str:
+    if "FAKE_LIMIT" in prompt:
+        return "Limit reached · resets 12am (America/New_York)"
+    if "ROLE: QA" in prompt:
+        return "STATUS: COMPLETED"
+    if "ROLE: ARCHITECT" in prompt and "'WORK ITEM 1:'" in prompt:
+        return "WORK ITEM 1: Build the backend.\nWORK ITEM 2: Build the frontend."
+    return "Work done."
+
+
+def _emit(event: dict):
+    sys.stdout.write(json.dumps(event) + "\n")
+    sys.stdout.flush()
+
+
+def _stream(delay: float):
+    session_id = f"fake-{os.getpid()}"
+    _emit({"type": "system", "subtype": "init", "session_id": session_id})
+    turns = 0
+    for raw in sys.stdin:
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            message = json.loads(raw)
+            content = message.get("message", {}).get("content", "")
+            if isinstance(content, list):
+                content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        except json.JSONDecodeError:
+            content = raw
+        turns += 1
+        started = time.time()
+        time.sleep(delay)
+        text = _reply(content)
+        _emit({"type": "assistant", "session_id": session_id,
+               "message": {"role": "assistant", "content": [{"type": "text", "text": text}]}})
+        _emit({"type": "result", "subtype": "success", "session_id": session_id, "result": text,
+               "num_turns": turns, "duration_ms": int((time.time() - started) * 1000),
+               "usage": {"input_tokens": len(content.split()), "output_tokens": len(text.split())}})
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    delay = float(os.getenv("FAKE_AGENT_DELAY", "0"))
+
+    if "--input-format" in argv and argv[argv.index("--input-format") + 1:][:1] == ["stream-json"]:
+        _stream(delay)
+        return 0
+
+    prompt = ""
+    for flag in ("--print", "-p"):
+        if flag in argv and argv.index(flag) + 1 < len(argv):
+            prompt = argv[argv.index(flag) + 1]
+    time.sleep(delay)
+    print(_reply(prompt), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
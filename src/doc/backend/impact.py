@@ -0,0 +1,186 @@
+import os
+import ast
+from typing import Dict, Iterable, List, Optional, Set
+
+from .parallel_sprint import WorktreeError, WorktreeManager
+
+# Run only the tests affected by the build's changes (Python projects in git); false = always the full suite.
+TEST_IMPACT = os.getenv("DOC_TEST_IMPACT", "true").lower() == "true"
+# Every Nth iteration runs the full suite after the affected tests. 0 = only before COMPLETED.
+FULL_SUITE_EVERY = int(os.getenv("DOC_FULL_TESTS_EVERY", "5"))
+
+IGNORED_DIRS = {'node_modules', '__pycache__', '.git', '.venv', 'venv', '.brain', 'dist', 'build',
+                '.pytest_cache', '.vscode', '.idea'}
+# Changes that can't affect a test run. Anything else that isn't a .py file means "run everything".
+INERT_SUFFIXES = ('.md', '.rst')
+
+def is_test_file(path: str) -> bool:
+    name = os.path.basename(path)
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+class ImportGraph:
+    """Which Python files of a project import which, from their import statements.
+
+    Module names are resolved relative to the project root and to src/ (for src layouts).
+    Files are re-parsed only when their (mtime_ns, size) changes.
+    """
+    def __init__(self, root: str):
+        self.root = root
+        self._imports: Dict[str, tuple] = {}  # relpath -> ((mtime_ns, size), imported module names)
+
+    def _python_files(self) -> List[str]:
+        paths = []
+        for directory, dirs, files in os.walk(self.root):
+            dirs[:] = [d for d in dirs if d not in IGNORED_DIRS and not d.startswith(".")]
+            rel = os.path.relpath(directory, self.root)
+            for name in files:
+                if name.endswith(".py"):
+                    paths.append(os.path.normpath(os.path.join(rel, name)))
+        return paths
+
+    @staticmethod
+    def module_names(path: str) -> List[str]:
+        """Dotted names `path` can be imported as: from the root, and from src/ if it lives there."""
+        parts = path[:-3].replace(os.sep, "/").split("/")
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        names = [".".join(parts)] if parts else []
+        if len(parts) > 1 and parts[0] == "src":
+            names.append(".".join(parts[1:]))
+        return names
+
+    def _parse(self, path: str, package: str) -> Set[str]:
+        try:
+            with open(os.path.join(self.root, path), "r", encoding="utf-8", errors="replace") as f:
+                tree = ast.parse(f.read(), filename=path)
+        except (OSError, SyntaxError, ValueError):
+            return set()
+        names = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names.update(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                base = node.module or ""
+                if node.level:
+                    anchor = package.split(".")[:len(package.split(".")) - node.level + 1] if package else []
+                    base = ".".join(anchor + ([base] if base else []))
+                if base:
+                    names.add(base)
+                # "from pkg import mod" may name a submodule rather than an attribute.
+                names.update(f"{base}.{alias.name}" if base else alias.name for alias in node.names if alias.name != "*")
+        return names
+
+    def build(self) -> Dict[str, Set[str]]:
+        """{relpath: relpaths it imports} for every Python file in the project."""
+        files = self._python_files()
+        modules: Dict[str, str] = {}
+        for path in files:
+            for name in self.module_names(path):
+                modules.setdefault(name, path)
+
+        imports = {}
+        for path in files:
+            try:
+                stat = os.stat(os.path.join(self.root, path))
+                key = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                continue
+            cached = self._imports.get(path)
+            if cached is None or cached[0] != key:
+                names = self.module_names(path)
+                # Relative imports resolve against the package: the module itself for __init__.py.
+                package = names[-1] if names and path.endswith("__init__.py") else (names[-1].rpartition(".")[0] if names else "")
+                cached = (key, self._parse(path, package))
+            imports[path] = cached
+        self._imports = imports
+
+        graph = {}
+        for path, (_, names) in imports.items():
+            deps = set()
+            for name in names:
+                # Importing a.b.c runs a/__init__.py and a/b/__init__.py too.
+                parts = name.split(".")
+                for end in range(1, len(parts) + 1):
+                    target = modules.get(".".join(parts[:end]))
+                    if target and target != path:
+                        deps.add(target)
+            graph[path] = deps
+        return graph
+
+    def dependents(self, changed: Iterable[str]) -> Set[str]:
+        """`changed` plus every file that imports any of them, directly or transitively."""
+        reverse: Dict[str, Set[str]] = {}
+        for path, deps in self.build().items():
+            for dep in deps:
+                reverse.setdefault(dep, set()).add(path)
+        affected = set()
+        pending = [os.path.normpath(path) for path in changed]
+        while pending:
+            path = pending.pop()
+            if path in affected:
+                continue
+            affected.add(path)
+            pending.extend(reverse.get(path, ()))
+        return affected
+
+
+class ImpactAnalyzer:
+    """Picks the test files a build can have affected.
+
+    mark() snapshots the project before the builder starts; select() then diffs the working
+    tree against that snapshot (plus untracked files created or touched since) and follows
+    the import graph from the changed modules to the test files that depend on them.
+    """
+    def __init__(self, root: str):
+        self.root = root
+        self.graph = ImportGraph(root)
+        self._repo = WorktreeManager(root)
+        self._base: Optional[str] = None
+        self._untracked: Dict[str, Optional[int]] = {}  # untracked file -> mtime_ns at mark()
+
+    def mark(self):
+        """Remembers the project as it is now; later changes are measured against it."""
+        self._base = None
+        try:
+            if self._repo.available():
+                self._base = self._repo.snapshot(untracked=False)
+                self._untracked = self._untracked_stamps()
+        except WorktreeError as e:
+            print(f"[Impact] Could not snapshot the project: {e}")
+
+    def _untracked_stamps(self) -> Dict[str, Optional[int]]:
+        # git can't diff untracked files against the snapshot, so their mtimes stand in.
+        stamps = {}
+        for path in self._repo.untracked_files():
+            try:
+                stamps[path] = os.stat(os.path.join(self.root, path)).st_mtime_ns
+            except OSError:
+                stamps[path] = None
+        return stamps
+
+    def changed_files(self) -> Optional[List[str]]:
+        """Files changed since mark(), relative to the root. None if unknown (no git, no mark)."""
+        if self._base is None:
+            return None
+        try:
+            changed = set(self._repo.changed_files(self._base))
+            changed |= {path for path, stamp in self._untracked_stamps().items() if self._untracked.get(path, -1) != stamp}
+        except WorktreeError as e:
+            print(f"[Impact] Could not diff the project: {e}")
+            return None
+        return sorted(path for path in changed if not path.startswith(".brain" + os.sep))
+
+    def select(self) -> Optional[List[str]]:
+        """Test files to run, [] if the changes can't affect any, or None to run the full suite."""
+        changed = self.changed_files()
+        if changed is None:
+            return None
+        for path in changed:
+            if os.path.basename(path) == "conftest.py":
+                return None  # fixtures reach tests without an import
+            if not path.endswith(".py") and not path.endswith(INERT_SUFFIXES):
+                return None  # config, data or non-Python code: can't tell what it touches
+            if path.endswith(".py") and not os.path.exists(os.path.join(self.root, path)):
+                return None  # deleted: whatever imported it is no longer in the graph
+        return sorted(path for path in self.graph.dependents(p for p in changed if p.endswith(".py")) if is_test_file(path))
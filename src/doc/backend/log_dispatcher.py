@@ -0,0 +1,223 @@
+import os
+import json
+import queue
+import tempfile
+import threading
+import time
+from typing import List, Callable, Optional
+
+LOG_QUEUE_SIZE = int(os.getenv("DOC_LOG_QUEUE_SIZE", "10000"))
+LOG_OVERFLOW = os.getenv("DOC_LOG_OVERFLOW", "block")
+# Line coalescing: 0 disables it; otherwise lines are delivered per process in chunks of up to
+# LOG_BATCH_LINES, or whatever has accumulated after LOG_BATCH_MS.
+LOG_BATCH_LINES = int(os.getenv("DOC_LOG_BATCH_LINES", "0"))
+LOG_BATCH_MS = int(os.getenv("DOC_LOG_BATCH_MS", "50"))
+
+OVERFLOW_POLICIES = ("block", "drop-oldest", "spill")
+
+class LogDispatcher:
+    """Bounded hand-off between pipe readers and log callbacks.
+
+    Readers call submit() and return to reading; one dispatcher thread runs the callbacks.
+    When the queue is full the overflow policy decides what happens:
+      - block:       the reader waits (backpressure onto the agent, nothing lost)
+      - drop-oldest: the oldest queued line is discarded to make room
+      - spill:       lines go to a temp file and are replayed in order once the queue drains
+
+    With batch_lines > 1 lines are coalesced per process. Callbacks registered in
+    batch_callbacks receive (name, [lines]) once per chunk; all others still get one
+    (name, line) call per line.
+    """
+    def __init__(self, callbacks: List[Callable[[str, str], None]], maxsize: int = LOG_QUEUE_SIZE, overflow: str = LOG_OVERFLOW,
+                 batch_lines: int = LOG_BATCH_LINES, batch_ms: int = LOG_BATCH_MS):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}' (expected one of {', '.join(OVERFLOW_POLICIES)})")
+        self.callbacks = callbacks
+        self.batch_callbacks = set()
+        self.overflow = overflow
+        self.batch_lines = batch_lines
+        self.batch_latency = batch_ms / 1000.0
+        self._pending = {}  # name -> (first line arrival, [lines]) while coalescing
+        self.batches = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._state = threading.Condition()
+        self._submitted = 0
+        self._dispatched = 0
+        self.max_depth = 0
+        self.dropped = 0
+        self.spilled = 0
+
+        self._spill_lock = threading.Lock()
+        self._spill_file = None
+        self._spill_pending = 0
+
+        self._worker = threading.Thread(target=self._run, name="LogDispatcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, name: str, message: str):
+        item = (name, message)
+        with self._state:
+            self._submitted += 1
+        if threading.current_thread() is self._worker:
+            # A callback logging through the manager: deliver inline rather than deadlock on a full queue.
+            if name in self._pending:
+                self._flush_pending(name)
+            self._deliver(name, [message])
+            return
+
+        if self.overflow == "spill":
+            with self._spill_lock:
+                # Once spilling, everything goes to disk until the backlog is replayed, to keep order.
+                if self._spill_pending == 0:
+                    try:
+                        self._queue.put_nowait(item)
+                        self._track_depth()
+                        return
+                    except queue.Full:
+                        pass
+                self._spill(item)
+            return
+
+        if self.overflow == "drop-oldest":
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self._queue.task_done()
+                        with self._state:
+                            self.dropped += 1
+                            self._dispatched += 1
+                            self._state.notify_all()
+                    except queue.Empty:
+                        pass
+        else:
+            self._queue.put(item)
+        self._track_depth()
+
+    def try_submit(self, name: str, message: str) -> bool:
+        """submit() that never waits: False (and nothing queued) where the block policy would have.
+
+        The other policies never block, so they always accept.
+        """
+        if self.overflow != "block" or threading.current_thread() is self._worker:
+            self.submit(name, message)
+            return True
+        try:
+            self._queue.put_nowait((name, message))
+        except queue.Full:
+            return False
+        with self._state:
+            self._submitted += 1
+        self._track_depth()
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until every line submitted so far has been dispatched (or dropped)."""
+        if threading.current_thread() is self._worker:
+            return True
+        with self._state:
+            target = self._submitted
+            return self._state.wait_for(lambda: self._dispatched >= target, timeout)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_depth": self.max_depth,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "spill_pending": self._spill_pending,
+            "dispatched": self._dispatched,
+            "batches": self.batches,
+        }
+
+    def _track_depth(self):
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def _run(self):
+        while True:
+            item = self._take(self._flush_timeout())
+            if item is not None:
+                name, message = item
+                if self.batch_lines <= 1:
+                    self._deliver(name, [message])
+                    continue
+                _, lines = self._pending.setdefault(name, (time.monotonic(), []))
+                lines.append(message)
+                if len(lines) >= self.batch_lines:
+                    self._flush_pending(name)
+            self._flush_expired()
+
+    def _take(self, timeout: Optional[float]):
+        """Next line in submission order: queue first, then the spill file. None on timeout."""
+        try:
+            if self._spill_pending:
+                item = self._queue.get_nowait()
+            else:
+                item = self._queue.get(timeout=timeout)
+            self._queue.task_done()
+            return item
+        except queue.Empty:
+            return self._unspill() if self._spill_pending else None
+
+    def _flush_timeout(self) -> Optional[float]:
+        if not self._pending:
+            return None
+        oldest = min(started for started, _ in self._pending.values())
+        return max(0.0, oldest + self.batch_latency - time.monotonic())
+
+    def _flush_expired(self):
+        now = time.monotonic()
+        for name, (started, _) in list(self._pending.items()):
+            if now - started >= self.batch_latency:
+                self._flush_pending(name)
+
+    def _flush_pending(self, name: str):
+        _, lines = self._pending.pop(name)
+        self._deliver(name, lines)
+
+    def _deliver(self, name: str, lines: List[str]):
+        for callback in list(self.callbacks):
+            try:
+                if callback in self.batch_callbacks:
+                    callback(name, lines)
+                else:
+                    for line in lines:
+                        callback(name, line)
+            except Exception as e:
+                print(f"Error in callback: {e}")
+        with self._state:
+            self.batches += 1
+            self._dispatched += len(lines)
+            self._state.notify_all()
+
+    # --- SPILL FILE ---
+
+    def _spill(self, item):
+        """Appends an item to the spill file. Caller holds _spill_lock."""
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+            self._spill_read_pos = 0
+        self._spill_file.seek(0, os.SEEK_END)
+        self._spill_file.write(json.dumps(item) + "\n")
+        self._spill_pending += 1
+        self.spilled += 1
+
+    def _unspill(self):
+        with self._spill_lock:
+            if not self._spill_pending:
+                return None
+            self._spill_file.flush()
+            self._spill_file.seek(self._spill_read_pos)
+            line = self._spill_file.readline()
+            self._spill_read_pos = self._spill_file.tell()
+            self._spill_pending -= 1
+            if self._spill_pending == 0:
+                self._spill_file.seek(0)
+                self._spill_file.truncate()
+                self._spill_read_pos = 0
+        return tuple(json.loads(line))
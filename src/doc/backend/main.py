@@ -5,7 +5,7 @@ from pydantic import BaseModel
 import asyncio
 import json
 import os
-from .subprocess_manager import SubprocessManager
+from .subprocess_manager import create_subprocess_manager
 from .scrum import ScrumMaster
 from .memory import MemoryCore
 
@@ -20,7 +20,7 @@ app.add_middleware(
 )
 
 # Initialize Singletons
-subprocess_manager = SubprocessManager()
+subprocess_manager = create_subprocess_manager()
 memory_core = MemoryCore()
 scrum_master = ScrumMaster(subprocess_manager, memory_core)
 
@@ -48,15 +48,16 @@ async def startup_event():
     try:
         loop = asyncio.get_running_loop()
         
-        def async_log_bridge(agent, message):
-             payload = json.dumps({"agent": agent, "message": message})
+        def async_log_bridge(agent, lines):
+             # One frame per coalesced chunk; "message" keeps the single-string shape for old clients.
+             payload = json.dumps({"agent": agent, "message": "\n".join(lines), "lines": lines})
              asyncio.run_coroutine_threadsafe(manager.broadcast(payload), loop)
         
         def async_state_bridge(data):
              payload = json.dumps(data) # data is {"type": "state_change", "state": "..."}
              asyncio.run_coroutine_threadsafe(manager.broadcast(payload), loop)
 
-        subprocess_manager.register_callback(async_log_bridge)
+        subprocess_manager.register_callback(async_log_bridge, batched=True)
         scrum_master.broadcast_func = async_state_bridge
         
     except RuntimeError:
@@ -111,6 +112,42 @@ async def get_huddle():
     except:
         return "No active huddle."
 
+@app.get("/huddle/since")
+async def get_huddle_since(cursor: str = None, mission_id: str = None):
+    """Incremental huddle feed: entries after `cursor` plus the cursor to send next time."""
+    entries, next_cursor = scrum_master.memory.since(cursor, mission_id=mission_id)
+    return {
+        "mission_id": mission_id or scrum_master.memory.mission_id,
+        "cursor": next_cursor,
+        "entries": entries
+    }
+
+@app.get("/stats")
+async def get_run_stats(mission_id: str = None):
+    """Per-phase/agent resource aggregates for a mission (default: the current one)."""
+    return {
+        "mission_id": mission_id or scrum_master.mission_id,
+        "phases": scrum_master.summarize_run_stats(mission_id),
+        "scheduler": subprocess_manager.scheduler_stats()
+    }
+
+@app.get("/logs/{agent}")
+async def get_run_log(agent: str, start: int = None, end: int = None, tail: int = 100):
+    """Raw output of the agent's current or latest run: lines [start, end), or the last `tail` lines."""
+    log = subprocess_manager.run_log(agent)
+    if log is None:
+        return {"agent": agent, "run_id": None, "lines": []}
+    lines = log.read(start, end) if start is not None else log.tail(tail)
+    return {"agent": agent, "run_id": log.run_id, "total": log.line_count(), "lines": lines}
+
+@app.get("/state")
+async def get_state(wait_for: str = None, timeout: float = 30):
+    """Current sprint state. With wait_for=IDLE,AWAITING_USER the request is held until one of
+    those states is reached (or `timeout` seconds pass), so clients needn't poll."""
+    if wait_for:
+        await scrum_master.async_wait_for_state([s.strip() for s in wait_for.split(",") if s.strip()], timeout)
+    return {"state": scrum_master.state, "mission_id": scrum_master.mission_id, "iteration": scrum_master.iteration}
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
@@ -1,21 +1,68 @@
 import chromadb
+from chromadb.errors import NotFoundError
 import os
 import datetime
 import uuid
+import math
+import threading
+import queue
+import atexit
+import weakref
+from concurrent.futures import Future
+from typing import Optional, Tuple
+
+# Collections whose entries are consolidated on insert instead of appended.
+DEDUP_COLLECTIONS = {"skills"}
+# Cosine similarity at or above which two entries count as the same lesson.
+DEDUP_THRESHOLD = 0.92
+# Legacy, unpartitioned huddle collection; used when no mission is active.
+HUDDLE_COLLECTION = "huddle_log"
+# Per-mission huddle collections are named HUDDLE_PREFIX + mission_id.
+HUDDLE_PREFIX = "huddle_m_"
+# Max queued operations the writer thread applies per wake-up; consecutive huddle logs are committed in one add().
+WRITE_BATCH_SIZE = 256
+
+# Cores with a running writer. A weak set: being registered for the exit flush doesn't keep one alive.
+_OPEN_CORES = weakref.WeakSet()
+
+def _flush_open_cores(timeout: float = 5):
+    for core in list(_OPEN_CORES):
+        core.flush(timeout)
+
+atexit.register(_flush_open_cores)
 
 class MemoryCore:
-    def __init__(self, persist_path=".brain/memory.db"):
+    def __init__(self, persist_path=".brain/memory.db", embedding_function=None):
         self.persist_path = persist_path
         self.client = None
+        self.embedding_function = embedding_function
+        self.dedup_threshold = DEDUP_THRESHOLD
+        self.mission_id = None
+        self._seq_lock = threading.Lock()
+        self._last_seq = {}  # huddle collection name -> highest sequence number written
+        self._epochs = {}  # huddle collection name -> id of the collection _last_seq describes
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        # The writer only holds a weak reference, so an abandoned core can be collected; its finalizer stops the thread.
+        self._writer = threading.Thread(target=MemoryCore._writer_loop, args=(weakref.ref(self), self._queue),
+                                        name="MemoryCore-writer", daemon=True)
+        self._writer.start()
+        weakref.finalize(self, self._queue.put, ("stop", None, None))
+        _OPEN_CORES.add(self)
         self._init_client(persist_path)
         self.project_path = os.path.dirname(os.path.dirname(os.path.abspath(persist_path))) # Initialize project_path
 
     def _init_client(self, path):
-        """Initializes or re-initializes the ChromaDB client."""
+        """Initializes or re-initializes the ChromaDB client (after pending writes land in the old one)."""
+        self._call(self._open_client, path)
+
+    def _open_client(self, path):
         try:
             abs_path = os.path.abspath(path)
             os.makedirs(abs_path, exist_ok=True)
             self.client = chromadb.PersistentClient(path=abs_path)
+            self._last_seq = {}
+            self._epochs = {}
             print(f"[MemoryCore] Database loaded at {abs_path}")
         except Exception as e:
             print(f"[MemoryCore] Failed to load DB at {path}: {e}")
@@ -44,54 +91,379 @@ class MemoryCore:
             self.persist_path = new_db_path
             self._init_client(new_db_path)
 
+    def _get_collection(self, name: str):
+        """Returns the named collection, bound to the configured embedding function."""
+        if self.embedding_function is not None:
+            return self.client.get_or_create_collection(name=name, embedding_function=self.embedding_function)
+        return self.client.get_or_create_collection(name=name)
+
+    def _find_collection(self, name: str):
+        """The named collection, or None if it doesn't exist. Read-only: only the writer creates collections."""
+        try:
+            if self.embedding_function is not None:
+                return self.client.get_collection(name=name, embedding_function=self.embedding_function)
+            return self.client.get_collection(name=name)
+        except NotFoundError:
+            return None
+
+    # --- WRITER THREAD ---
+    # Every mutation runs on one dedicated thread. Producers only enqueue (SimpleQueue.put
+    # never blocks); readers that must observe their own writes call flush() first.
+
+    @staticmethod
+    def _writer_loop(core_ref, ops):
+        while True:
+            batch = [ops.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(ops.get_nowait())
+                except queue.Empty:
+                    break
+            core = core_ref()
+            stopped = core is None or core._apply(batch)
+            # Queued calls hold bound methods of the core: drop them before blocking again, or it is never collected.
+            del core, batch
+            if stopped:
+                MemoryCore._reject_pending(ops)
+                return
+
+    @staticmethod
+    def _reject_pending(ops):
+        """Fails whatever was queued after the stop request, so no caller waits on a writer that is gone."""
+        while True:
+            try:
+                kind, payload, future = ops.get_nowait()[:3]
+            except queue.Empty:
+                return
+            if kind == "call":
+                future.set_exception(RuntimeError("MemoryCore is closed"))
+            elif kind == "barrier":
+                payload.set()
+
+    def _apply(self, batch) -> bool:
+        """Applies a batch of queued operations. True if it ended with a stop request."""
+        pending_logs = []
+        for op in batch:
+            if op[0] == "log":
+                pending_logs.append(op[1:])
+                continue
+            self._commit_logs(pending_logs)
+            pending_logs = []
+
+            kind, payload, future = op
+            if kind == "call":
+                fn, args = payload
+                try:
+                    future.set_result(fn(*args))
+                except Exception as e:
+                    future.set_exception(e)
+            elif kind == "barrier":
+                payload.set()
+            else:  # stop; anything batched after it is rejected like later arrivals
+                for rest in batch[batch.index(op) + 1:]:
+                    self._queue.put(rest)
+                return True
+        self._commit_logs(pending_logs)
+        return False
+
+    def _call(self, fn, *args):
+        """Runs `fn` on the writer thread and returns its result."""
+        if threading.current_thread() is self._writer:
+            return fn(*args)
+        if self._closed:
+            raise RuntimeError("MemoryCore is closed")
+        future = Future()
+        self._queue.put(("call", (fn, args), future))
+        return future.result()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Blocks until every write enqueued before this call has been applied."""
+        if threading.current_thread() is self._writer:
+            return True
+        if self._closed:
+            return False
+        done = threading.Event()
+        self._queue.put(("barrier", done, None))
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5):
+        """Applies every pending write and stops the writer thread. The core can't be used afterwards."""
+        self._closed = True
+        _OPEN_CORES.discard(self)
+        if self._writer.is_alive() and threading.current_thread() is not self._writer:
+            self._queue.put(("stop", None, None))
+            self._writer.join(timeout)
+
     def add_memory(self, collection_name: str, document: str, metadata: dict = None):
+        """Stores a document. Returns the id of the stored (or merged-into) entry."""
+        return self._call(self._write_memory, collection_name, document, metadata)
+
+    def _write_memory(self, collection_name: str, document: str, metadata: dict = None):
         try:
-            collection = self.client.get_or_create_collection(name=collection_name)
+            collection = self._get_collection(collection_name)
+            if collection_name in DEDUP_COLLECTIONS:
+                return self._add_or_merge(collection, document, metadata or {})
+
+            entry_id = str(uuid.uuid4())
             collection.add(
                 documents=[document],
                 metadatas=[metadata or {}],
-                ids=[str(uuid.uuid4())]
+                ids=[entry_id]
             )
+            return entry_id
         except Exception as e:
             print(f"[MemoryCore] Error adding memory: {e}")
+            return None
 
-    def query_memory(self, collection_name: str, query_text: str, n_results: int = 3):
+    def _add_or_merge(self, collection, document: str, metadata: dict):
+        """Inserts a document unless a near-duplicate exists, in which case its counter is bumped."""
+        embedding = self._embed(collection, document)
+        if collection.count() > 0:
+            nearest = collection.query(
+                query_embeddings=[embedding],
+                n_results=1,
+                include=["embeddings", "metadatas"]
+            )
+            if nearest["ids"] and nearest["ids"][0]:
+                match_id = nearest["ids"][0][0]
+                similarity = _cosine_similarity(embedding, nearest["embeddings"][0][0])
+                if similarity >= self.dedup_threshold:
+                    merged = dict(nearest["metadatas"][0][0] or {})
+                    merged["count"] = int(merged.get("count", 1)) + 1
+                    merged["last_seen"] = metadata.get("timestamp", datetime.datetime.now().isoformat())
+                    if "task" in metadata:
+                        merged["last_task"] = metadata["task"]
+                    collection.update(ids=[match_id], metadatas=[merged])
+                    return match_id
+
+        entry_id = str(uuid.uuid4())
+        stored = dict(metadata)
+        stored.setdefault("count", 1)
+        collection.add(
+            documents=[document],
+            embeddings=[embedding],
+            metadatas=[stored],
+            ids=[entry_id]
+        )
+        return entry_id
+
+    def _embed(self, collection, document: str):
+        """Embeds a single document with the same function the collection uses."""
+        embedding_function = self.embedding_function or collection._embedding_function
+        return [float(x) for x in embedding_function([document])[0]]
+
+    def compact_collection(self, collection_name: str = "skills", threshold: float = None) -> int:
+        """One-shot consolidation of near-duplicate entries. Returns the number of entries removed."""
+        return self._call(self._compact, collection_name, threshold)
+
+    def _compact(self, collection_name: str, threshold: float = None) -> int:
+        threshold = self.dedup_threshold if threshold is None else threshold
         try:
-            collection = self.client.get_or_create_collection(name=collection_name)
+            collection = self._get_collection(collection_name)
             if collection.count() == 0:
+                return 0
+            results = collection.get(include=["embeddings", "metadatas"])
+
+            # Oldest entry of each cluster survives and absorbs the counters of the others.
+            entries = sorted(
+                zip(results["ids"], results["embeddings"], results["metadatas"]),
+                key=lambda e: (e[2] or {}).get("timestamp", "")
+            )
+            kept = []  # [(id, embedding, metadata)]
+            updates = {}
+            removed = []
+            for entry_id, embedding, meta in entries:
+                meta = dict(meta or {})
+                for kept_id, kept_embedding, kept_meta in kept:
+                    if _cosine_similarity(embedding, kept_embedding) >= threshold:
+                        kept_meta["count"] = int(kept_meta.get("count", 1)) + int(meta.get("count", 1))
+                        if meta.get("timestamp"):
+                            kept_meta["last_seen"] = meta["timestamp"]
+                        updates[kept_id] = kept_meta
+                        removed.append(entry_id)
+                        break
+                else:
+                    kept.append((entry_id, embedding, meta))
+
+            if updates:
+                collection.update(ids=list(updates), metadatas=list(updates.values()))
+            if removed:
+                collection.delete(ids=removed)
+            print(f"[MemoryCore] Compacted '{collection_name}': {len(removed)} duplicates merged, {len(kept)} kept.")
+            return len(removed)
+        except Exception as e:
+            print(f"[MemoryCore] Error compacting {collection_name}: {e}")
+            return 0
+
+    def query_memory(self, collection_name: str, query_text: str, n_results: int = 3):
+        self.flush()
+        try:
+            collection = self._find_collection(collection_name)
+            if collection is None or collection.count() == 0:
                 return {"documents": [[]], "metadatas": [[]]}
             return collection.query(query_texts=[query_text], n_results=n_results)
         except Exception as e:
             print(f"[MemoryCore] Error querying memory: {e}")
             return {"documents": [[]], "metadatas": [[]]}
 
+    # --- MISSION PARTITIONS ---
+
+    def start_mission(self, mission_id: str = None) -> str:
+        """Opens a fresh huddle partition and makes it the active one."""
+        if mission_id is None:
+            mission_id = f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        self.mission_id = mission_id
+        print(f"[MemoryCore] Mission {mission_id} started.")
+        return mission_id
+
+    def _huddle_name(self, mission_id: str = None) -> str:
+        mission_id = mission_id or self.mission_id
+        return f"{HUDDLE_PREFIX}{mission_id}" if mission_id else HUDDLE_COLLECTION
+
+    def list_missions(self) -> list:
+        """Returns the ids of all missions with a huddle partition, oldest first."""
+        self.flush()
+        try:
+            names = [c if isinstance(c, str) else c.name for c in self.client.list_collections()]
+            return sorted(n[len(HUDDLE_PREFIX):] for n in names if n.startswith(HUDDLE_PREFIX))
+        except Exception as e:
+            print(f"[MemoryCore] Error listing missions: {e}")
+            return []
+
+    def drop_mission(self, mission_id: str):
+        """Deletes a mission's whole huddle partition in one operation."""
+        self._call(self._drop_mission, mission_id)
+
+    def _drop_mission(self, mission_id: str):
+        try:
+            name = self._huddle_name(mission_id)
+            self.client.delete_collection(name)
+            self._forget_seq(name)
+            if mission_id == self.mission_id:
+                self.mission_id = None
+            print(f"[MemoryCore] Mission {mission_id} dropped.")
+        except Exception as e:
+            print(f"[MemoryCore] Error dropping mission {mission_id}: {e}")
+
+    def archive_mission(self, mission_id: str):
+        """Writes a mission's huddle to .brain/logs, then drops its partition."""
+        content = self.get_recent_huddle(limit=None, mission_id=mission_id)
+        path = self.archive_huddle(content)
+        self.drop_mission(mission_id)
+        return path
+
     # --- HUDDLE / CHAT LOGIC ---
 
     def log_interaction(self, agent: str, message: str, type: str = "info"):
-        """Logs a chat interaction to the huddle_log collection."""
+        """Queues a chat interaction for the active mission's huddle collection. Never blocks on the DB."""
+        if self._closed:
+            print(f"[MemoryCore] Closed; dropping huddle entry from {agent}.")
+            return
+        # Partition and timestamp are fixed at call time, not when the writer gets to it.
+        self._queue.put(("log", self._huddle_name(), self.mission_id, agent, message, type, datetime.datetime.now()))
+
+    def _commit_logs(self, entries):
+        """Writes queued huddle entries, one add() per consecutive run targeting the same collection."""
+        start = 0
+        while start < len(entries):
+            name = entries[start][0]
+            end = start
+            while end < len(entries) and entries[end][0] == name:
+                end += 1
+            self._commit_log_run(name, entries[start:end])
+            start = end
+
+    def _commit_log_run(self, name, entries):
         try:
-            collection = self.client.get_or_create_collection(name="huddle_log")
-            timestamp = datetime.datetime.now().isoformat()
-            
-            # Use monotonic time or a sortable string for simple sorting if purely chronologial retrieval is needed
-            # For simplicity, we trust insertion order or sort by timestamp metadata later.
-            # Adding a strictly increasing ID can help sorting.
-            unique_id = f"{datetime.datetime.now().timestamp()}-{uuid.uuid4()}"
+            collection = self._get_collection(name)
+            with self._seq_lock:
+                seq = self._current_seq(name, collection)
+                ids, documents, metadatas = [], [], []
+                for _, mission_id, agent, message, type, when in entries:
+                    seq += 1
+                    metadata = {"agent": agent, "type": type, "timestamp": when.isoformat(), "seq": seq}
+                    if mission_id:
+                        metadata["mission_id"] = mission_id
+                    # Timestamp-prefixed ids keep lexical order == chronological order.
+                    ids.append(f"{when.timestamp()}-{uuid.uuid4()}")
+                    documents.append(message)
+                    metadatas.append(metadata)
 
-            collection.add(
-                documents=[message],
-                metadatas=[{"agent": agent, "type": type, "timestamp": timestamp}],
-                ids=[unique_id]
-            )
+                collection.add(documents=documents, metadatas=metadatas, ids=ids)
+                self._last_seq[name] = seq
+                self._epochs[name] = str(collection.id)
         except Exception as e:
             print(f"[MemoryCore] Error logging interaction: {e}")
 
-    def get_recent_huddle(self, limit: int = 20) -> str:
-        """Retrieves and formats the recent chat history."""
+    def _current_seq(self, name: str, collection) -> int:
+        """Highest sequence number in a huddle collection; scanned once, then tracked in memory."""
+        if name not in self._last_seq:
+            seqs = [m.get("seq", 0) for m in collection.get(include=["metadatas"])["metadatas"] if m]
+            self._last_seq[name] = max(seqs, default=0)
+            self._epochs[name] = str(collection.id)
+        return self._last_seq[name]
+
+    def _forget_seq(self, name: str):
+        with self._seq_lock:
+            self._last_seq.pop(name, None)
+            self._epochs.pop(name, None)
+
+    def since(self, cursor=None, mission_id: str = None):
+        """Returns (entries, new_cursor) for huddle entries written after `cursor`, oldest first.
+
+        Each entry is a dict with seq, agent, message, type and timestamp. Cursors are
+        "<epoch>:<seq>" strings; the epoch names one incarnation of the partition, so a
+        cursor taken before clear_huddle() replays the refilled partition from its start
+        (the new cursor's epoch differs; see parse_cursor()). None or 0 reads from the start.
+        When nothing has been written since `cursor` no database access is made.
+        """
+        epoch, seq = parse_cursor(cursor)
         try:
-            collection = self.client.get_or_create_collection(name="huddle_log")
-            count = collection.count()
-            if count == 0:
+            name = self._huddle_name(mission_id)
+            with self._seq_lock:
+                known, latest = self._epochs.get(name), self._last_seq.get(name)
+            # A bare-int cursor ahead of `latest` may predate a clear, so it takes the slow path below.
+            if known is not None and (epoch == known or (epoch is None and seq == latest)) and latest <= seq:
+                return [], format_cursor(known, seq)
+
+            collection = self._find_collection(name)
+            if collection is None:
+                with self._seq_lock:
+                    # Nothing written yet; the writer records the real epoch when it creates the partition.
+                    self._last_seq.setdefault(name, 0)
+                    self._epochs.setdefault(name, "")
+                return [], format_cursor("", 0)
+            with self._seq_lock:
+                latest = self._current_seq(name, collection)
+                known = self._epochs[name]
+            if epoch not in (None, known) or latest < seq:
+                seq = 0  # Partition was cleared since the caller last read; replay from the start.
+            if latest <= seq:
+                return [], format_cursor(known, seq)
+
+            results = collection.get(where={"seq": {"$gt": seq}}, include=["metadatas", "documents"])
+            entries = [
+                {
+                    "seq": meta["seq"],
+                    "agent": meta.get("agent", "Unknown"),
+                    "message": doc,
+                    "type": meta.get("type", "info"),
+                    "timestamp": meta.get("timestamp"),
+                }
+                for doc, meta in zip(results["documents"], results["metadatas"])
+            ]
+            entries.sort(key=lambda e: e["seq"])
+            return entries, format_cursor(known, entries[-1]["seq"] if entries else seq)
+        except Exception as e:
+            print(f"[MemoryCore] Error reading huddle since {cursor}: {e}")
+            return [], cursor
+
+    def get_recent_huddle(self, limit: int = 20, mission_id: str = None) -> str:
+        """Retrieves and formats the recent chat history of the active (or given) mission."""
+        self.flush()
+        try:
+            collection = self._find_collection(self._huddle_name(mission_id))
+            if collection is None or collection.count() == 0:
                 return "*Huddle is empty*"
 
             # Chroma doesn't strictly support "last N" easily without logic.
@@ -113,8 +485,8 @@ class MemoryCore:
             # Sort by ID (which starts with timestamp) ensures valid order
             zipped.sort(key=lambda x: x[0]) 
             
-            # Take last 'limit'
-            recent = zipped[-limit:]
+            # Take last 'limit' (None keeps everything)
+            recent = zipped[-limit:] if limit else zipped
             
             formatted_lines = []
             for _, doc, meta in recent:
@@ -127,10 +499,11 @@ class MemoryCore:
             return f"*Error reading Huddle: {e}*"
 
     def get_latest_status(self) -> str:
-        """Checks the most recent message to see mission status."""
+        """Checks the most recent message of the active mission to see its status."""
+        self.flush()
         try:
-            collection = self.client.get_or_create_collection(name="huddle_log")
-            if collection.count() == 0:
+            collection = self._find_collection(self._huddle_name())
+            if collection is None or collection.count() == 0:
                 return "IDLE"
 
             # Get last one
@@ -149,9 +522,32 @@ class MemoryCore:
             return "IDLE"
 
     def clear_huddle(self):
-        """Wipes the huddle log."""
+        """Wipes the active mission's huddle log."""
+        self._call(self._clear_huddle)
+
+    def _clear_huddle(self):
         try:
-            self.client.delete_collection("huddle_log")
+            name = self._huddle_name()
+            self.client.delete_collection(name)
+            self._forget_seq(name)
             print("[MemoryCore] Huddle cleared.")
         except Exception as e:
-            print(f"[MemoryCore] Error clearing huddle: {e}")
\ No newline at end of file
+            print(f"[MemoryCore] Error clearing huddle: {e}")
+
+
+def format_cursor(epoch: str, seq: int) -> str:
+    return f"{epoch}:{seq}"
+
+def parse_cursor(cursor) -> Tuple[Optional[str], int]:
+    """Splits a since() cursor into (epoch, seq). A bare int (or None) has no epoch: it is trusted as-is."""
+    if not cursor:
+        return None, 0
+    if isinstance(cursor, int):
+        return None, cursor
+    epoch, _, seq = str(cursor).rpartition(":")
+    return epoch or None, int(seq)
+
+def _cosine_similarity(a, b) -> float:
+    dot = sum(float(x) * float(y) for x, y in zip(a, b))
+    norm = math.sqrt(sum(float(x) * float(x) for x in a)) * math.sqrt(sum(float(y) * float(y) for y in b))
+    return dot / norm if norm else 0.0
@@ -0,0 +1,202 @@
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+# Build with both agents at once, each on its own git worktree, then merge and cross-review.
+PARALLEL_SPRINT = os.getenv("DOC_PARALLEL_SPRINT", "false").lower() == "true"
+# Where the per-agent worktrees live. Unset = <project>/.brain/worktrees.
+WORKTREE_DIR = os.getenv("DOC_WORKTREE_DIR")
+# Diff shown to the cross-reviewer is capped at this many characters.
+REVIEW_DIFF_CHARS = 8000
+# Linux ioctl that clones a file's extents (copy-on-write).
+FICLONE = 0x40049409
+
+_WORK_ITEM = re.compile(r"WORK ITEM (\d+):\s*(.*?)(?=WORK ITEM \d+:|\n\s*\n|\*\*[^*\n]+\*\*:|$)", re.DOTALL)
+
+def split_work_items(plan: str, count: int = 2) -> List[str]:
+    """The latest plan's "WORK ITEM n:" entries, or [] if it doesn't name `count` of them."""
+    items: Dict[int, str] = {}
+    for match in _WORK_ITEM.finditer(plan or ""):
+        number, text = int(match.group(1)), match.group(2).strip()
+        if text:
+            items[number] = text  # later plans overwrite earlier ones
+    if not all(n in items for n in range(1, count + 1)):
+        return []
+    return [items[n] for n in range(1, count + 1)]
+
+
+class WorktreeError(Exception):
+    pass
+
+
+class WorktreeManager:
+    """One git worktree (and branch) per agent, forked from the project's current HEAD
+    (or a given commit).
+
+    Agents build in their worktree without seeing each other's half-done edits; afterwards
+    each branch is committed and merged back into the project's checked-out branch. A merge
+    that conflicts is aborted and its branch kept for the user. checkpoint() first commits
+    whatever is pending on disk, so forks see it and merges land on a clean tree.
+    """
+    def __init__(self, repo_path: str, root: Optional[str] = None):
+        self.repo_path = repo_path
+        self.root = root or WORKTREE_DIR or os.path.join(repo_path, ".brain", "worktrees")
+        self.base: Optional[str] = None
+        self.worktrees: Dict[str, Tuple[str, str]] = {}  # name -> (path, branch)
+
+    def _git(self, args: List[str], cwd: Optional[str] = None, check: bool = True,
+             env: Optional[Dict[str, str]] = None) -> subprocess.CompletedProcess:
+        result = subprocess.run(["git"] + args, cwd=cwd or self.repo_path, capture_output=True, text=True, env=env)
+        if check and result.returncode != 0:
+            raise WorktreeError(f"git {' '.join(args[:2])} failed: {(result.stderr or result.stdout).strip()}")
+        return result
+
+    def available(self) -> bool:
+        """True if the project is a git repository with at least one commit."""
+        if shutil.which("git") is None:
+            return False
+        return self._git(["rev-parse", "--verify", "HEAD"], check=False).returncode == 0
+
+    def _identity(self) -> List[str]:
+        # Commits made on the agents' behalf fall back to a local identity if git has none.
+        if self._git(["config", "user.email"], check=False).stdout.strip():
+            return []
+        return ["-c", "user.name=DOC", "-c", "user.email=doc@localhost"]
+
+    def snapshot(self, untracked: bool = True) -> str:
+        """Commit id of the project as it is on disk: HEAD plus uncommitted changes, including
+        untracked files unless untracked=False.
+
+        Built in a scratch copy of the index, so the real index and working tree are left alone.
+        .brain (DOC's own state) and the worktrees' root, if it is inside the project, are left out.
+        """
+        head = self._git(["rev-parse", "HEAD"]).stdout.strip()
+        root = os.path.relpath(self.root, self.repo_path)
+        inside = not root.startswith(os.pardir)
+        scratch = tempfile.mkdtemp(prefix="doc-snapshot-")
+        env = dict(os.environ, GIT_INDEX_FILE=os.path.join(scratch, "index"))
+        try:
+            index = os.path.join(self.repo_path, self._git(["rev-parse", "--git-path", "index"]).stdout.strip())
+            if os.path.exists(index):
+                shutil.copyfile(index, env["GIT_INDEX_FILE"])  # keeps staged new files
+            else:
+                self._git(["read-tree", head], env=env)
+            excludes = [":(exclude).brain"] + ([f":(exclude){root}"] if inside else [])
+            self._git(["add", "-A" if untracked else "-u", "--", "."] + excludes, env=env)
+            if inside:
+                self._git(["rm", "-r", "-q", "--cached", "--ignore-unmatch", "--", root], env=env)
+            tree = self._git(["write-tree"], env=env).stdout.strip()
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        if tree == self._git(["rev-parse", "HEAD^{tree}"]).stdout.strip():
+            return head
+        return self._git(self._identity() + ["commit-tree", tree, "-p", head, "-m", "DOC snapshot"]).stdout.strip()
+
+    def checkpoint(self, message: str) -> bool:
+        """Commits the project's pending changes, untracked files included, on the checked-out branch.
+
+        .brain (DOC's own state) is never committed. False if there was nothing to commit.
+        """
+        self._git(["add", "-A", "--", ".", ":(exclude).brain"])
+        if self._git(["diff", "--cached", "--quiet"], check=False).returncode == 0:
+            return False
+        self._git(self._identity() + ["commit", "-q", "-m", message])
+        return True
+
+    def changed_files(self, since: str) -> List[str]:
+        """Tracked files whose content on disk differs from commit `since`, relative to the project."""
+        output = self._git(["diff", "--name-only", "--relative", since]).stdout
+        return [os.path.normpath(line) for line in output.splitlines() if line]
+
+    def untracked_files(self) -> List[str]:
+        """Untracked files that aren't ignored, relative to the project."""
+        output = self._git(["ls-files", "--others", "--exclude-standard"]).stdout
+        return [os.path.normpath(line) for line in output.splitlines() if line]
+
+    def create(self, name: str, branch: str, base: Optional[str] = None) -> str:
+        """Adds a worktree for `name` on a new `branch` at `base` (default: HEAD). Returns its path."""
+        if base is None:
+            if self.base is None:
+                self.base = self._git(["rev-parse", "HEAD"]).stdout.strip()
+            base = self.base
+        path = os.path.join(self.root, name)
+        if os.path.exists(path):
+            self._git(["worktree", "remove", "--force", path], check=False)
+            shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
+        self._git(["worktree", "prune"], check=False)
+        self._git(["worktree", "add", "-q", "-B", branch, path, base])
+        self.worktrees[name] = (path, branch)
+        print(f"[Worktrees] {name} -> {path} ({branch})")
+        return path
+
+    def commit_all(self, name: str, message: str) -> bool:
+        """Commits everything the agent left in its worktree. False if there was nothing to commit.
+
+        .brain (DOC's own state) is never committed.
+        """
+        path, _ = self.worktrees[name]
+        self._git(["add", "-A", "--", ".", ":(exclude).brain"], cwd=path)
+        if self._git(["diff", "--cached", "--quiet"], cwd=path, check=False).returncode == 0:
+            return False
+        self._git(self._identity() + ["commit", "-q", "-m", message], cwd=path)
+        return True
+
+    def diff(self, name: str, limit: int = REVIEW_DIFF_CHARS) -> str:
+        """What `name`'s branch changed since the fork point (committed work only)."""
+        _, branch = self.worktrees[name]
+        diff = self._git(["diff", f"{self.base}...{branch}"], check=False).stdout
+        if len(diff) > limit:
+            diff = diff[:limit] + f"\n... ({len(diff) - limit} more characters)"
+        return diff
+
+    def merge(self, name: str) -> Tuple[bool, str]:
+        """Merges `name`'s branch into the checked-out branch. On conflict the merge is aborted."""
+        _, branch = self.worktrees[name]
+        result = self._git(self._identity() + ["merge", "--no-ff", "--no-edit", "-m", f"Merge {branch}", branch], check=False)
+        output = (result.stdout + result.stderr).strip()
+        if result.returncode != 0:
+            self._git(["merge", "--abort"], check=False)
+            return False, output
+        return True, output
+
+    def remove(self, name: str, delete_branch: bool = True, discard: bool = False):
+        """Removes `name`'s worktree. Its branch is deleted if merged, or whatever it holds with discard=True."""
+        path, branch = self.worktrees.pop(name)
+        self._git(["worktree", "remove", "--force", path], check=False)
+        shutil.rmtree(path, ignore_errors=True)
+        if delete_branch:
+            # -d refuses unmerged branches, so work that didn't merge survives for the user.
+            self._git(["branch", "-D" if discard else "-d", branch], check=False)
+
+    def cleanup(self, keep_branches: bool = False):
+        """Removes every worktree; deletes their branches unless asked to keep them (or unmerged)."""
+        for name in list(self.worktrees):
+            self.remove(name, delete_branch=not keep_branches)
+        self._git(["worktree", "prune"], check=False)
+
+
+def _reflink(src: str, dst: str, follow_symlinks: bool = True):
+    """copy2 that shares the source's blocks copy-on-write where the filesystem can (btrfs, XFS)."""
+    if sys.platform.startswith("linux") and follow_symlinks and os.path.isfile(src):
+        import fcntl
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            shutil.copystat(src, dst)
+            return dst
+        except OSError:
+            pass  # not supported here (ext4, tmpfs, across devices): plain copy
+    return shutil.copy2(src, dst, follow_symlinks=follow_symlinks)
+
+def clone_tree(src: str, dst: str, ignore=None) -> str:
+    """copytree with copy-on-write file clones where supported, plain copies elsewhere.
+
+    Hardlinks would be cheaper still but aren't safe: an agent rewriting a file in place
+    would change the source tree too.
+    """
+    return shutil.copytree(src, dst, ignore=ignore, copy_function=_reflink)
@@ -0,0 +1,107 @@
+import os
+import sys
+import time
+import errno
+import shutil
+import signal
+import subprocess
+from typing import Dict, List, Optional
+
+# Optional per-agent resource limits, set by a small wrapper that then execs the agent. Unset = unlimited.
+#   DOC_AGENT_RLIMIT_AS      address space, bytes
+#   DOC_AGENT_RLIMIT_CPU     CPU seconds
+#   DOC_AGENT_RLIMIT_NOFILE  open files
+#   DOC_AGENT_RLIMIT_NPROC   processes for the user
+RLIMIT_ENV = {
+    "as": "DOC_AGENT_RLIMIT_AS",
+    "cpu": "DOC_AGENT_RLIMIT_CPU",
+    "nofile": "DOC_AGENT_RLIMIT_NOFILE",
+    "nproc": "DOC_AGENT_RLIMIT_NPROC",
+}
+# Tear down whatever a finished agent left running in its process group (dev servers, watchers).
+KILL_ORPHANS = os.getenv("DOC_KILL_ORPHANS", "true").lower() == "true"
+
+def default_limits() -> Dict[str, int]:
+    return {key: int(os.environ[var]) for key, var in RLIMIT_ENV.items() if os.environ.get(var)}
+
+def isolation_kwargs() -> dict:
+    """Popen kwargs that put the child in its own session/process group."""
+    if os.name != "posix":
+        return {}
+    return {"start_new_session": True}
+
+# Runs in a fresh interpreter: sets the limits given as key=value, then execs the command after "--".
+# A separate process instead of preexec_fn, which can deadlock a child forked from a threaded parent.
+_RLIMIT_EXEC = """
+import os, resource, sys
+split = sys.argv.index("--")
+for spec in sys.argv[1:split]:
+    key, value = spec.split("=")
+    which = getattr(resource, "RLIMIT_" + key.upper())
+    hard = resource.getrlimit(which)[1]
+    value = int(value) if hard == resource.RLIM_INFINITY else min(int(value), hard)
+    resource.setrlimit(which, (value, hard))
+os.execvp(sys.argv[split + 1], sys.argv[split + 1:])
+"""
+
+def limited_command(command: List[str], limits: Optional[Dict[str, int]] = None, env: Optional[Dict[str, str]] = None) -> List[str]:
+    """`command`, wrapped so it execs with the given rlimits (default: DOC_AGENT_RLIMIT_*) already set.
+
+    Unchanged when there are no limits. A missing executable still raises FileNotFoundError here,
+    as Popen would, rather than surfacing as the wrapper's exit code.
+    """
+    limits = default_limits() if limits is None else limits
+    if os.name != "posix" or not limits:
+        return command
+    unknown = set(limits) - set(RLIMIT_ENV)
+    if unknown:
+        raise ValueError(f"Unknown rlimit(s): {', '.join(sorted(unknown))}")
+    if os.sep not in command[0] and not shutil.which(command[0], path=(env or os.environ).get("PATH")):
+        raise FileNotFoundError(errno.ENOENT, "No such file or directory", command[0])
+    specs = [f"{key}={int(value)}" for key, value in limits.items()]
+    return [sys.executable, "-I", "-S", "-c", _RLIMIT_EXEC, *specs, "--", *command]
+
+def group_alive(pgid: int) -> bool:
+    if not hasattr(os, "killpg"):
+        return False
+    try:
+        os.killpg(pgid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+def signal_group(pgid: int, sig: int) -> bool:
+    """Sends `sig` to a whole process group. False if the group no longer exists."""
+    if not hasattr(os, "killpg"):
+        return False
+    try:
+        os.killpg(pgid, sig)
+        return True
+    except ProcessLookupError:
+        return False
+
+def terminate_group(process: subprocess.Popen, grace: float = 2) -> None:
+    """SIGTERM the process's group, escalate to SIGKILL for anything alive after `grace` seconds.
+
+    Works after the leader has exited: with start_new_session the group id is the leader's
+    pid and stays valid while any member is alive.
+    """
+    if os.name != "posix":
+        process.terminate()
+        try:
+            process.wait(timeout=grace)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        return
+
+    pgid = process.pid
+    if not signal_group(pgid, signal.SIGTERM):
+        return
+    deadline = time.monotonic() + grace
+    while time.monotonic() < deadline:
+        if process.poll() is not None and not group_alive(pgid):
+            return
+        time.sleep(0.05)
+    signal_group(pgid, signal.SIGKILL)
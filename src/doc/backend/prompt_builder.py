@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+from typing import Callable, Dict, Hashable, List, Optional
+
+# Token budget per prompt, by role ("NAVIGATOR=24000,DRIVER=16000"); DOC_PROMPT_BUDGET for the rest.
+PROMPT_BUDGET = int(os.getenv("DOC_PROMPT_BUDGET", "16000"))
+
+def _parse_budgets(spec: str) -> Dict[str, int]:
+    budgets = {}
+    for item in spec.split(","):
+        if "=" in item:
+            role, value = item.split("=", 1)
+            budgets[role.strip()] = int(value)
+    return budgets
+
+PROMPT_BUDGETS = _parse_budgets(os.getenv("DOC_PROMPT_BUDGETS", "NAVIGATOR=24000,DRIVER=16000,REVIEWER=16000"))
+# Rough size of a token in characters; close enough for English text and code.
+CHARS_PER_TOKEN = 4
+# The prompt travels as one argv element, which Linux caps at 128 KiB (MAX_ARG_STRLEN).
+MAX_ARG_BYTES = 128 * 1024 - 1 if sys.platform.startswith("linux") else None
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+class Segment:
+    """One part of a prompt. When the prompt is over budget, segments are trimmed lowest
+    priority first:
+      none   never trimmed
+      head   drop whole units (separator-delimited) from the start, e.g. the oldest history
+      tail   drop units from the end, e.g. the bottom of the repo map
+      drop   all or nothing
+    prefix (a label like "HISTORY:\\n") is kept whenever any of the text is.
+    """
+    def __init__(self, name: str, text: str, priority: int = 0, trim: str = "none",
+                 separator: str = "\n", prefix: str = ""):
+        self.name = name
+        self.text = "" if text is None else str(text)
+        self.priority = priority
+        self.trim = trim
+        self.separator = separator
+        self.prefix = prefix
+        self.tokens = estimate_tokens(prefix + self.text) if self.text else 0
+
+    def render(self) -> str:
+        return self.prefix + self.text if self.text else ""
+
+    def trimmed(self, max_tokens: int) -> "Segment":
+        """A copy cut down to about `max_tokens` (same segment if it already fits)."""
+        if self.tokens <= max_tokens or self.trim == "none":
+            return self
+        if self.trim == "drop" or max_tokens <= estimate_tokens(self.prefix):
+            return Segment(self.name, "", self.priority, self.trim, self.separator, self.prefix)
+        units = self.text.split(self.separator)
+        if self.trim == "head":
+            units.reverse()
+        budget = (max_tokens - estimate_tokens(self.prefix)) * CHARS_PER_TOKEN
+        kept, used = [], 0
+        for unit in units:
+            used += len(unit) + len(self.separator)
+            if used > budget:
+                break
+            kept.append(unit)
+        omitted = len(units) - len(kept)
+        if omitted == 0:
+            return self
+        if self.trim == "head":
+            kept.reverse()
+            text = f"({omitted} earlier entries omitted)" + self.separator + self.separator.join(kept)
+        else:
+            text = self.separator.join(kept) + self.separator + f"... ({omitted} more lines omitted)"
+        return Segment(self.name, text, self.priority, self.trim, self.separator, self.prefix)
+
+
+class PromptBuilder:
+    """Assembles prompts from segments under a per-role token budget.
+
+    Segments that rarely change (repo map, skills) go through cached(): they are produced
+    and measured once per cache key and reused on later turns. Each build() logs the
+    estimated size, what was trimmed and how long it took.
+    """
+    def __init__(self, budgets: Optional[Dict[str, int]] = None, default_budget: int = PROMPT_BUDGET,
+                 max_bytes: Optional[int] = MAX_ARG_BYTES):
+        self.budgets = dict(PROMPT_BUDGETS if budgets is None else budgets)
+        self.default_budget = default_budget
+        self.max_bytes = max_bytes
+        self.last_build: Optional[dict] = None
+        self._cache: Dict[str, tuple] = {}
+
+    def budget_for(self, role: str) -> int:
+        return self.budgets.get(role, self.default_budget)
+
+    def cached(self, name: str, key: Hashable, produce: Callable[[], str], **segment_args) -> Segment:
+        """The segment `name` as last produced for `key`; calls produce() only when the key changes."""
+        entry = self._cache.get(name)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        segment = Segment(name, produce(), **segment_args)
+        self._cache[name] = (key, segment)
+        return segment
+
+    def build(self, role: str, segments: List[Segment]) -> str:
+        started = time.perf_counter()
+        budget = self.budget_for(role)
+        fitted = self._fit(segments, budget)
+        prompt = "".join(segment.render() for segment in fitted)
+        size = len(prompt.encode("utf-8"))
+        if self.max_bytes and size > self.max_bytes:
+            # Multi-byte text outgrew the argument limit within budget: scale the budget to fit.
+            tokens = sum(segment.tokens for segment in fitted)
+            fitted = self._fit(segments, int(tokens * self.max_bytes / size * 0.95))
+            prompt = "".join(segment.render() for segment in fitted)
+            size = len(prompt.encode("utf-8"))
+
+        trimmed = {a.name: a.tokens - b.tokens for a, b in zip(segments, fitted) if b.tokens < a.tokens}
+        tokens = sum(segment.tokens for segment in fitted)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.last_build = {"role": role, "tokens": tokens, "budget": budget, "bytes": size,
+                           "build_ms": round(elapsed_ms, 2), "trimmed": trimmed}
+        details = f"; trimmed {', '.join(f'{name} -{cut}' for name, cut in trimmed.items())}" if trimmed else ""
+        print(f"[PromptBuilder] {role}: ~{tokens}/{budget} tokens, {size} B, built in {elapsed_ms:.1f} ms{details}")
+        return prompt
+
+    @staticmethod
+    def _fit(segments: List[Segment], budget: int) -> List[Segment]:
+        fitted = list(segments)
+        over = sum(segment.tokens for segment in fitted) - budget
+        for index in sorted(range(len(fitted)), key=lambda i: fitted[i].priority):
+            if over <= 0:
+                break
+            segment = fitted[index]
+            fitted[index] = segment.trimmed(max(0, segment.tokens - over))
+            over -= segment.tokens - fitted[index].tokens
+        return fitted
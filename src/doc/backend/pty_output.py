@@ -0,0 +1,78 @@
+import os
+import re
+import errno
+from typing import Iterator, Tuple
+
+# Agents whose output is read through a pseudo-terminal instead of a pipe, comma separated
+# (e.g. "claude,codex"). CLIs that block-buffer a piped stdout flush per line on a TTY.
+PTY_AGENTS = {a.strip() for a in os.getenv("DOC_PTY_AGENTS", "").split(",") if a.strip()}
+# Terminal width reported to the child, wide enough that CLIs don't hard-wrap their lines.
+PTY_COLUMNS = 500
+
+# CSI (colours, cursor movement), OSC (titles, hyperlinks) and two-byte escapes.
+_ESCAPE = re.compile(r"\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)|\x1b[@-Z\\-_]")
+_CONTROL = re.compile(r"[\x00-\x08\x0b-\x1f\x7f]")
+
+def use_pty(name: str) -> bool:
+    return os.name == "posix" and name in PTY_AGENTS
+
+def clean_line(line: str) -> str:
+    """Strips escape sequences and control characters from one line of terminal output.
+
+    A line ending ("\n", "\r\n" or "\r") is normalised to "\n". Inside the line a carriage
+    return redraws it (spinners, progress bars), so only the text after the last one is kept.
+    """
+    line = _ESCAPE.sub("", line)
+    newline = "\n" if line.endswith("\n") else ""
+    line = line[:-1] if newline else line
+    line = line.rstrip("\r")
+    if "\r" in line:
+        line = line.rsplit("\r", 1)[1]
+    return _CONTROL.sub("", line) + newline
+
+def open_pty() -> Tuple[int, int]:
+    """Returns (master_fd, slave_fd) for a raw-output terminal of PTY_COLUMNS columns."""
+    import pty
+    import fcntl
+    import struct
+    import termios
+    master, slave = pty.openpty()
+    fcntl.ioctl(slave, termios.TIOCSWINSZ, struct.pack("HHHH", 50, PTY_COLUMNS, 0, 0))
+    attrs = termios.tcgetattr(slave)
+    attrs[1] &= ~termios.OPOST  # no "\n" -> "\r\n" translation
+    attrs[3] &= ~termios.ECHO
+    termios.tcsetattr(slave, termios.TCSANOW, attrs)
+    return master, slave
+
+def split_lines(buffer: str, chunk: str) -> Tuple[list, str]:
+    """Appends a decoded chunk to a partial line; returns (complete lines, new partial)."""
+    lines = (buffer + chunk).split("\n")
+    return lines[:-1], lines[-1]
+
+def read_pty_lines(master: int, chunk_size: int = 65536) -> Iterator[str]:
+    """Yields lines as the child writes them, until every writer has closed the terminal.
+
+    Lines keep their trailing newline (like file iteration) so byte accounting matches pipes.
+    """
+    import codecs
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    partial = ""
+    try:
+        while True:
+            try:
+                data = os.read(master, chunk_size)
+            except OSError as e:
+                # Linux reports EIO on the master once the last slave fd is closed.
+                if e.errno == errno.EIO:
+                    break
+                raise
+            if not data:
+                break
+            lines, partial = split_lines(partial, decoder.decode(data))
+            for line in lines:
+                yield line + "\n"
+        partial += decoder.decode(b"", final=True)
+        if partial:
+            yield partial
+    finally:
+        os.close(master)
@@ -0,0 +1,161 @@
+import os
+import re
+import datetime
+import threading
+from typing import Callable, Dict, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Wait after a notice whose reset time can't be read; doubles with each such notice in a row.
+RATE_LIMIT_BACKOFF = float(os.getenv("DOC_RATE_LIMIT_BACKOFF", "300"))
+RATE_LIMIT_BACKOFF_MAX = float(os.getenv("DOC_RATE_LIMIT_BACKOFF_MAX", "3600"))
+# Seconds to wait past a parsed reset time, so the retry doesn't land before the window reopens.
+RESET_MARGIN = float(os.getenv("DOC_RATE_LIMIT_MARGIN", "30"))
+# A bare time of day this far in the past is read as "just reset" rather than "tomorrow".
+_RECENT_RESET = datetime.timedelta(minutes=15)
+
+_MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+# "12am", "3:30 pm", "15:00", "Jan 5, 3pm", "Oct 20 at 9am"
+_CLOCK = re.compile(r"^(?:(?P<month>[a-z]{3})[a-z]*\.?\s+(?P<day>\d{1,2})(?:st|nd|rd|th)?,?\s+(?:at\s+)?)?"
+                    r"(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<ampm>am|pm)?$")
+# "in 2 hours", "in 45 minutes", "in 1h 30m"
+_RELATIVE = re.compile(r"^in\s+(?:(?P<hours>\d+)\s*h(?:ours?|rs?)?)?\s*(?:(?P<minutes>\d+)\s*m(?:in(?:ute)?s?)?)?$")
+
+def _zone(name: Optional[str]) -> datetime.tzinfo:
+    """The named IANA zone, or the machine's local zone if it is missing or unknown."""
+    if name:
+        try:
+            return ZoneInfo(name.strip())
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return datetime.datetime.now().astimezone().tzinfo
+
+def parse_reset(reset: Optional[str], reset_tz: Optional[str] = None, reset_epoch: Optional[int] = None,
+                now: Optional[datetime.datetime] = None) -> Optional[datetime.datetime]:
+    """When a rate limit lifts, as a timezone-aware datetime, or None if the notice doesn't say.
+
+    `reset` is the time as printed ("12am", "3:30pm", "Jan 5, 3pm", "in 2 hours") and is read
+    in `reset_tz` (default: local time). A bare time of day is its next occurrence after `now`.
+    """
+    if reset_epoch:
+        return datetime.datetime.fromtimestamp(reset_epoch, datetime.timezone.utc)
+    if not reset:
+        return None
+    zone = _zone(reset_tz)
+    now = (now or datetime.datetime.now(datetime.timezone.utc)).astimezone(zone)
+    text = " ".join(reset.lower().split())
+
+    match = _RELATIVE.match(text)
+    if match and (match.group("hours") or match.group("minutes")):
+        return now + datetime.timedelta(hours=int(match.group("hours") or 0), minutes=int(match.group("minutes") or 0))
+    if text in ("midnight", "noon"):
+        text = "12am" if text == "midnight" else "12pm"
+    match = _CLOCK.match(text)
+    if not match:
+        return None
+
+    hour, minute = int(match.group("hour")), int(match.group("minute") or 0)
+    if match.group("ampm"):
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if match.group("ampm") == "pm" else 0)
+    if hour > 23 or minute > 59:
+        return None
+    try:
+        if match.group("month"):
+            month = _MONTHS.index(match.group("month")) + 1
+            reset_at = now.replace(month=month, day=int(match.group("day")), hour=hour, minute=minute, second=0, microsecond=0)
+            if reset_at < now - datetime.timedelta(days=180):
+                reset_at = reset_at.replace(year=now.year + 1)  # "Jan 2" seen in late December
+            return reset_at
+    except ValueError:
+        return None
+    reset_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if reset_at < now - _RECENT_RESET:
+        reset_at += datetime.timedelta(days=1)  # wall-clock arithmetic: same time tomorrow across DST
+    return reset_at
+
+
+class RateLimitScheduler:
+    """When each rate-limited agent may run again, with a timer that calls on_reset(agent) then.
+
+    A notice with a readable reset time resumes the agent RESET_MARGIN after it. Without one
+    (or with one that has already passed) the agent waits RATE_LIMIT_BACKOFF, doubling for
+    every such notice until succeeded() reports a good turn.
+    """
+    def __init__(self, on_reset: Callable[[str], None], backoff: float = RATE_LIMIT_BACKOFF,
+                 backoff_max: float = RATE_LIMIT_BACKOFF_MAX, margin: float = RESET_MARGIN):
+        self.on_reset = on_reset
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.margin = margin
+        self._resume_at: Dict[str, datetime.datetime] = {}
+        self._failures: Dict[str, int] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+
+    def limit(self, agent: str, event, now: Optional[datetime.datetime] = None) -> datetime.datetime:
+        """Records a rate_limit AgentEvent for `agent`; returns when it will be reactivated."""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        reset_at = parse_reset(event.reset, event.reset_tz, event.reset_epoch, now)
+        with self._lock:
+            if reset_at is not None and reset_at + datetime.timedelta(seconds=self.margin) > now:
+                resume_at = reset_at + datetime.timedelta(seconds=self.margin)
+                how = f"resets {reset_at.isoformat(timespec='minutes')}"
+            else:
+                failures = self._failures.get(agent, 0)
+                self._failures[agent] = failures + 1
+                delay = min(self.backoff_max, self.backoff * 2 ** failures)
+                resume_at = now + datetime.timedelta(seconds=delay)
+                how = f"no usable reset time in {event.reset or event.text[:80]!r}; backing off {delay:.0f}s"
+            # A second notice from the same window never brings the retry forward.
+            resume_at = max(resume_at, self._resume_at.get(agent, resume_at))
+            self._resume_at[agent] = resume_at
+            self._schedule(agent, (resume_at - now).total_seconds())
+        print(f"[RateLimits] {agent}: {how}; resuming at {resume_at.astimezone().strftime('%Y-%m-%d %H:%M:%S %Z')}")
+        return resume_at
+
+    def succeeded(self, agent: str):
+        """A turn went through: the next unreadable notice starts the backoff from the beginning."""
+        with self._lock:
+            self._failures.pop(agent, None)
+
+    def resume_at(self, agent: str) -> Optional[datetime.datetime]:
+        return self._resume_at.get(agent)
+
+    def next_reset(self) -> Optional[datetime.datetime]:
+        """The earliest pending reactivation, or None if no agent is waiting."""
+        with self._lock:
+            return min(self._resume_at.values(), default=None)
+
+    def cancel_all(self):
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+            self._resume_at.clear()
+
+    def _schedule(self, agent: str, delay: float):
+        """(Re)arms `agent`'s timer. Caller holds the lock."""
+        previous = self._timers.pop(agent, None)
+        if previous is not None:
+            previous.cancel()
+        timer = threading.Timer(max(0.0, delay), self._fire, args=(agent,))
+        timer.daemon = True
+        self._timers[agent] = timer
+        timer.start()
+
+    def _fire(self, agent: str):
+        with self._lock:
+            resume_at = self._resume_at.get(agent)
+            if resume_at is None:
+                return
+            left = (resume_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+            if left > 1:
+                self._schedule(agent, left)  # the timer's clock and the wall clock drifted apart
+                return
+            del self._resume_at[agent]
+            self._timers.pop(agent, None)
+        try:
+            self.on_reset(agent)
+        except Exception as e:
+            print(f"[RateLimits] Reactivating {agent} failed: {e}")
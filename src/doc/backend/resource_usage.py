@@ -0,0 +1,213 @@
+import os
+import sys
+import time
+import signal
+import datetime
+import threading
+import subprocess
+from typing import Dict, List, Optional
+from .process_group import isolation_kwargs, limited_command, signal_group
+
+# Seconds between /proc samples of running processes.
+SAMPLE_INTERVAL = float(os.getenv("DOC_PROC_SAMPLE_INTERVAL", "0.5"))
+
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+# wait_with_rusage reaps with os.wait4 behind Popen's back, which is only safe while holding
+# Popen's private _waitpid_lock: a CPython implementation detail, checked on the versions below.
+# Elsewhere runs are reaped with plain wait() and their figures come from the /proc samples.
+_WAIT4_REAP = (hasattr(os, "wait4") and sys.implementation.name == "cpython"
+               and (3, 8) <= sys.version_info[:2] <= (3, 13))
+
+def read_proc(pid: int, pgrp: Optional[int] = None) -> Optional[dict]:
+    """Current CPU and memory of a live process from /proc. None where /proc isn't available,
+    or if the process isn't in process group `pgrp` (when given).
+
+    CPU includes the children the process has already waited for.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            # comm may contain spaces; fields after the closing paren are fixed.
+            fields = f.read().rsplit(")", 1)[1].split()
+        if pgrp is not None and int(fields[2]) != pgrp:
+            return None
+        sample = {
+            "cpu_user_s": (int(fields[11]) + int(fields[13])) / _CLK_TCK,
+            "cpu_sys_s": (int(fields[12]) + int(fields[14])) / _CLK_TCK,
+        }
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    sample["peak_rss_kb"] = int(line.split()[1])
+                elif line.startswith("VmRSS:"):
+                    sample["rss_kb"] = int(line.split()[1])
+        return sample
+    except (OSError, IndexError, ValueError):
+        return None
+
+def read_group(pgid: int) -> Optional[dict]:
+    """read_proc summed over every live member of process group `pgid`.
+
+    peak_rss_kb is the larger of the group's current total RSS and the leader's own
+    high-water mark. None where /proc isn't available or the group is gone.
+    """
+    try:
+        pids = [int(entry) for entry in os.listdir("/proc") if entry.isdigit()]
+    except OSError:
+        return None
+    members = {pid: sample for pid, sample in ((pid, read_proc(pid, pgrp=pgid)) for pid in pids) if sample}
+    if not members:
+        return None
+    total = {key: sum(m.get(key, 0) for m in members.values()) for key in ("cpu_user_s", "cpu_sys_s", "rss_kb")}
+    total["peak_rss_kb"] = max(total["rss_kb"], members.get(pgid, {}).get("peak_rss_kb", 0))
+    return total
+
+
+class RunStats:
+    """Resource accounting for one process run; finish() produces the completion record."""
+    def __init__(self, name: str, pid: int):
+        self.name = name
+        self.pid = pid
+        self.started_at = datetime.datetime.now().isoformat()
+        self._start = time.monotonic()
+        self.output_bytes = 0
+        self.output_lines = 0
+        self.sampled: dict = {}
+        self.rusage: Optional[dict] = None  # exact figures from wait4, once reaped
+
+    def add_output(self, line: str):
+        self.output_bytes += len(line.encode("utf-8", errors="replace"))
+        self.output_lines += 1
+
+    def sample(self):
+        """Samples the run's whole process group (the leader's pid is its group id)."""
+        current = read_group(self.pid)
+        if current:
+            # Members that exit (and are reaped outside the group) drop out of the sums: keep the highs.
+            merged = {key: max(self.sampled.get(key, 0), current.get(key, 0))
+                      for key in ("cpu_user_s", "cpu_sys_s", "peak_rss_kb")}
+            self.sampled = dict(current, **merged)
+
+    def finish(self, exit_code: Optional[int], rusage: Optional[dict] = None) -> dict:
+        record = {
+            "name": self.name,
+            "pid": self.pid,
+            "started_at": self.started_at,
+            "exit_code": exit_code,
+            "wall_s": round(time.monotonic() - self._start, 3),
+            "cpu_user_s": None,
+            "cpu_sys_s": None,
+            "peak_rss_kb": None,
+            "output_bytes": self.output_bytes,
+            "output_lines": self.output_lines,
+        }
+        # rusage from wait4 is exact for the leader and the children it waited for; the /proc samples
+        # also see the rest of its process group (but may miss the last interval). Take the larger.
+        for key in ("cpu_user_s", "cpu_sys_s"):
+            values = [v for v in (self.sampled.get(key), (rusage or {}).get(key)) if v is not None]
+            if values:
+                record[key] = round(max(values), 3)
+        peaks = [p for p in (self.sampled.get("peak_rss_kb"), (rusage or {}).get("peak_rss_kb")) if p]
+        if peaks:
+            record["peak_rss_kb"] = max(peaks)
+        return record
+
+
+class ResourceSampler:
+    """One background thread sampling /proc for every tracked run."""
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self._runs: Dict[int, RunStats] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def track(self, stats: RunStats):
+        with self._lock:
+            self._runs[stats.pid] = stats
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="ResourceSampler", daemon=True)
+                self._thread.start()
+
+    def untrack(self, stats: RunStats):
+        with self._lock:
+            if self._runs.get(stats.pid) is stats:
+                del self._runs[stats.pid]
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                runs = list(self._runs.values())
+            for stats in runs:
+                stats.sample()
+            time.sleep(self.interval)
+
+
+def wait_with_rusage(process: subprocess.Popen) -> Optional[dict]:
+    """Reaps `process` via os.wait4 and returns its CPU time and peak RSS.
+
+    Holds the Popen's own waitpid lock so concurrent Popen.wait(timeout=...) callers simply
+    observe the return code we set. Returns None (after a plain wait) if rusage isn't available
+    or this interpreter isn't one where that lock is known to exist (see _WAIT4_REAP). The
+    rusage covers the leader and the children it waited for, not the rest of its group.
+    """
+    lock = getattr(process, "_waitpid_lock", None) if _WAIT4_REAP else None
+    if lock is None:
+        process.wait()
+        return None
+    with lock:
+        if process.returncode is not None:
+            return None
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+        except ChildProcessError:
+            usage = None
+        else:
+            process.returncode = os.waitstatus_to_exitcode(status)
+    if usage is None:
+        process.wait()
+        return None
+    return {"cpu_user_s": usage.ru_utime, "cpu_sys_s": usage.ru_stime, "peak_rss_kb": usage.ru_maxrss}
+
+
+_sampler = ResourceSampler()
+
+def run_measured(command: List[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None, timeout: Optional[float] = None):
+    """subprocess.run replacement that also accounts resources.
+
+    Returns (returncode, combined stdout/stderr, stats). A run that exceeds `timeout` is
+    killed and reported with stats["timed_out"] = True.
+    """
+    process = subprocess.Popen(limited_command(command, env=env), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, cwd=cwd, env=env,
+                               **isolation_kwargs())
+    stats = RunStats(os.path.basename(command[0]), process.pid)
+    _sampler.track(stats)  # wait4 alone misses a test runner's worker processes
+    chunks = []
+
+    def read():
+        for line in process.stdout:
+            stats.add_output(line)
+            chunks.append(line)
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    timed_out = threading.Event()
+
+    def expire():
+        timed_out.set()
+        # The whole group: a test runner's workers would otherwise keep the pipe open.
+        if not signal_group(process.pid, signal.SIGKILL):
+            process.kill()
+
+    killer = threading.Timer(timeout, expire) if timeout else None
+    if killer:
+        killer.start()
+    try:
+        usage = wait_with_rusage(process)
+    finally:
+        if killer:
+            killer.cancel()
+        _sampler.untrack(stats)
+    reader.join(5)
+    record = stats.finish(process.returncode, usage)
+    record["timed_out"] = timed_out.is_set()
+    return process.returncode, "".join(chunks), record
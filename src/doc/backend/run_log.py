@@ -0,0 +1,160 @@
+import os
+import time
+import mmap
+import array
+import datetime
+import uuid
+from typing import List, Optional
+
+# Directory for per-run agent output files. Unset = don't write run logs (ScrumMaster points it
+# at <project>/.brain/logs).
+RUN_LOG_DIR = os.getenv("DOC_RUN_LOG_DIR")
+# Every Nth line's byte offset goes into the index; a range read scans at most N-1 lines to find its start.
+RUN_LOG_INDEX_EVERY = int(os.getenv("DOC_RUN_LOG_INDEX_EVERY", "256"))
+FLUSH_INTERVAL = 0.5
+
+def run_log_paths(log_dir: str, run_id: str):
+    return os.path.join(log_dir, f"{run_id}.log"), os.path.join(log_dir, f"{run_id}.idx")
+
+def new_run_id(name: str) -> str:
+    """Unique id of one process run; also names its log files."""
+    return f"{name}-{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+class RunLogWriter:
+    """Append-only raw output of one process run, plus a sparse line-offset index.
+
+    <run_id>.log holds the output bytes as produced. <run_id>.idx is a flat array of
+    native uint64: the byte offset of line 0, N, 2N, ... (N = index_every).
+    """
+    def __init__(self, log_dir: str, run_id: str, index_every: int = RUN_LOG_INDEX_EVERY):
+        os.makedirs(log_dir, exist_ok=True)
+        self.run_id = run_id
+        self.path, self.index_path = run_log_paths(log_dir, run_id)
+        self.index_every = max(1, index_every)
+        self.lines = 0
+        self._offset = 0
+        self._flushed_at = time.monotonic()
+        self._log = open(self.path, "ab")
+        self._index = open(self.index_path, "ab")
+
+    def write(self, line: str):
+        data = line.encode("utf-8", errors="replace")
+        if not data.endswith(b"\n"):
+            data += b"\n"
+        if self.lines % self.index_every == 0:
+            self._index.write(array.array("Q", [self._offset]).tobytes())
+        self._log.write(data)
+        self._offset += len(data)
+        self.lines += 1
+        # Readers tail live runs; keep what's on disk at most FLUSH_INTERVAL behind.
+        if time.monotonic() - self._flushed_at >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        # Index after log, so an index entry never points past the flushed log.
+        self._log.flush()
+        self._index.flush()
+        self._flushed_at = time.monotonic()
+
+    def close(self):
+        for f in (self._log, self._index):
+            try:
+                f.close()
+            except OSError:
+                pass
+
+
+class RunLog:
+    """Read side of a run log: line ranges and tails straight from an mmap of the file.
+
+    Safe to use while the run is still writing; it sees everything flushed so far.
+    """
+    def __init__(self, log_dir: str, run_id: str, index_every: int = RUN_LOG_INDEX_EVERY):
+        self.run_id = run_id
+        self.path, self.index_path = run_log_paths(log_dir, run_id)
+        self.index_every = max(1, index_every)
+
+    def _offsets(self) -> array.array:
+        offsets = array.array("Q")
+        try:
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+            offsets.frombytes(data[:len(data) - len(data) % offsets.itemsize])
+        except OSError:
+            pass
+        return offsets
+
+    def _map(self):
+        """(file, mmap) of the log, or None while it is empty or missing."""
+        try:
+            f = open(self.path, "rb")
+        except OSError:
+            return None
+        if os.fstat(f.fileno()).st_size == 0:
+            f.close()
+            return None
+        return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def line_count(self) -> int:
+        mapped = self._map()
+        if mapped is None:
+            return 0
+        f, view = mapped
+        with f, view:
+            offsets = self._offsets()
+            if not offsets:
+                return view[:].count(b"\n")
+            # Whole blocks from the index, then count the tail block.
+            last = offsets[-1]
+            return (len(offsets) - 1) * self.index_every + view[last:].count(b"\n")
+
+    def read(self, start: int = 0, end: Optional[int] = None) -> List[str]:
+        """Lines [start, end) of the run (0-based), without reading the rest of the file."""
+        if end is not None and end <= start:
+            return []
+        mapped = self._map()
+        if mapped is None:
+            return []
+        f, view = mapped
+        with f, view:
+            offsets = self._offsets()
+            block = min(start // self.index_every, len(offsets) - 1) if offsets else -1
+            pos = offsets[block] if block >= 0 else 0
+            line = block * self.index_every if block >= 0 else 0
+            while line < start:
+                pos = view.find(b"\n", pos)
+                if pos < 0:
+                    return []
+                pos += 1
+                line += 1
+            lines = []
+            while pos < len(view) and (end is None or line < end):
+                stop = view.find(b"\n", pos)
+                if stop < 0:
+                    stop = len(view)
+                lines.append(view[pos:stop].decode("utf-8", errors="replace"))
+                pos = stop + 1
+                line += 1
+            return lines
+
+    def tail(self, n: int = 50) -> List[str]:
+        """Last `n` lines, found by scanning backwards from the end of the file."""
+        if n <= 0:
+            return []
+        mapped = self._map()
+        if mapped is None:
+            return []
+        f, view = mapped
+        with f, view:
+            end = len(view)
+            if view[end - 1:end] == b"\n":
+                end -= 1
+            pos = end
+            for _ in range(n):
+                found = view.rfind(b"\n", 0, pos)
+                if found < 0:
+                    pos = -1
+                    break
+                pos = found
+            return view[pos + 1:end].decode("utf-8", errors="replace").split("\n")
@@ -0,0 +1,258 @@
+import os
+import time
+import itertools
+import threading
+import concurrent.futures
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Concurrency caps: across all agents, per agent type by default, and per named agent
+# ("claude=2,codex=1"). 0 means unlimited.
+MAX_CONCURRENT = int(os.getenv("DOC_MAX_CONCURRENT", "8"))
+MAX_PER_AGENT = int(os.getenv("DOC_MAX_PER_AGENT", "4"))
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    limits = {}
+    for item in spec.split(","):
+        if "=" in item:
+            agent, value = item.split("=", 1)
+            limits[agent.strip()] = int(value)
+    return limits
+
+AGENT_CONCURRENCY = _parse_limits(os.getenv("DOC_AGENT_CONCURRENCY", ""))
+# Finished runs kept in the registry for lookups by run id.
+RUN_HISTORY = 256
+
+class RunResult:
+    """How a run ended. reason is one of:
+      completed     exit code 0
+      nonzero_exit  exited with an error code
+      signal        died from a signal nobody here sent
+      killed        terminated via kill_run / kill_all (or another reason given to them,
+                    e.g. "timeout", "stalled" or "rate_limited")
+      cancelled     dropped from the queue before it started
+      start_failed  the process could not be spawned
+    """
+    def __init__(self, run_id: str, agent: str, reason: str, exit_code: Optional[int] = None,
+                 duration_s: float = 0.0, queued_s: float = 0.0, stats: Optional[dict] = None):
+        self.run_id = run_id
+        self.agent = agent
+        self.reason = reason
+        self.exit_code = exit_code
+        self.duration_s = duration_s
+        self.queued_s = queued_s
+        self.stats = stats
+
+    @property
+    def ok(self) -> bool:
+        return self.reason == "completed"
+
+    def __repr__(self):
+        return f"RunResult({self.run_id}, {self.reason}, exit={self.exit_code}, {self.duration_s:.1f}s)"
+
+
+class ScheduledRun:
+    """One submitted run: queued, then running, then finished (or cancelled / failed to start).
+
+    future resolves with the run's RunResult once its output has been fully read.
+    """
+    def __init__(self, run_id: str, agent: str, project: Optional[str], priority: int, seq: int, start: Callable):
+        self.run_id = run_id
+        self.agent = agent
+        self.project = project
+        self.priority = priority
+        self.seq = seq
+        self.start = start
+        self.state = "queued"
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        # When the run last produced a line of output (stall detection).
+        self.last_output_at: Optional[float] = None
+        # Whether output arrives as it is produced (PTY). A piped `--print` run is silent until it ends,
+        # so its idle time says nothing about a stall.
+        self.streaming = False
+        # exited: the process is gone (output may still be draining). done: fully accounted for.
+        self.exited = threading.Event()
+        self.done = threading.Event()
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        # Set by whoever terminates the run on purpose, so the result says why.
+        self.kill_reason: Optional[str] = None
+
+    def result(self, timeout: Optional[float] = None) -> RunResult:
+        """Blocks for the RunResult. Raises concurrent.futures.TimeoutError."""
+        return self.future.result(timeout)
+
+    def _resolve(self, state: str, record: Optional[dict]) -> RunResult:
+        exit_code = (record or {}).get("exit_code")
+        if state == "cancelled":
+            reason = "cancelled"
+        elif state == "failed":
+            reason = "start_failed"
+        elif self.kill_reason:
+            reason = self.kill_reason
+        elif exit_code == 0:
+            reason = "completed"
+        elif exit_code is not None and exit_code < 0:
+            reason = "signal"
+        else:
+            reason = "nonzero_exit"
+        duration = time.monotonic() - self.started_at if self.started_at else 0.0
+        return RunResult(self.run_id, self.agent, reason, exit_code, round(duration, 3), round(self.queued_s, 3), record)
+
+    def touch(self):
+        """Notes that the run just produced output."""
+        self.last_output_at = time.monotonic()
+
+    @property
+    def idle_s(self) -> float:
+        """Seconds since the run's last output (or since it started, if it has printed nothing yet)."""
+        since = self.last_output_at or self.started_at
+        return time.monotonic() - since if since else 0.0
+
+    @property
+    def queued_s(self) -> float:
+        return (self.started_at or time.monotonic()) - self.submitted_at
+
+    def __repr__(self):
+        return f"ScheduledRun({self.run_id}, {self.state})"
+
+
+class AgentScheduler:
+    """Admission control for agent processes.
+
+    submit() queues a run; it starts as soon as both the global and the per-agent cap have
+    room. Among startable runs the highest priority wins, then the project that was served
+    least recently (so one busy project can't starve the others), then submission order.
+    The start callable runs outside the scheduler lock and returns False if the launch failed.
+    """
+    def __init__(self, max_total: int = MAX_CONCURRENT, max_per_agent: int = MAX_PER_AGENT,
+                 agent_limits: Optional[Dict[str, int]] = None):
+        self.max_total = max_total
+        self.max_per_agent = max_per_agent
+        self.agent_limits = dict(AGENT_CONCURRENCY if agent_limits is None else agent_limits)
+        self.runs: Dict[str, ScheduledRun] = {}
+        self._queue: List[ScheduledRun] = []
+        self._running: Dict[str, ScheduledRun] = {}
+        self._served: Dict[Optional[str], int] = {}
+        self._seq = itertools.count()
+        self._tick = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def limit_for(self, agent: str) -> int:
+        return self.agent_limits.get(agent, self.max_per_agent)
+
+    def submit(self, agent: str, start: Callable[[ScheduledRun], bool], run_id: str,
+               project: Optional[str] = None, priority: int = 0) -> ScheduledRun:
+        with self._lock:
+            run = ScheduledRun(run_id, agent, project, priority, next(self._seq), start)
+            self.runs[run_id] = run
+            self._queue.append(run)
+            ready = self._pop_ready()
+        self._launch(ready)
+        return run
+
+    def try_start(self, agent: str, run_id: str, project: Optional[str] = None, priority: int = 0) -> Optional[ScheduledRun]:
+        """Takes a slot for work the caller does itself, only if one is free now and no run of
+        `agent` is queued ahead. Returns the running run (release it with finish()), else None."""
+        with self._lock:
+            if not self._has_room(agent) or any(run.agent == agent for run in self._queue):
+                return None
+            run = ScheduledRun(run_id, agent, project, priority, next(self._seq), start=lambda run: True)
+            self.runs[run_id] = run
+            run.state = "running"
+            run.started_at = time.monotonic()
+            self._running[run_id] = run
+            self._served[project] = next(self._tick)
+        return run
+
+    def finish(self, run_id: str, state: str = "finished", record: Optional[dict] = None):
+        """Releases a run's slot, resolves its future and starts whatever can run next."""
+        with self._lock:
+            run = self.runs.get(run_id)
+            if run is None or run.state in ("finished", "failed", "cancelled"):
+                return
+            self._running.pop(run_id, None)
+            if run in self._queue:
+                self._queue.remove(run)
+            run.state = state
+            ready = self._pop_ready()
+            self._prune()
+        result = run._resolve(state, record)
+        if not run.future.done():
+            run.future.set_result(result)
+        run.exited.set()
+        run.done.set()
+        self._launch(ready)
+
+    def cancel(self, run_id: str) -> bool:
+        """Drops a run that hasn't started yet. False if it is already running or finished."""
+        with self._lock:
+            run = self.runs.get(run_id)
+            if run is None or run.state != "queued":
+                return False
+        self.finish(run_id, "cancelled")
+        return True
+
+    def cancel_queued(self) -> int:
+        with self._lock:
+            queued = [run.run_id for run in self._queue]
+        return sum(self.cancel(run_id) for run_id in queued)
+
+    def latest(self, agent: str) -> Optional[ScheduledRun]:
+        """The most recently submitted run of `agent`."""
+        with self._lock:
+            runs = [run for run in self.runs.values() if run.agent == agent]
+        return max(runs, key=lambda run: run.seq) if runs else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            per_agent: Dict[str, dict] = {}
+            for run in list(self._running.values()) + self._queue:
+                counts = per_agent.setdefault(run.agent, {"running": 0, "queued": 0, "limit": self.limit_for(run.agent)})
+                counts[run.state] += 1
+            return {"running": len(self._running), "queued": len(self._queue), "limit": self.max_total, "agents": per_agent}
+
+    def _prune(self):
+        finished = [run for run in self.runs.values() if run.state in ("finished", "failed", "cancelled")]
+        for run in sorted(finished, key=lambda r: r.seq)[:max(0, len(finished) - RUN_HISTORY)]:
+            del self.runs[run.run_id]
+
+    def _has_room(self, agent: str) -> bool:
+        if self.max_total and len(self._running) >= self.max_total:
+            return False
+        limit = self.limit_for(agent)
+        return not limit or sum(1 for run in self._running.values() if run.agent == agent) < limit
+
+    def _pop_ready(self) -> List[ScheduledRun]:
+        """Moves every run that now fits from the queue to running. Caller holds the lock."""
+        ready = []
+        while True:
+            candidates = [run for run in self._queue if self._has_room(run.agent)]
+            if not candidates:
+                return ready
+            run = min(candidates, key=lambda r: (-r.priority, self._served.get(r.project, 0), r.seq))
+            self._queue.remove(run)
+            run.state = "running"
+            run.started_at = time.monotonic()
+            self._running[run.run_id] = run
+            self._served[run.project] = next(self._tick)
+            ready.append(run)
+
+    def _launch(self, ready: List[ScheduledRun]):
+        for run in ready:
+            try:
+                started = run.start(run)
+            except Exception as e:
+                print(f"[Scheduler] Failed to start {run.run_id}: {e}")
+                started = False
+            if not started:
+                self.finish(run.run_id, "failed")
+
+
+def wait_runs(runs: Iterable[ScheduledRun], timeout: Optional[float] = None, return_when: str = concurrent.futures.ALL_COMPLETED) -> Dict[str, Optional[RunResult]]:
+    """Waits on several runs at once (ALL_COMPLETED or FIRST_COMPLETED).
+
+    Returns {run_id: RunResult}, with None for runs still going when the wait ended.
+    """
+    runs = list(runs)
+    concurrent.futures.wait([run.future for run in runs], timeout=timeout, return_when=return_when)
+    return {run.run_id: run.future.result() if run.future.done() else None for run in runs}
@@ -0,0 +1,234 @@
+import os
+import json
+import subprocess
+import threading
+from typing import Dict, List, Optional, Tuple
+from .process_group import isolation_kwargs, limited_command, terminate_group
+from .agent_events import EventParser
+from .run_log import new_run_id
+
+USE_AGENT_SESSIONS = os.getenv("DOC_AGENT_SESSIONS", "false").lower() == "true"
+# Turns served by one session before it is replaced with a fresh process.
+SESSION_MAX_TURNS = int(os.getenv("DOC_SESSION_MAX_TURNS", "20"))
+# Extra CLI arguments that put an agent into streaming-stdin mode. Empty = agent has no
+# session mode and always falls back to spawn-per-turn.
+SESSION_ARGS = {
+    "claude": os.getenv("DOC_CLAUDE_SESSION_ARGS", "--print --input-format stream-json --output-format stream-json --verbose").split(),
+    "codex": os.getenv("DOC_CODEX_SESSION_ARGS", "").split(),
+}
+
+class AgentSession:
+    """A long-lived agent process that takes one turn per JSON line on stdin."""
+    def __init__(self, name: str, command: List[str], cwd: Optional[str], env: Optional[Dict[str, str]], broadcast,
+                 on_turn_end=None):
+        self.name = name
+        self.cwd = cwd
+        self.turns = 0
+        self.healthy = True
+        self.last_usage: Optional[dict] = None  # token usage reported with the latest turn
+        self._broadcast = broadcast
+        self._turn_done = threading.Event()
+        self._turn_done.set()
+        self.slot = None  # the scheduler run the current turn occupies, if any
+        self._on_turn_end = on_turn_end  # on_turn_end(slot, reason) releases it, once per turn
+        self._slot_lock = threading.Lock()
+        self.process = subprocess.Popen(
+            limited_command(command, env=env),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            cwd=cwd,
+            env=env,
+            **isolation_kwargs()
+        )
+        threading.Thread(target=self._read, name=f"AgentSession-{name}", daemon=True).start()
+
+    def is_alive(self) -> bool:
+        return self.healthy and self.process.poll() is None
+
+    @property
+    def busy(self) -> bool:
+        return not self._turn_done.is_set()
+
+    def send(self, prompt: str):
+        """Starts a turn. Raises OSError if the session's stdin is gone."""
+        self._turn_done.clear()
+        self.turns += 1
+        message = {"type": "user", "message": {"role": "user", "content": prompt}}
+        try:
+            self.process.stdin.write(json.dumps(message) + "\n")
+            self.process.stdin.flush()
+        except (OSError, ValueError):
+            self.healthy = False
+            self.end_turn("failed")
+            raise
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the current turn ends (or the process dies). Returns False if timed out."""
+        if self._turn_done.wait(timeout):
+            return True
+        # A turn that overran can't be trusted to leave the session in a clean state.
+        self.healthy = False
+        self.end_turn("timeout")
+        return False
+
+    def end_turn(self, reason: Optional[str]):
+        """Marks the current turn over and releases its slot (reason "completed", "timeout", ...; None = session died)."""
+        with self._slot_lock:
+            slot, self.slot = self.slot, None
+        if slot is not None and self._on_turn_end is not None:
+            self._on_turn_end(slot, reason)
+        self._turn_done.set()
+
+    def close(self, grace: float = 2):
+        self.healthy = False
+        try:
+            self.process.stdin.close()
+        except (OSError, ValueError):
+            pass
+        try:
+            terminate_group(self.process, grace)
+        except Exception:
+            pass
+        self.end_turn("killed")
+
+    def _read(self):
+        parser = EventParser()
+        try:
+            for line in iter(self.process.stdout.readline, ''):
+                for event in parser.feed_line(line):
+                    if event.kind == "text":
+                        self._broadcast(self.name, event.text)
+                    elif event.kind == "usage":
+                        self.last_usage = event.usage
+                    elif event.kind == "result":
+                        if event.is_error and event.text:
+                            self._broadcast(self.name, event.text)
+                        self.end_turn("completed")
+        except Exception as e:
+            self._broadcast(self.name, f"Error reading session stream: {e}")
+        finally:
+            self.healthy = False
+            self.end_turn(None)
+            self._broadcast(self.name, "Session terminated.")
+
+
+class SessionPool:
+    """Keeps one warm AgentSession per (agent, role) so turns skip CLI cold start.
+
+    start_turn() returns False whenever a session can't be used (agent has no streaming
+    mode, spawn or stdin write failed); callers then fall back to spawn-per-turn.
+    Sessions are health-checked before each turn and recycled after max_turns.
+
+    Each turn occupies a slot in the subprocess manager's AgentScheduler, so warm sessions
+    count against the same global and per-agent caps as spawned runs. A turn only starts if
+    a slot is free right away; otherwise start_turn() returns False and the spawn-per-turn
+    fallback queues for one.
+    """
+    def __init__(self, subprocess_manager, max_turns: int = SESSION_MAX_TURNS):
+        self.sm = subprocess_manager
+        self.max_turns = max_turns
+        self.sessions: Dict[Tuple[str, str], AgentSession] = {}
+        self.active_turns: Dict[str, AgentSession] = {}
+        self._lock = threading.Lock()
+
+    def supports(self, agent: str) -> bool:
+        return bool(SESSION_ARGS.get(agent))
+
+    def start_turn(self, agent: str, role: str, binary: str, prompt: str, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> bool:
+        if not self.supports(agent):
+            return False
+        with self._lock:
+            slot = self._acquire_slot(agent, cwd)
+            if slot is False:
+                print(f"[SessionPool] {agent} is at its concurrency cap; the turn queues as a spawned run.")
+                return False
+            session = self._checkout(agent, role, binary, cwd, env)
+            if session is None:
+                self._release_slot(slot, "failed")
+                return False
+            session.slot = slot
+            try:
+                session.send(prompt)
+            except (OSError, ValueError) as e:
+                print(f"[SessionPool] {agent}/{role} session rejected turn ({e}); falling back to spawn-per-turn.")
+                self._discard(agent, role)
+                return False
+            self.active_turns[agent] = session
+            print(f"[SessionPool] {agent}/{role} turn {session.turns} (pid {session.process.pid})")
+            return True
+
+    def has_turn(self, agent: str) -> bool:
+        """True from start_turn() until wait_turn() collects the turn, even if it has already finished."""
+        return agent in self.active_turns
+
+    def wait_turn(self, agent: str, timeout: Optional[float] = None) -> bool:
+        """Waits for the agent's turn (returning at once if it already ended). False if it timed out.
+
+        The turn's scheduler slot is released by the session when the turn ends, not here.
+        """
+        session = self.active_turns.get(agent)
+        if session is None:
+            return True
+        done = session.wait(timeout)
+        if done and self.sm is not None and hasattr(self.sm, "dispatcher"):
+            self.sm.dispatcher.flush(timeout)
+        with self._lock:
+            if self.active_turns.get(agent) is session:
+                del self.active_turns[agent]
+        return done
+
+    def kill_all(self):
+        with self._lock:
+            for key in list(self.sessions):
+                self._discard(*key)
+            self.active_turns.clear()
+
+    def _checkout(self, agent, role, binary, cwd, env) -> Optional[AgentSession]:
+        key = (agent, role)
+        session = self.sessions.get(key)
+        if session is not None:
+            if not session.is_alive() or session.busy:
+                reason = "unhealthy"
+            elif session.turns >= self.max_turns:
+                reason = f"served {session.turns} turns"
+            elif session.cwd != cwd:
+                reason = "project changed"
+            else:
+                return session
+            print(f"[SessionPool] Recycling {agent}/{role} session ({reason}).")
+            self._discard(agent, role)
+
+        command = [binary] + SESSION_ARGS[agent]
+        try:
+            session = AgentSession(agent, command, cwd, env, self._broadcast, on_turn_end=self._release_slot)
+        except Exception as e:
+            print(f"[SessionPool] Could not start {agent}/{role} session: {e}")
+            return None
+        self.sessions[key] = session
+        return session
+
+    def _discard(self, agent, role):
+        session = self.sessions.pop((agent, role), None)
+        if session is not None:
+            session.close()
+
+    def _acquire_slot(self, agent, cwd):
+        """A running scheduler run for one session turn; None without a scheduler, False if at a cap."""
+        scheduler = getattr(self.sm, "scheduler", None)
+        if scheduler is None:
+            return None
+        slot = scheduler.try_start(agent, run_id=new_run_id(agent), project=cwd)
+        return False if slot is None else slot
+
+    def _release_slot(self, slot, reason: Optional[str]):
+        if slot is None:
+            return
+        if reason not in ("completed", None):
+            slot.kill_reason = reason
+        self.sm.scheduler.finish(slot.run_id, record={"exit_code": 0 if reason == "completed" else None})
+
+    def _broadcast(self, name: str, message: str):
+        self.sm._broadcast_log(name, message)
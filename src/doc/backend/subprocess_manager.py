@@ -1,39 +1,124 @@
+import os
 import subprocess
 import threading
 from typing import List, Callable, Dict, Optional
+from .resource_usage import RunStats, ResourceSampler, wait_with_rusage
+from .process_group import KILL_ORPHANS, isolation_kwargs, limited_command, group_alive, terminate_group
+from .pty_output import use_pty, open_pty, read_pty_lines, clean_line
+from .run_log import RUN_LOG_DIR, RunLog, RunLogWriter, new_run_id
+from .scheduler import AgentScheduler, ScheduledRun, RunResult, wait_runs
+from .log_dispatcher import LogDispatcher, LOG_QUEUE_SIZE, LOG_OVERFLOW, LOG_BATCH_LINES, LOG_BATCH_MS
+
+USE_ASYNC_SUBPROCESS = os.getenv("DOC_ASYNC_SUBPROCESS", "false").lower() == "true"
+# How long to wait for a finished process's pipe to drain (grandchildren may hold it open).
+DRAIN_TIMEOUT = 5
+
+def create_subprocess_manager():
+    """Returns the asyncio-based manager when DOC_ASYNC_SUBPROCESS=true, else the threaded one."""
+    if USE_ASYNC_SUBPROCESS:
+        from .async_subprocess_manager import AsyncSubprocessManager
+        return AsyncSubprocessManager()
+    return SubprocessManager()
 
 class SubprocessManager:
-    def __init__(self):
+    def __init__(self, log_queue_size: int = LOG_QUEUE_SIZE, log_overflow: str = LOG_OVERFLOW,
+                 batch_lines: int = LOG_BATCH_LINES, batch_ms: int = LOG_BATCH_MS, scheduler: Optional[AgentScheduler] = None):
+        # Latest running process per agent name, for callers that address agents by name.
         self.active_processes: Dict[str, subprocess.Popen] = {}
+        # Every running process by run id; several runs of one agent may be in flight.
+        self.runs: Dict[str, subprocess.Popen] = {}
         self.log_callbacks: List[Callable[[str, str], None]] = []
+        self._monitors: Dict[str, threading.Thread] = {}
+        # Concurrency caps and the wait queue for runs that don't fit yet.
+        self.scheduler = scheduler or AgentScheduler()
+        # Resource accounting: completion record per finished run, newest last.
+        self.run_history: List[dict] = []
+        self.last_run: Dict[str, dict] = {}
+        self._sampler = ResourceSampler()
+        # Raw output of every run goes to <run_log_dir>/<run_id>.log when set.
+        self.run_log_dir: Optional[str] = RUN_LOG_DIR
+        self._run_logs: Dict[str, RunLog] = {}
+        # Pipe readers only enqueue; callbacks (DB writes, WebSocket bridge) run on the dispatcher thread.
+        self.dispatcher = LogDispatcher(self.log_callbacks, maxsize=log_queue_size, overflow=log_overflow,
+                                        batch_lines=batch_lines, batch_ms=batch_ms)
 
-    def register_callback(self, callback: Callable[[str, str], None]):
+    def register_callback(self, callback: Callable, batched: bool = False):
+        """Adds a log callback. Batched callbacks receive (name, [lines]) per coalesced chunk."""
         self.log_callbacks.append(callback)
+        if batched:
+            self.dispatcher.batch_callbacks.add(callback)
+
+    def start_subprocess(self, name: str, command: List[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+                         limits: Optional[Dict[str, int]] = None, pty: Optional[bool] = None,
+                         priority: int = 0, project: Optional[str] = None):
+        """Starts a subprocess in a specific directory, in its own process group.
+
+        Returns the ScheduledRun (its future resolves with a RunResult), or False if it failed
+        to start. A run that doesn't fit under the concurrency caps is queued and still counts
+        as started; wait_for_process covers the queued time.
+        """
+        run = self.submit(name, command, cwd, env, limits, pty, priority, project)
+        return run if run.state != "failed" else False
+
+    def submit(self, name: str, command: List[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+               limits: Optional[Dict[str, int]] = None, pty: Optional[bool] = None,
+               priority: int = 0, project: Optional[str] = None) -> ScheduledRun:
+        """Queues a run of agent `name` and returns it; the run's id is unique across runs.
 
-    def start_subprocess(self, name: str, command: List[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None):
-        """Starts a subprocess in a specific directory."""
-        print(f"[SubprocessManager] Starting {name} in {cwd or '.'} with: {' '.join(command)}")
+        `limits` overrides the DOC_AGENT_RLIMIT_* defaults, e.g. {"cpu": 600, "nofile": 1024}.
+        `pty` gives the child a pseudo-terminal instead of a pipe so it line-buffers its
+        output; None means "if the agent is listed in DOC_PTY_AGENTS". Higher `priority`
+        starts first; `project` (default: cwd) is the unit of fairness between queued runs.
+        """
+        run = self.scheduler.submit(
+            name,
+            lambda run: self._launch(run, command, cwd, env, limits, pty),
+            run_id=new_run_id(name),
+            project=project or cwd,
+            priority=priority
+        )
+        if run.state == "queued":
+            print(f"[SubprocessManager] {name} queued as {run.run_id} ({self.scheduler.stats()['running']} running)")
+        return run
+
+    def _launch(self, run: ScheduledRun, command, cwd, env, limits, pty) -> bool:
+        name, run_id = run.agent, run.run_id
+        print(f"[SubprocessManager] Starting {name} ({run_id}) in {cwd or '.'} with: {' '.join(command)}")
         
         try:
-            process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
-                cwd=cwd,
-                env=env
-            )
+            if use_pty(name) if pty is None else pty:
+                process, lines = self._spawn_pty(command, cwd, env, limits)
+                run.streaming = True
+            else:
+                process = subprocess.Popen(
+                    limited_command(command, limits, env),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                    bufsize=1,
+                    universal_newlines=True,
+                    cwd=cwd,
+                    env=env,
+                    **isolation_kwargs()
+                )
+                lines = iter(process.stdout.readline, '')
             
+            self.runs[run_id] = process
             self.active_processes[name] = process
+            stats = RunStats(name, process.pid)
+            self._sampler.track(stats)
+            log = self._open_run_log(name, run_id)
+            # Reap as soon as the leader exits, so background children can't keep the run open.
+            reaper = threading.Thread(target=self._reap, args=(run, process, stats), name=f"{run_id}-reaper", daemon=True)
+            reaper.start()
             
             # Start monitoring thread
             monitor_thread = threading.Thread(
                 target=self._monitor_output,
-                args=(name, process),
+                args=(run, process, lines, stats, reaper, log),
                 daemon=True
             )
+            self._monitors[run_id] = monitor_thread
             monitor_thread.start()
             return True
         except Exception as e:
@@ -41,49 +126,159 @@ class SubprocessManager:
             return False
 
     def wait_for_process(self, name: str, timeout: Optional[int] = None) -> bool:
-        """Blocks until the specified process finishes. Returns False if timed out."""
-        if name in self.active_processes:
-            try:
-                self.active_processes[name].wait(timeout=timeout)
-                return True
-            except subprocess.TimeoutExpired:
+        """Blocks until the agent's latest run finishes. Returns False if timed out."""
+        run = self.scheduler.latest(name)
+        return True if run is None else self.wait_for_run(run.run_id, timeout)
+
+    def wait_for_run(self, run_id: str, timeout: Optional[float] = None) -> bool:
+        """Blocks until a run (queued or running) finishes. Returns False if timed out."""
+        run = self.scheduler.runs.get(run_id)
+        if run is not None:
+            if not run.exited.wait(timeout):
                 return False
+            # Let the reader drain the pipe and the callbacks see every line before reporting completion.
+            monitor = self._monitors.get(run_id)
+            if monitor is not threading.current_thread():
+                run.done.wait(DRAIN_TIMEOUT)
+        self.dispatcher.flush(timeout)
+        return True
+
+    def wait_runs(self, runs, timeout: Optional[float] = None, first: bool = False) -> Dict[str, Optional[RunResult]]:
+        """Waits on several runs at once: all of them, or (first=True) until any one ends.
+
+        Returns {run_id: RunResult or None if still going}; finished runs' output has reached the callbacks.
+        """
+        results = wait_runs(runs, timeout, "FIRST_COMPLETED" if first else "ALL_COMPLETED")
+        self.dispatcher.flush(timeout)
+        return results
+
+    def kill_run(self, run_id: str, reason: str = "killed", grace: float = 2) -> bool:
+        """Terminates one run's process group (or drops it from the queue). False if it isn't live."""
+        run = self.scheduler.runs.get(run_id)
+        if run is None:
+            return False
+        if self.scheduler.cancel(run_id):
+            return True
+        process = self.runs.get(run_id)
+        if process is None:
+            return False
+        if not run.exited.is_set():
+            run.kill_reason = run.kill_reason or reason
+        print(f"[SubprocessManager] Killing {run_id} ({reason})...")
+        terminate_group(process, grace)
         return True
 
-    def _monitor_output(self, name: str, process: subprocess.Popen):
+    def run_log(self, name: str) -> Optional[RunLog]:
+        """Disk log of the named process's current or latest run (None if run logs are off)."""
+        return self._run_logs.get(name)
+
+    def _open_run_log(self, name: str, run_id: str) -> Optional[RunLogWriter]:
+        if not self.run_log_dir:
+            return None
         try:
-            for line in iter(process.stdout.readline, ''):
+            log = RunLogWriter(self.run_log_dir, run_id)
+        except OSError as e:
+            print(f"[SubprocessManager] Run log disabled for {name}: {e}")
+            return None
+        self._run_logs[name] = RunLog(self.run_log_dir, run_id)
+        return log
+
+    def dispatch_stats(self) -> dict:
+        """Queue depth, high-water mark and dropped/spilled line counters of the log dispatcher."""
+        return self.dispatcher.stats()
+
+    def scheduler_stats(self) -> dict:
+        """Running/queued runs overall and per agent, with their concurrency caps."""
+        return self.scheduler.stats()
+
+    def last_run_stats(self, name: str) -> Optional[dict]:
+        """Completion record (wall, CPU user/sys, peak RSS, output bytes) of the named process's latest run."""
+        return self.last_run.get(name)
+
+    def _spawn_pty(self, command, cwd, env, limits):
+        """Popen with stdout/stderr on a pseudo-terminal. Returns (process, cleaned line iterator)."""
+        master, slave = open_pty()
+        try:
+            process = subprocess.Popen(
+                limited_command(command, limits, env),
+                stdin=subprocess.DEVNULL,
+                stdout=slave,
+                stderr=slave,
+                cwd=cwd,
+                env=env,
+                **isolation_kwargs()
+            )
+        except Exception:
+            os.close(master)
+            raise
+        finally:
+            os.close(slave)
+        return process, (clean_line(line) for line in read_pty_lines(master))
+
+    def _reap(self, run: ScheduledRun, process: subprocess.Popen, stats: RunStats):
+        stats.rusage = wait_with_rusage(process)
+        run.exited.set()
+        if KILL_ORPHANS and group_alive(process.pid):
+            print(f"[SubprocessManager] {run.run_id} exited; terminating processes it left behind.")
+            terminate_group(process)
+
+    def _monitor_output(self, run: ScheduledRun, process: subprocess.Popen, lines, stats: RunStats, reaper: threading.Thread,
+                        log: Optional[RunLogWriter]):
+        name = run.agent
+        try:
+            for line in lines:
                 if not line:
                     break
+                run.touch()
+                stats.add_output(line)
+                if log is not None:
+                    log.write(line)
                 stripped = line.rstrip()
                 if stripped:
                      self._broadcast_log(name, stripped)
         except Exception as e:
             self._broadcast_log(name, f"Error reading stream: {e}")
         finally:
-            process.stdout.close()
-            process.wait()
+            if process.stdout is not None:
+                process.stdout.close()
+            else:
+                lines.close()
+            stats.sample()
+            reaper.join()
+            self._sampler.untrack(stats)
+            record = stats.finish(process.returncode, stats.rusage)
+            record["run_id"] = run.run_id
+            record["queued_s"] = round(run.queued_s, 3)
+            if log is not None:
+                log.close()
+                record["log_path"] = log.path
+            self.last_run[name] = record
+            self.run_history.append(record)
             self._broadcast_log(name, "Process terminated.")
-            if name in self.active_processes:
+            self.runs.pop(run.run_id, None)
+            if self.active_processes.get(name) is process:
                 del self.active_processes[name]
+            self._monitors.pop(run.run_id, None)
+            self.scheduler.finish(run.run_id, record=record)
+
+    def kill_all(self, grace: float = 2, reason: str = "killed"):
+        """Drops queued runs and terminates every running process group: SIGTERM, then SIGKILL after `grace` seconds.
 
-    def kill_all(self):
-        """Terminates all active processes."""
-        for name, process in list(self.active_processes.items()):
+        `reason` is what the killed runs' results report (e.g. "rate_limited").
+        """
+        cancelled = self.scheduler.cancel_queued()
+        if cancelled:
+            print(f"[SubprocessManager] Cancelled {cancelled} queued run(s).")
+        for run_id, process in list(self.runs.items()):
             try:
-                print(f"[SubprocessManager] Killing {name}...")
-                process.terminate()
-                try:
-                    process.wait(timeout=2)
-                except subprocess.TimeoutExpired:
-                    process.kill()
+                run = self.scheduler.runs.get(run_id)
+                if run is not None and not run.exited.is_set():
+                    run.kill_reason = run.kill_reason or reason
+                print(f"[SubprocessManager] Killing {run_id}...")
+                terminate_group(process, grace)
             except Exception as e:
-                print(f"[SubprocessManager] Failed to kill {name}: {e}")
+                print(f"[SubprocessManager] Failed to kill {run_id}: {e}")
         self.active_processes.clear()
 
     def _broadcast_log(self, name: str, message: str):
-        for callback in self.log_callbacks:
-            try:
-                callback(name, message)
-            except Exception as e:
-                print(f"Error in callback: {e}")
\ No newline at end of file
+        self.dispatcher.submit(name, message)
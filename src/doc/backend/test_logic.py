@@ -1,11 +1,48 @@
 import unittest
 from unittest.mock import MagicMock, patch
 import os
+import sys
+import asyncio
 import shutil
+import threading
+import time
+import subprocess
+import tempfile
+import datetime
 import doc.backend.scrum as scrum_module
 from doc.backend.scrum import ScrumMaster
 from doc.backend.memory import MemoryCore
 from doc.backend.subprocess_manager import SubprocessManager
+from doc.backend.prompt_builder import PromptBuilder, Segment
+from doc.backend.cartographer import Cartographer
+from doc.backend.parallel_sprint import WorktreeManager, clone_tree, split_work_items
+from doc.backend.timeouts import TimeoutPolicy
+from doc.backend.agent_events import rate_limit_event
+from doc.backend.rate_limits import RateLimitScheduler, parse_reset
+from doc.backend.impact import ImpactAnalyzer
+
+# Stand-in agent for parallel sprints: a DRIVER writes <last word of its work item>.txt in its cwd.
+WORKTREE_AGENT = """import sys
+prompt = sys.argv[-1]
+if "ROLE: QA" in prompt:
+    print("STATUS: COMPLETED")
+else:
+    name = prompt.rstrip(" .").rsplit(" ", 1)[-1]
+    open(name + ".txt", "w").write(name + "\\n")
+    print("Work done.")
+"""
+
+def _git(repo, *args):
+    return subprocess.run(["git", *args], cwd=repo, capture_output=True, text=True, check=True).stdout
+
+def _init_repo(repo):
+    _git(repo, "init", "-q")
+    _git(repo, "config", "user.email", "test@example.com")
+    _git(repo, "config", "user.name", "Test")
+    with open(os.path.join(repo, "README"), "w") as f:
+        f.write("base\n")
+    _git(repo, "add", "README")
+    _git(repo, "commit", "-q", "-m", "base")
 
 class TestScrumMaster(unittest.TestCase):
     def setUp(self):
@@ -22,6 +59,7 @@ class TestScrumMaster(unittest.TestCase):
         # Mock MemoryCore
         self.mock_mem = MagicMock(spec=MemoryCore)
         self.mock_mem.query_memory.return_value = {"documents": [["Skill 1"]]}
+        self.mock_mem.since.return_value = ([], 0)
         
         # Initialize ScrumMaster
         self.scrum = ScrumMaster(self.mock_sm, self.mock_mem)
@@ -40,7 +78,7 @@ class TestScrumMaster(unittest.TestCase):
         
         # Setup MockThread to run synchronously
         class MockThread:
-            def __init__(self, target, args):
+            def __init__(self, target, args=(), daemon=None):
                 self.target = target
                 self.args = args
             def start(self):
@@ -94,5 +132,507 @@ class TestScrumMaster(unittest.TestCase):
         # mock_sleep.assert_called()
         print("[PASS] Sequencing verified.")
 
+    def test_rate_limit_notice_marks_agent_and_kills(self):
+        self.scrum._capture_agent_output("claude", ["Working...", "Limit reached · resets 12am (America/New_York)"])
+        self.assertEqual(self.scrum.agent_registry["claude"]["status"], "RATE_LIMITED")
+        reset_time = self.scrum.agent_registry["claude"]["reset_time"]
+        self.assertIsInstance(reset_time, datetime.datetime)
+        self.assertIsNotNone(reset_time.tzinfo)
+        self.mock_sm.kill_all.assert_called_once()
+        self.scrum.rate_limits.cancel_all()
+
+class TestPromptBuilder(unittest.TestCase):
+    def test_trims_lowest_priority_first_and_keeps_order(self):
+        builder = PromptBuilder(budgets={"NAVIGATOR": 300})
+        history = "\n\n".join(f"**claude**: message {i} " + "x" * 80 for i in range(20))
+        repo_map = "\n".join(f"module_{i}.py" for i in range(200))
+        prompt = builder.build("NAVIGATOR", [
+            Segment("header", "ROLE: ARCHITECT.\n", priority=100),
+            Segment("history", history, priority=50, trim="head", separator="\n\n", prefix="HISTORY:\n"),
+            Segment("map", repo_map, priority=10, trim="tail", prefix="\nMAP:\n"),
+        ])
+
+        self.assertTrue(prompt.startswith("ROLE: ARCHITECT.\nHISTORY:\n"))
+        self.assertNotIn("MAP:", prompt)  # the map goes before any history does
+        self.assertIn("message 19", prompt)
+        self.assertNotIn("message 0 ", prompt)
+        self.assertIn("earlier entries omitted", prompt)
+        self.assertLessEqual(builder.last_build["tokens"], 300 + 10)
+        self.assertEqual(set(builder.last_build["trimmed"]), {"history", "map"})
+
+    def test_cached_segments_and_argument_cap(self):
+        builder = PromptBuilder(max_bytes=1000)
+        produced = []
+        for key in ("v1", "v1", "v2"):
+            builder.cached("map", key, lambda: produced.append(key) or "a.py\nb.py", trim="tail")
+        self.assertEqual(produced, ["v1", "v2"])
+
+        prompt = builder.build("DRIVER", [Segment("header", "go\n", priority=100),
+                                          Segment("history", "\n".join(["é" * 50] * 100), trim="head")])
+        self.assertLessEqual(len(prompt.encode("utf-8")), 1000)
+
+    def test_cartographer_reparses_only_changed_files(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        for name in ("a", "b"):
+            with open(os.path.join(root, f"{name}.py"), "w") as f:
+                f.write(f"def {name}():\n    pass\n")
+        cartographer = Cartographer(root)
+        cartographer.save_map()
+        version = cartographer.map_version
+        with patch.object(cartographer, "_parse_file", wraps=cartographer._parse_file) as parse:
+            cartographer.save_map()
+            self.assertEqual(parse.call_count, 0)
+            self.assertEqual(cartographer.map_version, version)
+            with open(os.path.join(root, "b.py"), "w") as f:
+                f.write("def b2():\n    pass\n")
+            cartographer.save_map()
+            self.assertEqual([c.args[1] for c in parse.call_args_list], ["b.py"])
+        self.assertIn("def b2()", cartographer.last_map)
+        self.assertEqual(cartographer.map_version, version + 1)
+
+class TestSprintStates(unittest.TestCase):
+    def setUp(self):
+        self.scrum = ScrumMaster(MagicMock(spec=SubprocessManager), MagicMock(spec=MemoryCore))
+        self.events = []
+        self.scrum.broadcast_func = self.events.append
+
+    def test_transitions_wake_waiters_and_broadcast(self):
+        woke = []
+        waiter = threading.Thread(target=lambda: woke.append(self.scrum.wait_for_state({"IDLE", "AWAITING_USER"}, timeout=5)))
+        self.scrum._set_state("PLANNING")
+        waiter.start()
+        self.scrum._set_state("BUILDING")
+        self.scrum._set_state("AWAITING_USER")
+        waiter.join(5)
+
+        self.assertEqual(woke, ["AWAITING_USER"])
+        self.assertEqual([(e["previous"], e["state"]) for e in self.events],
+                         [("IDLE", "PLANNING"), ("PLANNING", "BUILDING"), ("BUILDING", "AWAITING_USER")])
+        self.assertEqual(self.events[-1]["type"], "state_change")
+        self.assertIsNone(self.scrum.wait_for_state("BUILDING", timeout=0.05))
+
+    def test_invalid_transition_raises_unless_forced(self):
+        with self.assertRaises(ValueError):
+            self.scrum._set_state("BUILDING")
+        self.assertEqual(self.scrum.state, "IDLE")
+        self.scrum._set_state("PLANNING")
+        self.scrum.reset_state()
+        self.assertEqual(self.scrum.state, "IDLE")
+
+    def test_async_wait_and_unsubscribe(self):
+        async def scenario():
+            waiting = asyncio.ensure_future(self.scrum.async_wait_for_state("RATE_LIMITED", timeout=5))
+            await asyncio.sleep(0)
+            threading.Thread(target=lambda: (self.scrum._set_state("PLANNING"), self.scrum._set_state("RATE_LIMITED"))).start()
+            return await waiting, await self.scrum.async_wait_for_state("IDLE", timeout=0.05)
+
+        self.assertEqual(asyncio.run(scenario()), ("RATE_LIMITED", None))
+        self.assertEqual(self.scrum._subscribers, [])
+
+class TestParallelSprint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.repo = os.path.join(self.tmp, "repo")
+        os.makedirs(self.repo)
+        _init_repo(self.repo)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_split_work_items_takes_latest_plan(self):
+        huddle = ("**claude**: WORK ITEM 1: old\nWORK ITEM 2: old\n\n"
+                  "**codex**: Work done.\n\n"
+                  "**claude**: Plan:\nWORK ITEM 1: Add the API\nand its tests\nWORK ITEM 2: Add the UI")
+        self.assertEqual(split_work_items(huddle), ["Add the API\nand its tests", "Add the UI"])
+        self.assertEqual(split_work_items("**claude**: WORK ITEM 1: only one"), [])
+
+    def test_worktrees_merge_and_keep_conflicting_branch(self):
+        trees = WorktreeManager(self.repo)
+        self.assertTrue(trees.available())
+        for name, content in (("a", "from a\n"), ("b", "from b\n")):
+            path = trees.create(name, f"doc/test-{name}")
+            with open(os.path.join(path, f"{name}.txt"), "w") as f:
+                f.write(content)
+            with open(os.path.join(path, "README"), "w") as f:
+                f.write(content)
+            self.assertTrue(trees.commit_all(name, f"work {name}"))
+
+        self.assertIn("+from a", trees.diff("a"))
+        self.assertEqual(trees.merge("a")[0], True)
+        merged, _ = trees.merge("b")  # both rewrote README
+        self.assertFalse(merged)
+        self.assertEqual(_git(self.repo, "status", "--porcelain", "--untracked-files=no"), "")
+        trees.cleanup()
+
+        self.assertTrue(os.path.exists(os.path.join(self.repo, "a.txt")))
+        self.assertFalse(os.path.exists(os.path.join(self.repo, "b.txt")))
+        branches = _git(self.repo, "branch", "--list", "doc/*")
+        self.assertNotIn("doc/test-a", branches)
+        self.assertIn("doc/test-b", branches)
+        self.assertEqual(os.listdir(trees.root), [])
+
+    def test_versions_fork_from_snapshot_and_discard(self):
+        with open(os.path.join(self.repo, "README"), "a") as f:
+            f.write("uncommitted\n")
+        trees = WorktreeManager(self.repo, root=os.path.join(self.tmp, "builds"))
+        path = trees.create("v1", "builds/v1", base=trees.snapshot())
+        with open(os.path.join(path, "README")) as f:
+            self.assertIn("uncommitted", f.read())
+        with open(os.path.join(path, "new.txt"), "w") as f:
+            f.write("new\n")
+        os.makedirs(os.path.join(path, ".brain"))
+        with open(os.path.join(path, ".brain", "state"), "w") as f:
+            f.write("not committed\n")
+        self.assertTrue(trees.commit_all("v1", "stable"))
+        self.assertEqual(_git(self.repo, "show", "--name-only", "--format=", "builds/v1").split(), ["new.txt"])
+
+        trees.create("v2", "builds/v2", base="builds/v1")
+        self.assertTrue(os.path.exists(os.path.join(self.tmp, "builds", "v2", "new.txt")))
+        trees.remove("v2", discard=True)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, "builds", "v2")))
+        self.assertNotIn("builds/v2", _git(self.repo, "branch", "--list"))
+        # The project's own checkout is untouched.
+        self.assertIn("README", _git(self.repo, "status", "--porcelain"))
+
+        copy = clone_tree(self.repo, os.path.join(self.tmp, "copy"), ignore=shutil.ignore_patterns(".git"))
+        self.assertEqual(sorted(os.listdir(copy)), ["README"])
+
+    def test_snapshot_includes_untracked_files_but_not_the_builds(self):
+        os.makedirs(os.path.join(self.repo, "builds", "v1"))
+        with open(os.path.join(self.repo, "builds", "v1", "old.txt"), "w") as f:
+            f.write("an earlier version, committed by mistake\n")
+        _git(self.repo, "add", "-A")
+        _git(self.repo, "commit", "-q", "-m", "builds")
+        with open(os.path.join(self.repo, "notes.txt"), "w") as f:
+            f.write("untracked\n")
+        status = _git(self.repo, "status", "--porcelain")
+
+        trees = WorktreeManager(self.repo, root=os.path.join(self.repo, "builds"))
+        base = trees.snapshot()
+        self.assertEqual(_git(self.repo, "status", "--porcelain"), status)  # real index untouched
+        path = trees.create("v2", "builds/v2", base=base)
+        self.assertEqual(sorted(os.listdir(path)), [".git", "README", "notes.txt"])
+        self.assertEqual(_git(self.repo, "ls-tree", "--name-only", trees.snapshot(untracked=False)).split(), ["README"])
+
+    @patch('doc.backend.scrum.ENABLE_REAL_AGENTS', True)
+    def test_parallel_sprint_builds_both_items_and_cross_reviews(self):
+        agent = os.path.join(self.tmp, "agent.py")
+        with open(agent, "w") as f:
+            f.write(WORKTREE_AGENT)
+        sm = SubprocessManager()
+        started = []
+        start = sm.start_subprocess
+
+        def start_agent(name, cmd, **kwargs):
+            started.append((name, cmd[-1], kwargs["cwd"]))
+            return start(name, [sys.executable, agent] + cmd[1:], **kwargs)
+        sm.start_subprocess = start_agent
+        mem = MagicMock(spec=MemoryCore)
+        mem.get_recent_huddle.return_value = "**claude**: WORK ITEM 1: Write backend\nWORK ITEM 2: Write frontend"
+        mem.since.return_value = ([], 0)
+        scrum = ScrumMaster(sm, mem)
+        scrum.set_project_path(self.repo)
+        scrum._set_state("PLANNING")
+        # Left uncommitted by an earlier sequential iteration.
+        with open(os.path.join(self.repo, "README"), "a") as f:
+            f.write("edited\n")
+        with open(os.path.join(self.repo, "notes.txt"), "w") as f:
+            f.write("new\n")
+
+        self.assertEqual(scrum._run_parallel_sprint("Build it"), "done")
+        self.assertEqual(scrum.state, "REVIEWING")
+        self.assertEqual(scrum._reviewers_verdict(["claude", "codex"]), "COMPLETED")
+        # Pending work was committed first, so both merges landed and nothing is left dirty.
+        self.assertEqual(_git(self.repo, "status", "--porcelain", "--", ".", ":(exclude).brain"), "")
+        self.assertIn("notes.txt", _git(self.repo, "ls-files"))
+
+        builds = [s for s in started if "ROLE: BUILDER" in s[1]]
+        self.assertEqual(sorted(name for name, _, _ in builds), ["claude", "codex"])
+        self.assertTrue(all(cwd != self.repo for _, _, cwd in builds))
+        for name in ("backend", "frontend"):
+            self.assertTrue(os.path.exists(os.path.join(self.repo, f"{name}.txt")))
+        reviews = {name: prompt for name, prompt, _ in started if "ROLE: QA" in prompt}
+        self.assertIn("+frontend", reviews["claude"])  # claude reviews codex's item
+        self.assertIn("+backend", reviews["codex"])
+        self.assertEqual(_git(self.repo, "worktree", "list").count("\n"), 1)
+
+    def test_cross_review_needs_both_approvals_whoever_finishes_last(self):
+        scrum = ScrumMaster(MagicMock(spec=SubprocessManager), MagicMock(spec=MemoryCore))
+        for first, second in (("claude", "codex"), ("codex", "claude")):
+            scrum._turn_verdicts.clear()
+            scrum._capture_agent_output(first, ["Found an off-by-one in the pager.", "STATUS: CONTINUE"])
+            scrum._capture_agent_output(second, ["Looks good.", "STATUS: COMPLETED"])
+            self.assertEqual(scrum._reviewers_verdict(["claude", "codex"]), "CONTINUE")
+        scrum._capture_agent_output("codex", ["Fixed upstream.", "STATUS: COMPLETED"])
+        self.assertEqual(scrum._reviewers_verdict(["claude", "codex"]), "COMPLETED")
+        scrum._turn_verdicts.pop("claude")  # a new turn starts without a verdict
+        self.assertEqual(scrum._reviewers_verdict(["claude", "codex"]), "CONTINUE")
+        scrum._capture_agent_output("claude", ["STATUS: COMPLETED"])
+        scrum._capture_agent_output("codex", ["STATUS: NEEDS_INPUT"])
+        self.assertEqual(scrum._reviewers_verdict(["claude", "codex"]), "USER_INPUT_REQUIRED")
+
+class TestTurnTimeouts(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_timeouts_follow_recorded_durations_within_bounds(self):
+        policy = TimeoutPolicy(minimum=10, maximum=100, default=50, pct=95, headroom=2, min_samples=3)
+        policy.record("codex", "DRIVER", 4.0)
+        policy.record("codex", "DRIVER", 6.0)
+        self.assertEqual(policy.timeout_for("codex", "DRIVER"), 50)  # too few samples yet
+        policy.record("codex", "DRIVER", 5.0)
+        self.assertEqual(policy.timeout_for("codex", "DRIVER"), 11.8)  # p95 of 4,5,6 = 5.9, x2
+        policy.record("codex", "DRIVER", 80.0, reason="timeout")  # cut off: still counts, limit grows
+        policy.record("codex", "DRIVER", 1.0, reason="stalled")   # says nothing about duration
+        self.assertEqual(policy.samples("codex", "DRIVER"), [4.0, 6.0, 5.0, 80.0])
+        self.assertEqual(policy.timeout_for("codex", "DRIVER"), 100)
+        for _ in range(3):
+            policy.record("claude", "REVIEWER", 1.0)
+        self.assertEqual(policy.timeout_for("claude", "REVIEWER"), 10)
+
+    def test_recorded_turns_persist_per_project(self):
+        scrum = ScrumMaster(MagicMock(spec=SubprocessManager), MagicMock(spec=MemoryCore))
+        scrum.set_project_path(self.tmp)
+        for wall_s in (30, 40, 50):
+            scrum._record_run("BUILDING", "codex", wall_s, True, reason="completed", role="DRIVER")
+        scrum._record_run("VERIFYING", "verifier", 2, True)
+
+        reloaded = TimeoutPolicy(self.tmp, minimum=1, maximum=1000, headroom=1)
+        self.assertEqual(reloaded.samples("codex", "DRIVER"), [30, 40, 50])
+        self.assertEqual(reloaded.timeout_for("codex", "DRIVER"), 49.0)
+        other = os.path.join(self.tmp, "other")
+        os.makedirs(other)
+        reloaded.load(other)
+        self.assertEqual(reloaded.samples("codex", "DRIVER"), [])
+
+    @patch('doc.backend.scrum.STALL_CHECK_INTERVAL', 0.1)
+    def test_silent_run_is_killed_as_stalled(self):
+        sm = SubprocessManager()
+        scrum = ScrumMaster(sm, MagicMock(spec=MemoryCore))
+        scrum.set_project_path(self.tmp)
+        scrum.stall_timeout = 0.5
+        scrum._turn_started["codex"] = scrum._turn_started["claude"] = time.monotonic()
+        scrum._turn_roles.update(codex="DRIVER", claude="DRIVER")
+        scrum._track_run("codex", sm.start_subprocess("codex", ["bash", "-c", "echo start; sleep 30"], pty=True))
+        scrum._track_run("claude", sm.start_subprocess(
+            "claude", ["bash", "-c", "for i in 1 2 3 4 5 6 7 8; do echo $i; sleep 0.2; done"], pty=True))
+
+        scrum.context = MagicMock()
+        finished = scrum._wait_for_agents(["codex", "claude"], timeout=20)
+        self.assertEqual(finished, {"codex": False, "claude": True})
+        reasons = {record["agent"]: record["reason"] for record in scrum.run_stats}
+        self.assertEqual(reasons, {"codex": "stalled", "claude": "completed"})
+        self.assertEqual(scrum.timeouts.samples("codex", "DRIVER"), [])
+        # Only the completed turn's context counts as sent; the stalled one is resent in full.
+        scrum.context.advance.assert_called_once_with("claude", scrum.mission_id)
+        scrum.context.reset.assert_called_once_with("codex")
+
+    @patch('doc.backend.scrum.STALL_CHECK_INTERVAL', 0.1)
+    def test_silent_piped_run_is_not_stall_checked(self):
+        # A piped `--print` turn prints nothing until it ends; only the turn timeout applies to it.
+        sm = SubprocessManager()
+        scrum = ScrumMaster(sm, MagicMock(spec=MemoryCore))
+        scrum.set_project_path(self.tmp)
+        scrum.stall_timeout = 0.3
+        scrum._turn_started["codex"] = time.monotonic()
+        scrum._turn_roles["codex"] = "DRIVER"
+        scrum._track_run("codex", sm.start_subprocess("codex", ["bash", "-c", "sleep 1; echo done"], pty=False))
+
+        self.assertEqual(scrum._wait_for_agents(["codex"], timeout=20), {"codex": True})
+        self.assertEqual(scrum.run_stats[-1]["reason"], "completed")
+
+class TestRateLimits(unittest.TestCase):
+    def test_parse_reset_times(self):
+        now = datetime.datetime(2026, 3, 7, 22, 10, tzinfo=datetime.timezone.utc)  # 17:10 in New York
+        ny = "America/New_York"
+        self.assertEqual(parse_reset("12am", ny, now=now).isoformat(), "2026-03-08T00:00:00-05:00")
+        self.assertEqual(parse_reset("3:30pm", ny, now=now).isoformat(), "2026-03-08T15:30:00-04:00")  # after the DST switch
+        self.assertEqual(parse_reset("5pm", ny, now=now).isoformat(), "2026-03-07T17:00:00-05:00")   # just passed
+        self.assertEqual(parse_reset("Jan 2, 9am", "UTC", now=now.replace(month=12)).isoformat(), "2027-01-02T09:00:00+00:00")
+        self.assertEqual(parse_reset("in 1h 30m", "UTC", now=now), now + datetime.timedelta(minutes=90))
+        self.assertEqual(parse_reset(None, reset_epoch=1767225600), datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc))
+        self.assertIsNotNone(parse_reset("9am", "Not/AZone", now=now).tzinfo)  # unknown zone: local time
+        self.assertIsNone(parse_reset("soon", ny, now=now))
+        self.assertIsNone(parse_reset("13pm", ny, now=now))
+
+    def test_backoff_without_reset_time_and_timed_reactivation(self):
+        reset = threading.Event()
+        limits = RateLimitScheduler(lambda agent: reset.set(), backoff=60, backoff_max=200, margin=0)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        notice = rate_limit_event("■ You've hit your usage limit. Upgrade to Pro for more usage.")
+        self.assertEqual(limits.limit("codex", notice, now=now) - now, datetime.timedelta(seconds=60))
+        self.assertEqual(limits.limit("codex", notice, now=now) - now, datetime.timedelta(seconds=120))
+        self.assertEqual(limits.limit("codex", notice, now=now) - now, datetime.timedelta(seconds=200))
+        limits.cancel_all()
+        limits.succeeded("codex")
+        self.assertEqual(limits.limit("codex", notice, now=now) - now, datetime.timedelta(seconds=60))
+        limits.cancel_all()
+
+        soon = rate_limit_event(f"Claude AI usage limit reached|{int(now.timestamp()) + 1}")
+        limits.limit("claude", soon)
+        self.assertTrue(reset.wait(5))
+        self.assertIsNone(limits.next_reset())
+
+    def test_paused_mission_resumes_when_an_agent_is_back(self):
+        scrum = ScrumMaster(MagicMock(spec=SubprocessManager), MagicMock(spec=MemoryCore))
+        for agent in scrum.agent_registry:
+            scrum.agent_registry[agent]["status"] = "RATE_LIMITED"
+        scrum._paused_task = "Build it"
+        scrum._set_state("PLANNING")
+        scrum._set_state("RATE_LIMITED")
+        self.assertFalse(scrum.resume())  # nobody is back yet
+
+        with patch.object(scrum, "_run_autonomous_loop") as loop, patch("threading.Thread") as thread:
+            thread.side_effect = lambda target, args: MagicMock(start=lambda: target(*args))
+            scrum._reactivate_agent("codex")
+        self.assertEqual(scrum.state, "PLANNING")
+        self.assertEqual(scrum.agent_registry["codex"], {"status": "ACTIVE", "reset_time": None})
+        loop.assert_called_once_with("Build it", True, True)
+        self.assertFalse(scrum.resume())
+
+    def test_resumed_mission_keeps_its_iteration_count(self):
+        scrum = ScrumMaster(MagicMock(spec=SubprocessManager), MagicMock(spec=MemoryCore))
+        scrum.cartographer = MagicMock()
+        scrum.max_iterations = 3
+        scrum.iteration = 3  # paused before a 4th iteration: the budget is spent
+        scrum._set_state("PLANNING")
+        with patch.object(scrum, "_run_agent") as run_agent:
+            scrum._run_autonomous_loop("Build it", True, resumed=True)
+        run_agent.assert_not_called()
+        self.assertEqual(scrum.iteration, 3)
+        self.assertEqual(scrum.state, "AWAITING_USER")
+
+class TestBackgroundVerification(unittest.TestCase):
+    def _sprint(self, test_status):
+        """One loop iteration where the tests finish only after the reviewer has started."""
+        mem = MagicMock(spec=MemoryCore)
+        mem.since.return_value = ([], 0)
+        mem.get_latest_status.return_value = "Analyzing... STATUS: COMPLETED"
+        scrum = ScrumMaster(MagicMock(spec=SubprocessManager), mem)
+        scrum.max_iterations = 1
+        scrum.cartographer = MagicMock()
+        reviewer_started = threading.Event()
+        turns = []
+
+        def run_agent(agent, role, task, notes=None, **kwargs):
+            turns.append((role, notes))
+            if role == "REVIEWER":
+                reviewer_started.set()
+
+        def run_tests(task, post=True):
+            self.assertTrue(reviewer_started.wait(5))
+            return {"status": test_status, "report": f"Test Output ({test_status})"}
+
+        with patch.object(scrum, "_run_agent", side_effect=run_agent), \
+             patch.object(scrum, "_wait_for_agent", return_value=True), \
+             patch.object(scrum, "_test_command", return_value=["pytest"]), \
+             patch.object(scrum, "_run_verification", side_effect=run_tests), \
+             patch.object(scrum, "_run_learning_phase"):
+            scrum._set_state("PLANNING")
+            scrum._run_autonomous_loop("Build it", is_continuation=True)
+        reports = [c.args[1] for c in mem.log_interaction.call_args_list if c.args[1].startswith("Test Output")]
+        return scrum, turns, reports
+
+    def test_reviewer_runs_during_tests_and_rechecks_failures(self):
+        scrum, turns, reports = self._sprint("FAILED")
+        self.assertEqual(turns, [("NAVIGATOR", None), ("DRIVER", None),
+                                 ("REVIEWER", scrum_module.TESTS_PENDING_NOTE), ("REVIEWER", scrum_module.SECOND_REVIEW_NOTE)])
+        self.assertEqual(reports, ["Test Output (FAILED)"])
+
+    def test_passing_tests_keep_the_approval(self):
+        scrum, turns, reports = self._sprint("PASSED")
+        self.assertEqual([role for role, _ in turns], ["NAVIGATOR", "DRIVER", "REVIEWER"])
+        self.assertEqual(reports, [])  # posting it would bury the reviewer's STATUS: COMPLETED
+        self.assertEqual(scrum.state, "IDLE")
+
+class TestImpactAnalysis(unittest.TestCase):
+    FILES = {
+        "requirements.txt": "",
+        "pkg/__init__.py": "",
+        "pkg/core.py": "VALUE = 1\n",
+        "pkg/util.py": "from .core import VALUE\n",
+        "pkg/other.py": "OTHER = 2\n",
+        "tests/test_util.py": "from pkg import util\n",
+        "tests/test_other.py": "import pkg.other\n",
+    }
+
+    def setUp(self):
+        self.repo = tempfile.mkdtemp()
+        _init_repo(self.repo)
+        for path, text in self.FILES.items():
+            self._write(path, text)
+        _git(self.repo, "add", "-A")
+        _git(self.repo, "commit", "-q", "-m", "project")
+        self.impact = ImpactAnalyzer(self.repo)
+
+    def tearDown(self):
+        shutil.rmtree(self.repo, ignore_errors=True)
+
+    def _write(self, path, text):
+        full = os.path.join(self.repo, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w") as f:
+            f.write(text)
+
+    def test_selects_tests_that_import_changed_modules(self):
+        self.impact.mark()
+        self.assertEqual(self.impact.select(), [])
+        self._write("pkg/core.py", "VALUE = 3\n")
+        self.assertEqual(self.impact.select(), ["tests/test_util.py"])  # through pkg.util's relative import
+        self._write("tests/test_new.py", "from pkg.other import OTHER\n")
+        self.assertEqual(self.impact.select(), ["tests/test_new.py", "tests/test_util.py"])
+
+        self.impact.mark()  # the next build starts from here, untracked test file included
+        self._write("README", "docs only\n")
+        self.assertIsNone(self.impact.select())  # not Python: can't tell, run everything
+        self.impact.mark()
+        self._write("notes.md", "x\n")
+        self.assertEqual(self.impact.select(), [])
+
+    def test_verification_runs_affected_tests_then_full_suite_on_triggers(self):
+        scrum = ScrumMaster(MagicMock(spec=SubprocessManager), MagicMock(spec=MemoryCore))
+        scrum.set_project_path(self.repo)
+        commands = []
+
+        def run(command, **kwargs):
+            commands.append(command)
+            return 0, "ok", {"wall_s": 0.1, "timed_out": False}
+        with patch.object(scrum_module, "run_measured", side_effect=run), \
+             patch.object(scrum_module.impact, "FULL_SUITE_EVERY", 3):
+            scrum.impact.mark()
+            self._write("pkg/other.py", "OTHER = 4\n")
+            scrum.iteration = 1
+            self.assertEqual(scrum._run_verification(post=False)["status"], "PASSED")
+            self.assertEqual(commands, [["pytest", "tests/test_other.py"]])
+            self.assertTrue(scrum._full_suite_pending)
+
+            scrum.iteration = 3
+            scrum._run_verification(post=False)
+            self.assertEqual(commands[1:], [["pytest", "tests/test_other.py"], ["pytest"]])
+            self.assertFalse(scrum._full_suite_pending)
+
+            scrum.iteration = 4
+            scrum._run_verification(post=False, full=True)
+            self.assertEqual(commands[3:], [["pytest"]])
+
+    def test_failed_full_suite_is_not_pending_again(self):
+        # The reviewer may rule a full-suite failure unrelated; it must not be re-run before completing.
+        scrum = ScrumMaster(MagicMock(spec=SubprocessManager), MagicMock(spec=MemoryCore))
+        scrum.set_project_path(self.repo)
+        failing = lambda command, **kwargs: (1, "1 failed", {"wall_s": 0.1, "timed_out": False})
+        with patch.object(scrum_module, "run_measured", side_effect=failing):
+            scrum.impact.mark()
+            self._write("pkg/other.py", "OTHER = 4\n")
+            scrum.iteration = 1
+            self.assertEqual(scrum._run_verification(post=False)["status"], "FAILED")
+            self.assertTrue(scrum._full_suite_pending)  # the affected tests failed before the suite ran
+
+            self.assertEqual(scrum._run_verification(post=False, full=True)["status"], "FAILED")
+            self.assertFalse(scrum._full_suite_pending)
+
 if __name__ == '__main__':
     unittest.main()
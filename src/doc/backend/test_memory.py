@@ -0,0 +1,265 @@
+import unittest
+import hashlib
+import math
+import shutil
+import tempfile
+import os
+import threading
+import gc
+import weakref
+from chromadb.api.types import EmbeddingFunction
+from doc.backend.memory import MemoryCore, parse_cursor
+from doc.backend.context_cursors import ContextCursors
+
+class BagOfWordsEmbedding(EmbeddingFunction):
+    """Deterministic offline embedding: hashed bag of words, L2-normalised."""
+    def __init__(self, dim=64):
+        self.dim = dim
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vec = [0.0] * self.dim
+            for word in text.lower().split():
+                vec[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1.0
+            norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+            vectors.append([v / norm for v in vec])
+        return vectors
+
+    @staticmethod
+    def name():
+        return "test-bag-of-words"
+
+    def get_config(self):
+        return {"dim": self.dim}
+
+    @staticmethod
+    def build_from_config(config):
+        return BagOfWordsEmbedding(config["dim"])
+
+class TestMemoryCore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.mem = MemoryCore(os.path.join(self.tmp, ".brain/memory.db"), embedding_function=BagOfWordsEmbedding())
+
+    def tearDown(self):
+        self.mem.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_skills_dedup_on_insert(self):
+        first = self.mem.add_memory("skills", "Always check for null values in JSON parsing", {"task": "a"})
+        again = self.mem.add_memory("skills", "always check for null values in json parsing", {"task": "b"})
+        other = self.mem.add_memory("skills", "Pin setuptools when using Python 3.12", {"task": "c"})
+
+        self.assertEqual(first, again)
+        self.assertNotEqual(first, other)
+        entry = self.mem._get_collection("skills").get(ids=[first])
+        self.assertEqual(entry["metadatas"][0]["count"], 2)
+        self.assertEqual(entry["metadatas"][0]["last_task"], "b")
+
+    def test_compact_existing_duplicates(self):
+        # Simulate a pre-dedup database by writing straight to the collection.
+        collection = self.mem._get_collection("skills")
+        docs = ["Run tests before commit", "run tests before commit", "Use snake case for variables"]
+        collection.add(
+            documents=docs,
+            metadatas=[{"timestamp": f"2024-01-0{i + 1}"} for i in range(3)],
+            ids=["a", "b", "c"]
+        )
+
+        removed = self.mem.compact_collection("skills")
+
+        self.assertEqual(removed, 1)
+        remaining = collection.get(include=["metadatas"])
+        self.assertEqual(sorted(remaining["ids"]), ["a", "c"])
+        counts = dict(zip(remaining["ids"], [m.get("count", 1) for m in remaining["metadatas"]]))
+        self.assertEqual(counts["a"], 2)
+
+    def test_huddle_scoped_to_active_mission(self):
+        first = self.mem.start_mission()
+        self.mem.log_interaction("claude", "STATUS: COMPLETED")
+        second = self.mem.start_mission()
+
+        self.assertEqual(self.mem.get_latest_status(), "IDLE")
+        self.mem.log_interaction("codex", "Working on it")
+        self.assertEqual(self.mem.get_latest_status(), "Working on it")
+        self.assertNotIn("COMPLETED", self.mem.get_recent_huddle())
+        self.assertEqual(self.mem.list_missions(), sorted([first, second]))
+
+        path = self.mem.archive_mission(first)
+        self.assertIn("STATUS: COMPLETED", open(path).read())
+        self.assertEqual(self.mem.list_missions(), [second])
+
+    def test_since_cursor_returns_only_new_entries(self):
+        self.mem.start_mission()
+        entries, cursor = self.mem.since(None)
+        self.assertEqual((entries, parse_cursor(cursor)[1]), ([], 0))
+
+        self.mem.log_interaction("claude", "plan")
+        self.mem.log_interaction("codex", "build")
+        self.mem.flush()
+        entries, cursor = self.mem.since(cursor)
+        self.assertEqual([e["message"] for e in entries], ["plan", "build"])
+        self.assertEqual(parse_cursor(cursor)[1], 2)
+
+        self.assertEqual(self.mem.since(cursor), ([], cursor))
+        self.mem.log_interaction("claude", "review")
+        self.mem.flush()
+        entries, cursor = self.mem.since(cursor)
+        self.assertEqual([(e["seq"], e["agent"]) for e in entries], [(3, "claude")])
+
+    def test_idle_since_polls_do_not_touch_the_database(self):
+        self.mem.start_mission()
+        self.mem.log_interaction("claude", "plan")
+        self.mem.flush()
+        entries, cursor = self.mem.since(None)
+        self.assertEqual(len(entries), 1)
+
+        opened = []
+        find_collection = self.mem._find_collection
+        self.mem._find_collection = lambda name: opened.append(name) or find_collection(name)
+        for _ in range(10):
+            self.assertEqual(self.mem.since(cursor), ([], cursor))
+        self.assertEqual(opened, [])
+
+        self.mem.log_interaction("codex", "build")
+        self.mem.flush()
+        self.assertEqual([e["message"] for e in self.mem.since(cursor)[0]], ["build"])
+        self.assertEqual(len(opened), 1)
+
+    def test_since_replays_a_cleared_partition_refilled_past_the_cursor(self):
+        self.mem.start_mission()
+        self.mem.log_interaction("claude", "old")
+        self.mem.flush()
+        entries, cursor = self.mem.since(None)
+        self.assertEqual(parse_cursor(cursor)[1], 1)
+
+        self.mem.clear_huddle()
+        for i in range(1, 6):
+            self.mem.log_interaction("codex", f"new {i}")
+        self.mem.flush()
+        entries, next_cursor = self.mem.since(cursor)
+        self.assertEqual([e["seq"] for e in entries], [1, 2, 3, 4, 5])
+        self.assertNotEqual(parse_cursor(next_cursor)[0], parse_cursor(cursor)[0])
+        self.assertEqual(self.mem.since(next_cursor), ([], next_cursor))
+
+    def test_reads_do_not_create_collections(self):
+        mission = self.mem.start_mission()
+        self.assertEqual(self.mem.since(None)[0], [])
+        self.assertEqual(self.mem.get_recent_huddle(), "*Huddle is empty*")
+        self.assertEqual(self.mem.get_latest_status(), "IDLE")
+        self.assertEqual(self.mem.query_memory("skills", "anything"), {"documents": [[]], "metadatas": [[]]})
+        self.assertEqual(self.mem.list_missions(), [])
+        self.assertEqual(self.mem.client.list_collections(), [])
+
+        # The first write creates the partition; a reader that polled it empty still gets every entry.
+        entries, cursor = self.mem.since(None)
+        self.mem.log_interaction("claude", "plan")
+        self.mem.flush()
+        entries, cursor = self.mem.since(cursor)
+        self.assertEqual([e["message"] for e in entries], ["plan"])
+        self.assertEqual(self.mem.list_missions(), [mission])
+
+    def test_concurrent_producers_single_writer(self):
+        self.mem.start_mission()
+
+        def produce(agent):
+            for i in range(25):
+                self.mem.log_interaction(agent, f"{agent} line {i}")
+
+        threads = [threading.Thread(target=produce, args=(f"agent{n}",)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # Reads through get_latest_status/get_recent_huddle see every write enqueued before them.
+        self.mem.log_interaction("System", "STATUS: COMPLETED")
+        self.assertEqual(self.mem.get_latest_status(), "STATUS: COMPLETED")
+        entries, cursor = self.mem.since(None)
+        self.assertEqual(len(entries), 101)
+        self.assertEqual([e["seq"] for e in entries], list(range(1, 102)))
+
+    def test_context_cursors_send_each_agent_only_new_entries(self):
+        mission = self.mem.start_mission()
+        cursors = ContextCursors(self.mem, max_entries=2, summary_lines=3)
+        for i in range(3):
+            self.mem.log_interaction("claude", f"plan step {i}\nwith details")
+
+        summary, recent = cursors.take("codex", mission)
+        self.assertEqual(summary, "- claude: plan step 0 with details")  # older than max_entries
+        self.assertEqual(recent, "**claude**: plan step 1\nwith details\n\n**claude**: plan step 2\nwith details")
+        cursors.advance("codex", mission)
+
+        self.mem.log_interaction("codex", "Work done.")
+        summary, recent = cursors.take("codex", mission)
+        self.assertEqual(recent, "**codex**: Work done.")
+        self.assertEqual(len(summary.splitlines()), 3)
+        cursors.advance("codex", mission)
+        summary, recent = cursors.take("codex", mission)
+        self.assertEqual(recent, "")
+        self.assertEqual(summary.splitlines(), ["- (1 earlier entries not shown)",
+                                                "- claude: plan step 1 with details",
+                                                "- claude: plan step 2 with details",
+                                                "- codex: Work done."])
+
+        # Another agent has its own cursor.
+        self.assertIn("Work done.", cursors.take("claude", mission)[1])
+        self.assertEqual(parse_cursor(cursors.cursor("codex", mission))[1], 4)
+
+    def test_context_cursors_move_only_when_the_turn_completes(self):
+        mission = self.mem.start_mission()
+        cursors = ContextCursors(self.mem, max_entries=10)
+        self.mem.log_interaction("claude", "plan")
+        self.assertEqual(cursors.take("codex", mission), ("", "**claude**: plan"))
+
+        # The turn was killed before advance(): the retry gets the same entries again.
+        self.assertEqual(cursors.take("codex", mission), ("", "**claude**: plan"))
+        cursors.advance("codex", mission)
+        self.mem.log_interaction("claude", "more")
+        self.assertEqual(cursors.take("codex", mission), ("- claude: plan", "**claude**: more"))
+
+        cursors.reset("codex")
+        self.assertEqual(cursors.take("codex", mission), ("", "**claude**: plan\n\n**claude**: more"))
+        cursors.advance("codex", mission)
+
+        # After a clear, entries that refill the partition past the old cursor are all sent.
+        self.mem.clear_huddle()
+        for i in range(3):
+            self.mem.log_interaction("claude", f"new {i}")
+        summary, recent = cursors.take("codex", mission)
+        self.assertEqual(summary, "")
+        self.assertEqual(recent.count("**claude**: new"), 3)
+
+    def test_close_stops_the_writer_and_rejects_further_use(self):
+        self.mem.log_interaction("claude", "last words")
+        writer = self.mem._writer
+        self.mem.close()
+        self.assertFalse(writer.is_alive())
+
+        # Pending writes landed before the writer stopped.
+        reopened = MemoryCore(os.path.join(self.tmp, ".brain/memory.db"), embedding_function=BagOfWordsEmbedding())
+        try:
+            self.assertIn("last words", reopened.get_recent_huddle(1))
+        finally:
+            reopened.close()
+
+        # A closed core fails fast instead of blocking on the stopped writer.
+        self.assertFalse(self.mem.flush(timeout=None))
+        with self.assertRaises(RuntimeError):
+            self.mem.add_memory("skills", "too late")
+        self.mem.log_interaction("claude", "dropped")  # warns, doesn't raise
+
+    def test_abandoned_core_is_collected_and_its_writer_exits(self):
+        core = MemoryCore(os.path.join(self.tmp, ".brain/other.db"), embedding_function=BagOfWordsEmbedding())
+        core.log_interaction("claude", "hello")
+        core.add_memory("skills", "one lesson")  # last op the writer saw holds a bound method of the core
+        writer, ref = core._writer, weakref.ref(core)
+        del core
+        gc.collect()
+        self.assertIsNone(ref())
+        writer.join(5)
+        self.assertFalse(writer.is_alive())
+
+if __name__ == '__main__':
+    unittest.main()
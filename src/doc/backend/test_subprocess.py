@@ -0,0 +1,521 @@
+import unittest
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import threading
+from doc.backend.subprocess_manager import SubprocessManager
+from doc.backend.async_subprocess_manager import AsyncSubprocessManager
+from doc.backend.log_dispatcher import LogDispatcher
+from doc.backend.session_pool import SessionPool
+from doc.backend.resource_usage import run_measured
+from doc.backend.process_group import limited_command
+from doc.backend.pty_output import clean_line
+from doc.backend.agent_events import EventParser
+from doc.backend.run_log import RunLog, RunLogWriter
+from doc.backend.scheduler import AgentScheduler
+import doc.backend.fake_agent as fake_agent
+
+PRINT_THREE = [sys.executable, "-c", "print('one'); print('two'); print('three')"]
+# Leader prints a grandchild's pid; the grandchild sleeps (sharing the pipe) after the leader is done.
+SPAWN_GRANDCHILD = [sys.executable, "-c",
+                    "import subprocess, sys, time; "
+                    "p = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']); "
+                    "print(p.pid, flush=True); time.sleep(float(sys.argv[1]))"]
+
+# Writes without flushing, then stalls: a pipe holds "early" back until exit, a terminal doesn't.
+UNFLUSHED = [sys.executable, "-c",
+             "import sys, time; sys.stdout.write('\\x1b[32mearly\\x1b[0m\\n'); time.sleep(1.5); print('late')"]
+
+def _first_line_delay(sm, **kwargs):
+    arrivals = []
+    sm.register_callback(lambda agent, msg: arrivals.append((time.monotonic(), msg)))
+    started = time.monotonic()
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONUNBUFFERED"}
+    assert sm.start_subprocess("agent", UNFLUSHED, env=env, **kwargs)
+    assert sm.wait_for_process("agent", timeout=10)
+    return arrivals[0][0] - started, [msg for _, msg in arrivals]
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # A killed but not yet reaped grandchild shows up as a zombie.
+    with open(f"/proc/{pid}/stat") as f:
+        return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+
+class TestSubprocessManager(unittest.TestCase):
+    def test_threaded_callbacks(self):
+        sm = SubprocessManager()
+        captured = []
+        sm.register_callback(lambda agent, msg: captured.append((agent, msg)))
+
+        self.assertTrue(sm.start_subprocess("agent", PRINT_THREE))
+        self.assertTrue(sm.wait_for_process("agent", timeout=10))
+        # Output is read asynchronously; the terminated marker is always the last line.
+        for _ in range(100):
+            if ("agent", "Process terminated.") in captured:
+                break
+            time.sleep(0.02)
+        self.assertEqual([m for _, m in captured], ["one", "two", "three", "Process terminated."])
+
+    def test_completion_record_has_resource_stats(self):
+        sm = SubprocessManager()
+        busy = "x = bytearray(64 * 1024 * 1024); sum(range(3_000_000)); print('done')"
+        self.assertTrue(sm.start_subprocess("agent", [sys.executable, "-c", busy]))
+        self.assertTrue(sm.wait_for_process("agent", timeout=30))
+
+        stats = sm.last_run_stats("agent")
+        self.assertEqual(stats["exit_code"], 0)
+        self.assertEqual(stats["output_bytes"], len("done\n"))
+        self.assertGreater(stats["wall_s"], 0)
+        self.assertGreater(stats["cpu_user_s"] + stats["cpu_sys_s"], 0)
+        self.assertGreater(stats["peak_rss_kb"], 64 * 1024)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "process groups and /proc")
+    def test_peak_rss_covers_the_process_group(self):
+        # The leader never waits for its child, so only group sampling sees the child's memory.
+        child = "import time; x = bytearray(96 * 1024 * 1024); time.sleep(2)"
+        leader = f"import subprocess, sys, time; subprocess.Popen([sys.executable, '-c', {child!r}]); time.sleep(1.5)"
+        code, _, stats = run_measured([sys.executable, "-c", leader], timeout=30)
+        self.assertEqual(code, 0)
+        self.assertGreater(stats["peak_rss_kb"], 96 * 1024)
+
+    def test_run_measured_timeout(self):
+        code, output, stats = run_measured([sys.executable, "-c", "import time; print('hi', flush=True); time.sleep(30)"], timeout=0.5)
+        self.assertTrue(stats["timed_out"])
+        self.assertNotEqual(code, 0)
+        self.assertIn("hi", output)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "process groups and /proc")
+    def test_kill_all_takes_down_process_group(self):
+        sm = SubprocessManager()
+        pids = []
+        sm.register_callback(lambda agent, msg: msg.isdigit() and pids.append(int(msg)))
+        self.assertTrue(sm.start_subprocess("agent", SPAWN_GRANDCHILD + ["60"]))
+        for _ in range(100):
+            if pids:
+                break
+            time.sleep(0.05)
+        self.assertTrue(pids)
+
+        sm.kill_all(grace=1)
+        self.assertFalse(_pid_alive(pids[0]))
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "process groups and /proc")
+    def test_orphans_reaped_when_leader_exits(self):
+        sm = SubprocessManager()
+        pids = []
+        sm.register_callback(lambda agent, msg: msg.isdigit() and pids.append(int(msg)))
+        self.assertTrue(sm.start_subprocess("agent", SPAWN_GRANDCHILD + ["0"]))
+        self.assertTrue(sm.wait_for_process("agent", timeout=10))
+        # The grandchild held the pipe open; completion means it was torn down, not waited out.
+        self.assertEqual(sm.last_run_stats("agent")["exit_code"], 0)
+        self.assertFalse(_pid_alive(pids[0]))
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "POSIX rlimits")
+    def test_rlimits_applied(self):
+        sm = SubprocessManager()
+        captured = []
+        sm.register_callback(lambda agent, msg: captured.append(msg))
+        show = "import resource; print(resource.getrlimit(resource.RLIMIT_NOFILE)[0])"
+        self.assertTrue(sm.start_subprocess("agent", [sys.executable, "-c", show], limits={"nofile": 64}))
+        self.assertTrue(sm.wait_for_process("agent", timeout=10))
+        self.assertEqual(captured[0], "64")
+
+        # Without limits the command runs as is; a bad one still fails at spawn, like Popen.
+        self.assertEqual(limited_command(["echo", "hi"], {}), ["echo", "hi"])
+        with self.assertRaises(ValueError):
+            limited_command(["echo"], {"stack": 1})
+        with self.assertRaises(FileNotFoundError):
+            limited_command(["no-such-agent-binary"], {"nofile": 64})
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "pseudo-terminals")
+    def test_pty_delivers_lines_as_written(self):
+        delay, lines = _first_line_delay(SubprocessManager(), pty=True)
+        self.assertLess(delay, 1.0)
+        self.assertEqual(lines, ["early", "late", "Process terminated."])
+
+        delay, _ = _first_line_delay(SubprocessManager(), pty=False)
+        self.assertGreater(delay, 1.0)
+
+    def test_clean_line_strips_terminal_sequences(self):
+        self.assertEqual(clean_line("\x1b[1;31mError\x1b[0m: boom\n"), "Error: boom\n")
+        self.assertEqual(clean_line("\x1b]0;title\x07Working 10%\rWorking 100%"), "Working 100%")
+        self.assertEqual(clean_line("\x1b[2K\x1b[1Gdone\x08!"), "done!")
+        # Terminals end lines with CRLF; that ending isn't a redraw.
+        self.assertEqual(clean_line("hello\r\n"), "hello\n")
+        self.assertEqual(clean_line("hello\r"), "hello")
+        self.assertEqual(clean_line("Working 10%\rWorking 100%\r\n"), "Working 100%\n")
+
+    def test_run_output_written_to_disk_log(self):
+        with tempfile.TemporaryDirectory() as log_dir:
+            sm = SubprocessManager()
+            sm.run_log_dir = log_dir
+            self.assertTrue(sm.start_subprocess("agent", [sys.executable, "-c", "for i in range(1000): print(f'line {i}')"]))
+            self.assertTrue(sm.wait_for_process("agent", timeout=10))
+
+            log = sm.run_log("agent")
+            self.assertEqual(sm.last_run_stats("agent")["log_path"], log.path)
+            self.assertEqual(log.line_count(), 1000)
+            self.assertEqual(log.read(500, 503), ["line 500", "line 501", "line 502"])
+            self.assertEqual(log.tail(2), ["line 998", "line 999"])
+
+    def test_concurrent_runs_of_one_agent_are_capped_and_kept_apart(self):
+        sm = SubprocessManager(scheduler=AgentScheduler(max_total=4, max_per_agent=1))
+        sleep = [sys.executable, "-c", "import time; time.sleep(0.3); print('ok')"]
+        first = sm.submit("agent", sleep)
+        second = sm.submit("agent", sleep)
+        self.assertNotEqual(first.run_id, second.run_id)
+        self.assertEqual((first.state, second.state), ("running", "queued"))
+        self.assertEqual(sm.scheduler_stats()["agents"]["agent"], {"running": 1, "queued": 1, "limit": 1})
+
+        self.assertTrue(sm.wait_for_run(second.run_id, timeout=10))
+        self.assertEqual((first.state, second.state), ("finished", "finished"))
+        records = {r["run_id"]: r for r in sm.run_history}
+        self.assertEqual(set(records), {first.run_id, second.run_id})
+        self.assertGreater(records[second.run_id]["queued_s"], 0.2)
+
+    def test_run_results_report_why_a_run_ended(self):
+        sm = SubprocessManager(scheduler=AgentScheduler(max_total=4))
+        ok = sm.start_subprocess("ok", PRINT_THREE)
+        bad = sm.start_subprocess("bad", [sys.executable, "-c", "import sys; sys.exit(3)"])
+        slow = sm.start_subprocess("slow", [sys.executable, "-c", "import time; time.sleep(30)"])
+        self.assertFalse(sm.start_subprocess("missing", ["/no/such/binary"]))
+        self.assertEqual(sm.scheduler.latest("missing").result(timeout=1).reason, "start_failed")
+
+        # Wait on several at once; the sleeper is still going when the others are done.
+        results = sm.wait_runs([ok, bad, slow], timeout=5, first=True)
+        self.assertIsNotNone(results[ok.run_id] or results[bad.run_id])
+        results = sm.wait_runs([ok, bad, slow], timeout=2)
+        self.assertIsNone(results[slow.run_id])
+        self.assertEqual(results[ok.run_id].reason, "completed")
+        self.assertEqual((results[bad.run_id].reason, results[bad.run_id].exit_code), ("nonzero_exit", 3))
+        self.assertEqual(results[ok.run_id].stats["output_lines"], 3)
+
+        self.assertTrue(sm.kill_run(slow.run_id, reason="timeout", grace=1))
+        result = slow.result(timeout=10)
+        self.assertEqual(result.reason, "timeout")
+        self.assertGreater(result.duration_s, 1)
+
+    def test_kill_all_cancels_queued_runs(self):
+        sm = SubprocessManager(scheduler=AgentScheduler(max_total=1))
+        running = sm.submit("a", [sys.executable, "-c", "import time; time.sleep(30)"])
+        queued = sm.submit("b", PRINT_THREE)
+        sm.kill_all(grace=1, reason="rate_limited")
+        self.assertEqual(queued.result(timeout=1).reason, "cancelled")
+        self.assertEqual(running.result(timeout=10).reason, "rate_limited")
+
+class TestAsyncSubprocessManager(unittest.TestCase):
+    def test_compat_api(self):
+        sm = AsyncSubprocessManager()
+        captured = []
+        sm.register_callback(lambda agent, msg: captured.append(msg))
+
+        self.assertTrue(sm.start_subprocess("agent", PRINT_THREE))
+        self.assertTrue(sm.wait_for_process("agent", timeout=10))
+        self.assertEqual(captured, ["one", "two", "three", "Process terminated."])
+        self.assertNotIn("agent", sm.active_processes)
+
+    def test_slow_callback_does_not_block_the_loop(self):
+        sm = AsyncSubprocessManager(log_queue_size=1, log_overflow="block")
+        release = threading.Event()
+        seen = []
+        sm.register_callback(lambda agent, msg: (release.wait(10), seen.append((agent, msg))))
+        self.assertTrue(sm.start_subprocess("chatty", [sys.executable, "-c", "for i in range(50): print(i)"]))
+        time.sleep(0.5)  # the queue is full and the chatty pipe is held back
+
+        # The loop still answers, and another agent still starts and runs to completion.
+        ping = asyncio.run_coroutine_threadsafe(asyncio.sleep(0, result="pong"), sm.loop)
+        self.assertEqual(ping.result(timeout=1), "pong")
+        self.assertTrue(sm.start_subprocess("quiet", [sys.executable, "-c", "pass"]))
+        self.assertTrue(sm.scheduler.latest("quiet").exited.wait(5))
+
+        release.set()
+        self.assertTrue(sm.wait_for_process("chatty", timeout=10))
+        self.assertEqual([msg for agent, msg in seen if agent == "chatty"], [str(i) for i in range(50)] + ["Process terminated."])
+
+    def test_timeout_and_kill(self):
+        sm = AsyncSubprocessManager()
+        self.assertTrue(sm.start_subprocess("sleeper", [sys.executable, "-c", "import time; time.sleep(30)"]))
+        self.assertFalse(sm.wait_for_process("sleeper", timeout=0.2))
+        sm.kill_all()
+        self.assertEqual(sm.active_processes, {})
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "process groups and /proc")
+    def test_kill_all_takes_down_process_group(self):
+        sm = AsyncSubprocessManager()
+        pids = []
+        sm.register_callback(lambda agent, msg: msg.isdigit() and pids.append(int(msg)))
+        self.assertTrue(sm.start_subprocess("agent", SPAWN_GRANDCHILD + ["60"]))
+        for _ in range(100):
+            if pids:
+                break
+            time.sleep(0.05)
+        self.assertTrue(pids)
+        sm.kill_all()
+        self.assertFalse(_pid_alive(pids[0]))
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "pseudo-terminals")
+    def test_pty_delivers_lines_as_written(self):
+        delay, lines = _first_line_delay(AsyncSubprocessManager(), pty=True)
+        self.assertLess(delay, 1.0)
+        self.assertEqual(lines, ["early", "late", "Process terminated."])
+
+    def test_runs_queue_behind_cap(self):
+        sm = AsyncSubprocessManager(scheduler=AgentScheduler(max_total=1))
+        captured = []
+        sm.register_callback(lambda agent, msg: captured.append((agent, msg)))
+        self.assertTrue(sm.start_subprocess("a", [sys.executable, "-c", "import time; time.sleep(0.3); print('a')"]))
+        self.assertTrue(sm.start_subprocess("b", [sys.executable, "-c", "print('b')"]))
+        self.assertEqual(sm.scheduler_stats()["queued"], 1)
+        self.assertTrue(sm.wait_for_process("b", timeout=10))
+        self.assertLess(captured.index(("a", "a")), captured.index(("b", "b")))
+
+    def test_coroutine_api(self):
+        async def scenario():
+            sm = AsyncSubprocessManager(loop=asyncio.get_running_loop())
+            handle = await sm.start("agent", [sys.executable, "-c", "import time; time.sleep(0.2); print('a'); print('b')"])
+            lines = [line async for line in handle.lines()]
+            return lines, await handle.wait(5)
+
+        lines, code = asyncio.run(scenario())
+        self.assertEqual(lines, ["a", "b"])
+        self.assertEqual(code, 0)
+
+class TestLogDispatcher(unittest.TestCase):
+    def _gated(self, overflow):
+        gate = threading.Event()
+        received = []
+        def slow_callback(agent, msg):
+            gate.wait(5)
+            received.append(msg)
+        return LogDispatcher([slow_callback], maxsize=2, overflow=overflow), gate, received
+
+    def test_drop_oldest_never_blocks_reader(self):
+        dispatcher, gate, received = self._gated("drop-oldest")
+        start = time.monotonic()
+        for i in range(10):
+            dispatcher.submit("agent", str(i))
+        self.assertLess(time.monotonic() - start, 1)
+        gate.set()
+        self.assertTrue(dispatcher.flush(5))
+        stats = dispatcher.stats()
+        self.assertGreater(stats["dropped"], 0)
+        self.assertEqual(len(received) + stats["dropped"], 10)
+        self.assertEqual(received[-1], "9")
+
+    def test_spill_preserves_order(self):
+        dispatcher, gate, received = self._gated("spill")
+        for i in range(20):
+            dispatcher.submit("agent", str(i))
+        self.assertGreater(dispatcher.stats()["spilled"], 0)
+        gate.set()
+        self.assertTrue(dispatcher.flush(5))
+        self.assertEqual(received, [str(i) for i in range(20)])
+        self.assertEqual(dispatcher.stats()["spill_pending"], 0)
+
+    def test_batching_coalesces_per_process(self):
+        chunks, lines = [], []
+        dispatcher = LogDispatcher([], batch_lines=64, batch_ms=50)
+        batch_cb = lambda agent, batch: chunks.append((agent, list(batch)))
+        dispatcher.callbacks.extend([batch_cb, lambda agent, msg: lines.append(msg)])
+        dispatcher.batch_callbacks.add(batch_cb)
+
+        for i in range(130):
+            dispatcher.submit("codex", str(i))
+        dispatcher.submit("claude", "hello")
+        self.assertTrue(dispatcher.flush(5))
+
+        codex_sizes = [len(batch) for agent, batch in chunks if agent == "codex"]
+        self.assertEqual(sum(codex_sizes), 130)
+        self.assertLessEqual(max(codex_sizes), 64)
+        self.assertLess(len(chunks), 10)
+        self.assertIn(("claude", ["hello"]), chunks)
+        self.assertEqual(len(lines), 131)
+
+class TestSessionPool(unittest.TestCase):
+    def setUp(self):
+        self.sm = SubprocessManager()
+        self.captured = []
+        self.sm.register_callback(lambda agent, msg: self.captured.append(msg))
+        self.pool = SessionPool(self.sm, max_turns=2)
+        self.binary = fake_agent.__file__
+
+    def tearDown(self):
+        self.pool.kill_all()
+
+    def test_turns_reuse_warm_process_and_recycle(self):
+        self.assertTrue(self.pool.start_turn("claude", "REVIEWER", self.binary, "ROLE: QA. check"))
+        pid = self.pool.active_turns["claude"].process.pid
+        self.assertTrue(self.pool.wait_turn("claude", timeout=10))
+        self.assertIn("STATUS: COMPLETED", self.captured)
+
+        self.assertTrue(self.pool.start_turn("claude", "REVIEWER", self.binary, "again"))
+        self.assertEqual(self.pool.active_turns["claude"].process.pid, pid)
+        self.assertTrue(self.pool.wait_turn("claude", timeout=10))
+
+        # max_turns reached: the third turn gets a fresh process.
+        self.assertTrue(self.pool.start_turn("claude", "REVIEWER", self.binary, "third"))
+        self.assertNotEqual(self.pool.active_turns["claude"].process.pid, pid)
+        self.assertTrue(self.pool.wait_turn("claude", timeout=10))
+
+    def test_turns_take_a_scheduler_slot(self):
+        self.sm.scheduler.agent_limits["claude"] = 1
+        busy = self.sm.start_subprocess("claude", [sys.executable, "-c", "import time; time.sleep(1)"])
+        # The cap is taken by a spawned run: the session turn declines, spawn-per-turn would queue.
+        self.assertFalse(self.pool.start_turn("claude", "REVIEWER", self.binary, "check"))
+        self.assertEqual(self.sm.scheduler.stats()["queued"], 0)
+        self.assertTrue(self.sm.wait_for_process("claude", timeout=10))
+
+        self.assertTrue(self.pool.start_turn("claude", "REVIEWER", self.binary, "check"))
+        self.assertEqual(self.sm.scheduler.stats()["agents"]["claude"]["running"], 1)
+        queued = self.sm.submit("claude", [sys.executable, "-c", "print('after')"])
+        self.assertEqual(queued.state, "queued")
+        self.assertTrue(self.pool.wait_turn("claude", timeout=10))
+        self.assertEqual(queued.result(timeout=10).reason, "completed")
+        self.assertTrue(busy)
+
+    def test_turn_that_ended_before_the_wait_frees_its_slot(self):
+        self.assertTrue(self.pool.start_turn("claude", "REVIEWER", self.binary, "ROLE: QA. check"))
+        session = self.pool.active_turns["claude"]
+        for _ in range(200):
+            if not session.busy:
+                break
+            time.sleep(0.05)
+        self.assertFalse(session.busy)
+        # The session released the slot itself; nobody has waited yet.
+        self.assertEqual(self.sm.scheduler.stats()["running"], 0)
+        self.assertTrue(self.pool.has_turn("claude"))
+        started = time.monotonic()
+        self.assertTrue(self.pool.wait_turn("claude", timeout=5))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertFalse(self.pool.has_turn("claude"))
+
+    def test_falls_back_when_agent_has_no_session_mode(self):
+        self.assertFalse(self.pool.start_turn("codex", "DRIVER", self.binary, "build"))
+        self.assertFalse(self.pool.start_turn("claude", "DRIVER", "/nonexistent/agent-binary", "build"))
+
+if __name__ == '__main__':
+    unittest.main()
+
+class TestEventParser(unittest.TestCase):
+    def test_claude_stream_json_in_arbitrary_chunks(self):
+        stream = "\n".join([
+            '{"type": "system", "subtype": "init", "session_id": "s"}',
+            '{"type": "stream_event", "event": {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Hel"}}}',
+            '{"type": "assistant", "message": {"content": [{"type": "text", "text": "Hello"}, '
+            '{"type": "tool_use", "name": "Bash", "input": {"command": "ls"}}], "usage": {"output_tokens": 3}}}',
+            '{"type": "result", "result": "Hello", "is_error": false, "usage": {"input_tokens": 10, "output_tokens": 3}}',
+        ]) + "\n"
+        parser = EventParser()
+        events = []
+        for i in range(0, len(stream), 7):
+            events.extend(parser.feed(stream[i:i + 7]))
+        events.extend(parser.close())
+
+        self.assertEqual([e.kind for e in events], ["system", "text", "text", "tool_call", "usage", "usage", "result"])
+        self.assertTrue(events[1].delta)
+        self.assertEqual(events[3].tool, "Bash")
+        self.assertEqual(events[3].tool_input, {"command": "ls"})
+        self.assertEqual(events[5].usage["input_tokens"], 10)
+        self.assertEqual(events[6].text, "Hello")
+
+    def test_codex_json_and_plain_text(self):
+        parser = EventParser()
+        events = parser.feed(
+            '{"type": "item.started", "item": {"type": "command_execution", "command": "pytest"}}\n'
+            '{"type": "item.completed", "item": {"type": "agent_message", "text": "All green"}}\n'
+            '{"type": "turn.completed", "usage": {"input_tokens": 5, "output_tokens": 2}}\n'
+            'plain output line\n'
+        )
+        self.assertEqual([e.kind for e in events], ["tool_call", "text", "usage", "result", "text"])
+        self.assertEqual(events[0].tool_input, "pytest")
+        self.assertEqual(events[4].text, "plain output line")
+
+    def test_rate_limit_notices(self):
+        parser = EventParser()
+        (text, notice) = parser.feed_line("Limit reached · resets 12am (America/New_York)")
+        self.assertEqual((text.kind, notice.kind), ("text", "rate_limit"))
+        self.assertEqual((notice.reset, notice.reset_tz), ("12am", "America/New_York"))
+
+        events = parser.feed_line('{"type": "result", "is_error": true, "result": "Claude AI usage limit reached|1767225600"}')
+        self.assertEqual(events[-1].kind, "rate_limit")
+        self.assertEqual(events[-1].reset_epoch, 1767225600)
+        # Talking about rate limits isn't hitting one.
+        self.assertEqual([e.kind for e in parser.feed_line("We should add rate limiting to the API")], ["text"])
+        for line in ("RecursionError: recursion limit reached", "Limit reached", "  assert 'limit reached' in out",
+                     '+_RATE_LIMIT = re.compile(r"Limit reached · resets")'):
+            self.assertEqual([e.kind for e in parser.feed_line(line)], ["text"], line)
+        (_, notice) = parser.feed_line("5-hour limit reached ∙ resets 3pm")
+        self.assertEqual(notice.reset, "3pm")
+
+
+class TestRunLog(unittest.TestCase):
+    def test_sparse_index_ranges_and_tail(self):
+        with tempfile.TemporaryDirectory() as log_dir:
+            writer = RunLogWriter(log_dir, "run", index_every=4)
+            for i in range(10):
+                writer.write(f"l{i}\n")
+            writer.flush()
+            log = RunLog(log_dir, "run", index_every=4)
+            # Readable while the writer is still open.
+            self.assertEqual(log.line_count(), 10)
+            writer.write("l10")
+            writer.close()
+
+            with open(log.index_path, "rb") as f:
+                self.assertEqual(len(f.read()), 3 * 8)  # lines 0, 4, 8
+            self.assertEqual(log.line_count(), 11)
+            self.assertEqual(log.read(3, 6), ["l3", "l4", "l5"])
+            self.assertEqual(log.read(9), ["l9", "l10"])
+            self.assertEqual(log.read(20, 30), [])
+            self.assertEqual(log.tail(3), ["l8", "l9", "l10"])
+            self.assertEqual(log.tail(50), [f"l{i}" for i in range(11)])
+
+    def test_missing_log_is_empty(self):
+        log = RunLog(tempfile.gettempdir(), "no-such-run")
+        self.assertEqual((log.line_count(), log.read(), log.tail()), (0, [], []))
+
+
+class TestAgentScheduler(unittest.TestCase):
+    def _scheduler(self, **caps):
+        scheduler = AgentScheduler(**caps)
+        started = []
+        submit = lambda agent, project=None, priority=0: scheduler.submit(
+            agent, lambda run: started.append(run.run_id) or True, run_id=f"{agent}-{len(scheduler.runs)}",
+            project=project, priority=priority)
+        return scheduler, started, submit
+
+    def test_global_and_per_agent_caps(self):
+        scheduler, started, submit = self._scheduler(max_total=3, max_per_agent=2, agent_limits={"codex": 1})
+        runs = [submit("claude"), submit("claude"), submit("claude"), submit("codex"), submit("codex")]
+        self.assertEqual([r.state for r in runs], ["running", "running", "queued", "running", "queued"])
+
+        scheduler.finish(runs[0].run_id)
+        self.assertEqual(runs[2].state, "running")
+        scheduler.finish(runs[3].run_id)
+        self.assertEqual(runs[4].state, "running")
+
+    def test_priority_then_project_fairness(self):
+        scheduler, started, submit = self._scheduler(max_total=1, max_per_agent=0)
+        blocker = submit("x", project="A")
+        a1, a2 = submit("x", project="A"), submit("x", project="A")
+        b1 = submit("x", project="B")
+        urgent = submit("x", project="A", priority=5)
+
+        order = []
+        for run in (blocker, urgent, b1, a1, a2):
+            order.append(started[-1])
+            scheduler.finish(run.run_id)
+        # Priority first; then project B, which hadn't been served, before A's backlog.
+        self.assertEqual(order, [blocker.run_id, urgent.run_id, b1.run_id, a1.run_id, a2.run_id])
+
+    def test_failed_launch_releases_slot(self):
+        scheduler = AgentScheduler(max_total=1)
+        failed = scheduler.submit("x", lambda run: False, run_id="x-0")
+        self.assertEqual(failed.state, "failed")
+        self.assertTrue(failed.done.is_set())
+        self.assertEqual(scheduler.submit("x", lambda run: True, run_id="x-1").state, "running")
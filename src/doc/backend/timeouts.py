@@ -0,0 +1,95 @@
+import os
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Bounds for an agent turn's timeout; within them it follows how long past turns took.
+AGENT_TIMEOUT_MIN = float(os.getenv("DOC_AGENT_TIMEOUT_MIN", "60"))
+AGENT_TIMEOUT_MAX = float(os.getenv("DOC_AGENT_TIMEOUT_MAX", "1800"))
+# Used until an (agent, role) has AGENT_TIMEOUT_SAMPLES recorded turns in this project.
+AGENT_TIMEOUT_DEFAULT = float(os.getenv("DOC_AGENT_TIMEOUT", "120"))
+AGENT_TIMEOUT_SAMPLES = 3
+# Timeout = this percentile of past turn durations times the headroom factor.
+AGENT_TIMEOUT_PERCENTILE = float(os.getenv("DOC_AGENT_TIMEOUT_PERCENTILE", "95"))
+AGENT_TIMEOUT_HEADROOM = float(os.getenv("DOC_AGENT_TIMEOUT_HEADROOM", "1.5"))
+# Kill a streaming (PTY) agent process that printed nothing for this many seconds, whatever its total
+# runtime. Piped runs print only when their turn ends and are left to the turn timeout. 0 = off.
+STALL_TIMEOUT = float(os.getenv("DOC_STALL_TIMEOUT", "300"))
+# Durations kept per (agent, role); older turns stop counting.
+HISTORY_SIZE = 50
+
+# Outcomes whose wall time says how long the work takes. A turn cut off at its timeout counts
+# at that length, so the next limit grows; stalls and rate limits say nothing about duration.
+_DURATION_REASONS = {None, "completed", "nonzero_exit", "timeout"}
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of `values` (0-100)."""
+    ordered = sorted(values)
+    if not ordered:
+        raise ValueError("percentile of no values")
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class TimeoutPolicy:
+    """Per-turn timeouts learned from how long each (agent, role) took in this project.
+
+    Durations come from the project's .brain/run_stats.jsonl (every recorded turn that has a
+    role) and from record() as turns finish. timeout_for() is the chosen percentile of the
+    recent ones times the headroom factor, clamped to [minimum, maximum]; with too few
+    samples it is the default.
+    """
+    def __init__(self, project_path: Optional[str] = None, minimum: float = AGENT_TIMEOUT_MIN,
+                 maximum: float = AGENT_TIMEOUT_MAX, default: float = AGENT_TIMEOUT_DEFAULT,
+                 pct: float = AGENT_TIMEOUT_PERCENTILE, headroom: float = AGENT_TIMEOUT_HEADROOM,
+                 min_samples: int = AGENT_TIMEOUT_SAMPLES):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.default = default
+        self.pct = pct
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.project_path: Optional[str] = None
+        self._durations: Dict[Tuple[str, str], List[float]] = {}
+        self._lock = threading.Lock()
+        if project_path:
+            self.load(project_path)
+
+    def load(self, project_path: str):
+        """Replaces the history with the turns recorded in `project_path`'s run stats."""
+        durations: Dict[Tuple[str, str], List[float]] = {}
+        try:
+            with open(os.path.join(project_path, ".brain", "run_stats.jsonl"), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get("role") and record.get("reason") in _DURATION_REASONS and record.get("wall_s"):
+                        durations.setdefault((record["agent"], record["role"]), []).append(float(record["wall_s"]))
+        except OSError:
+            pass
+        with self._lock:
+            self.project_path = project_path
+            self._durations = {key: values[-HISTORY_SIZE:] for key, values in durations.items()}
+
+    def record(self, agent: str, role: str, wall_s: float, reason: Optional[str] = None):
+        if not role or reason not in _DURATION_REASONS:
+            return
+        with self._lock:
+            values = self._durations.setdefault((agent, role), [])
+            values.append(wall_s)
+            del values[:-HISTORY_SIZE]
+
+    def samples(self, agent: str, role: str) -> List[float]:
+        with self._lock:
+            return list(self._durations.get((agent, role), ()))
+
+    def timeout_for(self, agent: str, role: str) -> float:
+        values = self.samples(agent, role)
+        if len(values) < self.min_samples:
+            return self.default
+        learned = percentile(values, self.pct) * self.headroom
+        return round(min(self.maximum, max(self.minimum, learned)), 1)
@@ -1,6 +1,6 @@
-import time
 import os
 import sys
+from collections import deque
 from rich.console import Console
 from rich.panel import Panel
 from rich.live import Live
@@ -9,9 +9,9 @@ from rich.markdown import Markdown
 from rich.text import Text
 from rich.box import ROUNDED
 
-from doc.backend.subprocess_manager import SubprocessManager
+from doc.backend.subprocess_manager import create_subprocess_manager
 from doc.backend.scrum import ScrumMaster, ENABLE_REAL_AGENTS, CLAUDE_BIN, CODEX_BIN
-from doc.backend.memory import MemoryCore
+from doc.backend.memory import MemoryCore, parse_cursor
 
 console = Console()
 
@@ -46,6 +46,29 @@ def get_huddle_content(memory: MemoryCore) -> Markdown:
     except Exception as e:
         return Markdown(f"*Error reading Memory: {e}*")
 
+class HuddleFeed:
+    """Incrementally tails the Huddle via MemoryCore.since(); only rebuilds when new entries arrive."""
+    def __init__(self, memory: MemoryCore, size=20):
+        self.memory = memory
+        self.cursor = None
+        self.lines = deque(maxlen=size)
+        self.renderable = Markdown("*Huddle is empty / System Ready*")
+
+    def poll(self) -> bool:
+        """Fetches new entries. Returns True if the view changed."""
+        entries, cursor = self.memory.since(self.cursor)
+        # A new epoch means the huddle was cleared: the lines on screen are gone from it.
+        cleared = self.cursor is not None and parse_cursor(cursor)[0] != parse_cursor(self.cursor)[0]
+        self.cursor = cursor
+        if not entries and not cleared:
+            return False
+        if cleared:
+            self.lines.clear()
+        for entry in entries:
+            self.lines.append(f"**{entry['agent']}**: {entry['message']}")
+        self.renderable = Markdown("\n\n".join(self.lines) or "*Huddle is empty / System Ready*")
+        return True
+
 class LogBuffer:
     """Simple buffer to hold recent logs for display."""
     def __init__(self, size=10):
@@ -70,10 +93,34 @@ def handle_command(user_input: str, scrum: ScrumMaster, console: Console):
     
     if cmd == "/clear":
         scrum.memory.clear_huddle()
-        scrum.state = "IDLE"
+        scrum.reset_state()
         # log_buffer.append("SYSTEM", "Memory cleared and state reset.") # Removed to match signature
         console.print("[bold cyan][SYSTEM] Memory cleared.[/bold cyan]")
         
+    elif cmd == "/compact":
+        removed = scrum.memory.compact_collection("skills")
+        console.print(f"[bold cyan][SYSTEM] Skills compacted: {removed} duplicates merged.[/bold cyan]")
+
+    elif cmd == "/missions":
+        missions = scrum.memory.list_missions()
+        lines = [f"{m} {'(active)' if m == scrum.memory.mission_id else ''}" for m in missions]
+        console.print(Panel("\n".join(lines) or "No missions recorded.", title="Missions", border_style="blue", box=ROUNDED))
+
+    elif cmd == "/archive":
+        archived = [m for m in scrum.memory.list_missions() if m != scrum.memory.mission_id]
+        for mission_id in archived:
+            scrum.memory.archive_mission(mission_id)
+        console.print(f"[bold cyan][SYSTEM] Archived {len(archived)} past missions to .brain/logs.[/bold cyan]")
+
+    elif cmd == "/stats":
+        summary = scrum.summarize_run_stats()
+        lines = [
+            f"{key:<24} runs={v['runs']:<3} wall={v['wall_s']:.1f}s cpu={v['cpu_user_s']:.1f}u/{v['cpu_sys_s']:.1f}s "
+            f"peak={v['peak_rss_kb'] // 1024}MiB out={v['output_bytes']}B"
+            for key, v in sorted(summary.items())
+        ]
+        console.print(Panel("\n".join(lines) or "No runs recorded for this mission.", title="Run Stats", border_style="magenta", box=ROUNDED))
+
     elif cmd == "/map":
         map_path = os.path.join(scrum.project_path, ".brain/repo_map.txt")
         if os.path.exists(map_path):
@@ -93,6 +140,10 @@ def handle_command(user_input: str, scrum: ScrumMaster, console: Console):
     elif cmd == "/help":
         help_text = (
             "/clear  - Wipe Huddle Memory and reset state\n"
+            "/compact - Merge near-duplicate skills\n"
+            "/missions - List recorded missions\n"
+            "/archive - Archive and drop past missions' huddles\n"
+            "/stats  - Time and resources per phase for the current mission\n"
             "/map    - Print repo map\n"
             "/mode   - Toggle Simulation / Real Agents\n"
             "/status - Show active repo and agents\n"
@@ -130,7 +181,7 @@ def handle_command(user_input: str, scrum: ScrumMaster, console: Console):
 def main():
     console.clear()
     
-    sm = SubprocessManager()
+    sm = create_subprocess_manager()
     mem = MemoryCore()
     scrum = ScrumMaster(sm, mem, broadcast_func=None)
     log_buffer = LogBuffer(size=8)
@@ -177,22 +228,28 @@ def main():
             layout = make_layout()
             layout["header"].update(Panel(f"Mission: {user_input}", style="bold white on blue", box=ROUNDED))
             
+            huddle_feed = HuddleFeed(scrum.memory, size=20)
+            layout["huddle"].update(Panel(huddle_feed.renderable, title="📣 The Huddle", border_style="cyan", box=ROUNDED))
+
             with Live(layout, refresh_per_second=4, screen=False):
-                while scrum.state != "IDLE" and scrum.state != "AWAITING_USER":
+                # Redraw at the Live refresh rate; the wait returns the moment the sprint settles.
+                while scrum.wait_for_state(("IDLE", "AWAITING_USER", "RATE_LIMITED"), timeout=0.25) is None:
                     
-                    # Update Huddle View
-                    huddle_md = get_huddle_content(scrum.memory)
-                    layout["huddle"].update(Panel(huddle_md, title="📣 The Huddle", border_style="cyan", box=ROUNDED))
+                    # Update Huddle View (only when new entries arrived)
+                    if huddle_feed.poll():
+                        layout["huddle"].update(Panel(huddle_feed.renderable, title="📣 The Huddle", border_style="cyan", box=ROUNDED))
                     
                     # Update Logs View
                     layout["logs"].update(Panel(log_buffer.get_renderable(), title="🖥️  System Logs", border_style="dim", box=ROUNDED))
-                    
-                    time.sleep(0.25)
 
             # Loop cleanup
             if scrum.state == "AWAITING_USER":
                 # The loop in main() will hit the "AWAITING_USER" block at top
                 pass
+            elif scrum.state == "RATE_LIMITED":
+                resume_at = scrum.rate_limits.next_reset()
+                when = f" The mission resumes by itself at {resume_at.astimezone():%H:%M %Z}." if resume_at else ""
+                console.print(f"[bold red]All agents are rate limited.[/bold red]{when}")
             else:
                 console.print("[bold green]Mission Completed.[/bold green]")
     finally: